@@ -1,26 +1,34 @@
 """
-This script generates self-signed certificates for testing purposes. It fetches the user's location information
-based on their IP address and uses this information to populate the certificate fields.
+This script generates self-signed certificates for testing purposes. By default it runs offline and
+without prompts; with --interactive it fetches the user's location information based on their IP address,
+uses it to populate the certificate fields and asks for the common name.
 Functions:
     get_location_info(): Fetches the user's location information (country, region, city) using the ipinfo.io API.
-    generate_self_signed_cert(common_name, country, state, city, output_key="key.pem", output_cert="cert.pem"):
-        Generates a self-signed certificate and saves the private key and certificate to specified files.
+    generate_self_signed_cert(common_name, country, state, city, output_key="key.pem", output_cert="cert.pem",
+                              key_type="rsa"):
+        Generates a self-signed certificate with an RSA-2048, ECDSA P-256 or Ed25519 key and saves the private key
+        and certificate to specified files. Files are replaced atomically, so running servers that watch them
+        never load half-written ones.
 Usage:
-    Run the script and follow the prompts to generate a self-signed certificate with location-based information.
+    python gen_certs.py --key-type ecdsa --common-name localhost --out-dir certs
+    python gen_certs.py --interactive
 """
 
+import argparse
 import datetime
 import ipaddress
-import requests
 import json
+import os
 from cryptography import x509
 from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
 from cryptography.hazmat.primitives import serialization
 
 
 def get_location_info():
+    import requests
+
     try:
         response = requests.get("https://ipinfo.io")
         if response.status_code == 200:
@@ -35,14 +43,33 @@ def get_location_info():
     return None
 
 
+def write_atomically(path, data):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
 def generate_self_signed_cert(
-    common_name, country, state, city, output_key="key.pem", output_cert="cert.pem"
+    common_name,
+    country,
+    state,
+    city,
+    output_key="key.pem",
+    output_cert="cert.pem",
+    key_type="rsa",
 ):
-    # Generate a private key
-    key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-    )
+    # Generate a private key; ECDSA P-256 and Ed25519 make TLS handshakes
+    # much cheaper (browsers do not accept Ed25519 certificates yet)
+    if key_type == "ecdsa":
+        key = ec.generate_private_key(ec.SECP256R1())
+    elif key_type == "ed25519":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+        )
 
     # Create a self-signed certificate
     subject = issuer = x509.Name(
@@ -88,7 +115,7 @@ def generate_self_signed_cert(
             x509.KeyUsage(
                 digital_signature=True,
                 content_commitment=False,
-                key_encipherment=True,
+                key_encipherment=key_type == "rsa",
                 data_encipherment=False,
                 key_agreement=False,
                 key_cert_sign=False,
@@ -102,42 +129,83 @@ def generate_self_signed_cert(
             x509.ExtendedKeyUsage([x509.oid.ExtendedKeyUsageOID.SERVER_AUTH]),
             critical=False,
         )
-        .sign(key, hashes.SHA256())
+        # Ed25519 signs without a separate digest
+        .sign(key, None if key_type == "ed25519" else hashes.SHA256())
     )
 
-    # Save the private key
-    with open(output_key, "wb") as f:
-        f.write(
-            key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.TraditionalOpenSSL,
-                encryption_algorithm=serialization.NoEncryption(),
-            )
-        )
+    # Save the private key (PKCS8: the traditional format has no Ed25519)
+    write_atomically(
+        output_key,
+        key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=(
+                serialization.PrivateFormat.TraditionalOpenSSL
+                if key_type == "rsa"
+                else serialization.PrivateFormat.PKCS8
+            ),
+            encryption_algorithm=serialization.NoEncryption(),
+        ),
+    )
 
     # Save the certificate
-    with open(output_cert, "wb") as f:
-        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    write_atomically(output_cert, cert.public_bytes(serialization.Encoding.PEM))
 
     print(f"Self-signed certificate generated for {common_name}")
     print(f"Private key saved to: {output_key}")
     print(f"Certificate saved to: {output_cert}")
 
 
-if __name__ == "__main__":
-    location_info = get_location_info()
-    if location_info:
-        print("Location information retrieved:")
-        print(f"Country: {location_info['country']}")
-        print(f"Region: {location_info['region']}")
-        print(f"City: {location_info['city']}")
+def main():
+    parser = argparse.ArgumentParser(description="Generate a self-signed certificate")
+    parser.add_argument(
+        "--key-type", choices=("rsa", "ecdsa", "ed25519"), default="rsa"
+    )
+    parser.add_argument("--common-name", default="localhost")
+    parser.add_argument("--country", default="US")
+    parser.add_argument("--state", default="Unknown")
+    parser.add_argument("--city", default="Unknown")
+    parser.add_argument("--out-dir", default="certs")
+    parser.add_argument("--cert", default="cert.pem", help="File name in --out-dir")
+    parser.add_argument("--key", default="key.pem", help="File name in --out-dir")
+    parser.add_argument(
+        "--interactive",
+        action="store_true",
+        help="Look up the location on ipinfo.io and prompt for the common name",
+    )
+    args = parser.parse_args()
+
+    common_name, country, state, city = (
+        args.common_name,
+        args.country,
+        args.state,
+        args.city,
+    )
+    if args.interactive:
+        location_info = get_location_info()
+        if location_info:
+            print("Location information retrieved:")
+            print(f"Country: {location_info['country']}")
+            print(f"Region: {location_info['region']}")
+            print(f"City: {location_info['city']}")
+            country = location_info["country"]
+            state = location_info["region"]
+            city = location_info["city"]
 
         common_name = input(
             "Enter the common name for the certificate (e.g., localhost): "
         )
-        generate_self_signed_cert(
-            common_name,
-            location_info["country"],
-            location_info["region"],
-            location_info["city"],
-        )
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    generate_self_signed_cert(
+        common_name,
+        country,
+        state,
+        city,
+        output_key=os.path.join(args.out_dir, args.key),
+        output_cert=os.path.join(args.out_dir, args.cert),
+        key_type=args.key_type,
+    )
+
+
+if __name__ == "__main__":
+    main()
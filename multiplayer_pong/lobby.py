@@ -58,15 +58,15 @@ class LobbyScreen:
     def handle_message(self, message, socket_name):
         try:
             data = json.loads(message)
-            self.logger.debug(f"Received data in LobbyScreen.handle_message: {data}, from socket: {socket_name}")
+            self.logger.debug("Received data in LobbyScreen.handle_message: %s, from socket: %s", data, socket_name)
             if "servers" in data:
                 self.server_list = data["servers"]
-                self.logger.debug(f"Server list: {self.server_list}")
+                self.logger.debug("Server list: %s", self.server_list)
                 self.server_list_view.update_items(self.server_list)
             if "server_id" in data:
                 self.current_server_id = data["server_id"]
             if "message" in data:
-                self.logger.debug(f"Received message: {data['message']}")
+                self.logger.debug("Received message: %s", data["message"])
                 self.message_log.insert(0, f'{data["message"]}')
         except json.JSONDecodeError:
             self.logger.error(f"Invalid JSON received: {message}")
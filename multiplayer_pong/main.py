@@ -17,6 +17,7 @@ import pygame
 pygame.init()
 
 import lobby
+import packed_state
 
 from pygbag_network_utils.client.socket.websocket import WebSocketClient, socket_handler
 from pygbag_network_utils.client.gui import BrowserConsoleHandler
@@ -76,6 +77,11 @@ except FileNotFoundError:
 
 game_client = None
 player_name = None
+# Room id, name and token of the last match, to get the same paddle back on
+# rejoin.
+last_room = None
+player_token = None
+reclaim = None
 current_screen = LOBBY_SCREEN
 game_state = {
     "player_0": {"pos": HEIGHT / 2, "score": 0},
@@ -83,6 +89,10 @@ game_state = {
     "ball": {"pos": [WIDTH / 2, HEIGHT / 2]},
 }
 state_lock = threading.Lock()
+# Game states received lately by number: the server sends only what changed
+# since the last one we acked.
+STATE_HISTORY = 32
+received_states = {}
 
 
 def game():
@@ -116,17 +126,57 @@ def game():
 
 
 def handle_game_client(message, socket_name):
-    global player_name, game_state, current_screen, state_lock
-    data = json.loads(message)
+    # One read from the socket can hold several lines.
+    for line in message.split("\n"):
+        if line:
+            handle_game_line(line)
+
+
+def handle_game_line(line):
+    global player_name, player_token, game_state, current_screen, state_lock
+    if packed_state.is_packed(line):
+        _, state = packed_state.unpack_state(line)
+        with state_lock:
+            game_state = state
+        return
+    data = json.loads(line)
     if "player_name" in data:
         player_name = data["player_name"]
+        player_token = data.get("token")
         logger.debug(f"{player_name}")
     if "game_start" in data:
         current_screen = PLAY_SCREEN
+    if "seq" in data:
+        state = apply_state(data)
+        if state is not None:
+            with state_lock:
+                game_state = state
+        return
     with state_lock:
         game_state.update(data)
 
 
+def apply_state(data):
+    """Rebuild a numbered game state, full or a delta, and ack it."""
+    seq = data.pop("seq")
+    base = data.pop("base", None)
+    if base is None:
+        state = data
+    elif base in received_states:
+        state = {name: dict(fields) for name, fields in received_states[base].items()}
+        for name, fields in data.items():
+            state.setdefault(name, {}).update(fields)
+    else:
+        # A baseline we no longer have: leave it unacked and the server
+        # falls back to a full state.
+        return None
+    received_states[seq] = state
+    for old in [number for number in received_states if number <= seq - STATE_HISTORY]:
+        del received_states[old]
+    game_client.send(json.dumps({"ack": seq}))
+    return state
+
+
 async def main():
     global ball_vel_x, ball_vel_y, left_score, right_score, current_screen
 
@@ -136,10 +186,22 @@ async def main():
     lobby_screen = lobby.LobbyScreen(ws_client)
 
     def on_message(message, socket_name):
-        global game_client, player_name, current_screen
+        # One read from the socket can hold several lines.
+        for line in message.split("\n"):
+            if line:
+                on_lobby_line(line, socket_name)
+
+    def on_lobby_line(line, socket_name):
+        global game_client, player_name, current_screen, last_room, reclaim
 
-        data = json.loads(message)
+        data = json.loads(line)
         if "host" in data and "port" in data:
+            reclaim = {}
+            if player_name is not None and data.get("server_id") == last_room:
+                reclaim = {"player_name": player_name, "token": player_token}
+            last_room = data.get("server_id")
+            player_name = None
+            received_states.clear()
             logger.debug(f"Connecting to echo server: {data['host']}:{data['port']}")
             game_client = WebSocketClient(
                 data["host"],
@@ -150,7 +212,7 @@ async def main():
             asyncio.create_task(socket_handler(game_client))
             current_screen = WAIT_SCREEN
         else:
-            lobby_screen.handle_message(message, socket_name)
+            lobby_screen.handle_message(line, socket_name)
 
     ws_client.set_message_callback(on_message)
     socket_task = asyncio.create_task(socket_handler(ws_client))
@@ -166,6 +228,8 @@ async def main():
             if current_screen == LOBBY_SCREEN:
                 lobby_screen.handle_event(event)
         if current_screen == LOBBY_SCREEN:
+            # The Pong lobby is pygbag's MainServer, which has no
+            # subscribe_list: poll the room list.
             if pygame.time.get_ticks() % 2000 < 100:
                 ws_client.send('{"command": "list"}')
             lobby_screen.handle_mouse_pos(pygame.mouse.get_pos())
@@ -175,7 +239,9 @@ async def main():
             game()
         if current_screen == WAIT_SCREEN:
             if pygame.time.get_ticks() % 2000 < 100 and player_name is None:
-                game_client.send('{"ask_name": true}')
+                game_client.send(
+                    json.dumps({"ask_name": True, "packed": True, **reclaim})
+                )
             screen.fill(BLACK)
             font = pygame.font.Font(None, 74)
             text = font.render("Waiting for opponent...", True, WHITE)
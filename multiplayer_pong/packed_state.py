@@ -0,0 +1,43 @@
+"""
+Packed game states, the fixed-size format pong_server sends to players that
+ask for it with "packed" in ask_name (see pong_server.main.pack_state).
+
+    magic     1 byte, 0xFF
+    seq       2 bytes, state number modulo 65536
+    paddles   2 x 2 bytes, signed, in 1/32 pixel
+    ball      2 x 2 bytes, signed, x then y, in 1/32 pixel
+    scores    2 x 2 bytes
+
+All big-endian. Text frames carry it as a base64 line, which the magic byte
+makes start with "/" where JSON lines start with "{".
+"""
+
+import base64
+import struct
+
+STATE_PACKET = struct.Struct(">BHhhhhHH")
+STATE_MAGIC = 0xFF
+FIXED_POINT = 32
+
+
+def is_packed(line):
+    return line.startswith("/")
+
+
+def decode_packet(packet):
+    """Sequence number and game state dict of a packed state."""
+    magic, seq, paddle_0, paddle_1, ball_x, ball_y, score_0, score_1 = (
+        STATE_PACKET.unpack(packet)
+    )
+    if magic != STATE_MAGIC:
+        raise ValueError("not a packed state")
+    return seq, {
+        "player_0": {"pos": paddle_0 / FIXED_POINT, "score": score_0},
+        "player_1": {"pos": paddle_1 / FIXED_POINT, "score": score_1},
+        "ball": {"pos": [ball_x / FIXED_POINT, ball_y / FIXED_POINT]},
+    }
+
+
+def unpack_state(line):
+    """decode_packet() for a base64 line from a text frame."""
+    return decode_packet(base64.b64decode(line))
@@ -30,6 +30,11 @@ logging.basicConfig(
     handlers=[BrowserConsoleHandler()],
 )
 logger = logging.getLogger(__name__)
+# Per-chunk and per-message lines. Writing one to the browser console for
+# every frame stalls the game loop, so they are off unless this is set to
+# DEBUG.
+wire_logger = logging.getLogger(f"{__name__}.wire")
+wire_logger.setLevel(logging.INFO)
 
 pygame.init()
 screen = pygame.display.set_mode((800, 600))
@@ -44,6 +49,8 @@ PORT = 8765
 # {"command": "create"} - creates a new server and returns the server_id
 # {"command": "join", "server_id": 1} - joins the server with the given server_id
 # {"command": "list"} - lists all available servers
+# {"command": "subscribe_list"} - sends the server list once, then pushes
+#     {"servers_delta": {"version", "added", "removed", "updated"}} on changes
 # all servers are echo servers, they will echo back the message sent to them
 
 
@@ -104,24 +111,21 @@ class WebSocketClient:
                 ready_to_read, _, _ = select.select([self.socket], [], [], 0.1)
                 if ready_to_read:
                     data = self.socket.recv(4096)  # Receive up to 4096 bytes
-                    logger.debug(f"Received data: {data}")
+                    wire_logger.debug("Received data: %r", data)
                     if data:
-                        decoded_message = data.decode("utf-8")
-                        self.buffer += decoded_message
-                        if decoded_message[-1] == "\n":
-                            decoded_message = self.buffer
-                            self.buffer = ""
-                            decoded_message = decoded_message[:-1]
-                        else:
-                            continue
-
-                        logger.debug(
-                            f"Received message has ended with: {decoded_message[-1]}"
-                        )
-                        if self.on_message_callback:
-                            self.on_message_callback(decoded_message, self.socket_name)
-                        else:
-                            logger.debug(f"Received message: {decoded_message}")
+                        self.buffer += data.decode("utf-8")
+                        # One read can hold several messages (pushed list
+                        # updates) or only part of one.
+                        *messages, self.buffer = self.buffer.split("\n")
+                        for decoded_message in messages:
+                            if self.on_message_callback:
+                                self.on_message_callback(
+                                    decoded_message, self.socket_name
+                                )
+                            else:
+                                wire_logger.debug(
+                                    "Received message: %s", decoded_message
+                                )
                     else:
                         # Socket closed
                         logger.debug("Server closed the connection.")
@@ -339,6 +343,7 @@ class LobbyScreen:
         self.ws_client: WebSocketClient = ws_client
         self.echo_client: WebSocketClient = None
         self.server_list = []
+        self.list_version = None
         self.current_server_id = None
         self.message_log = []
         self.server_list_view = ListView(50, 120, 700, 200, self.server_list)
@@ -381,6 +386,26 @@ class LobbyScreen:
     def list_servers(self):
         self.ws_client.send('{"command": "list"}')
 
+    def subscribe_servers(self):
+        self.ws_client.send('{"command": "subscribe_list"}')
+
+    def apply_server_delta(self, delta):
+        if self.list_version is None or delta["version"] != self.list_version + 1:
+            # Missed an update; ask for the full list again.
+            self.subscribe_servers()
+            return
+        servers = {server["id"]: server for server in self.server_list}
+        for server_id in delta["removed"]:
+            servers.pop(server_id, None)
+        for server in delta["added"]:
+            servers[server["id"]] = server
+        for update in delta["updated"]:
+            if update["id"] in servers:
+                servers[update["id"]]["clients"] = update["clients"]
+        self.list_version = delta["version"]
+        self.server_list = list(servers.values())
+        self.server_list_view.update_items(self.server_list)
+
     def join_server(self):
         if self.server_id_input_box.text.isdigit():
             self.current_server_id = int(self.server_id_input_box.text)
@@ -395,23 +420,33 @@ class LobbyScreen:
     def handle_message(self, message, socket_name):
         try:
             data = json.loads(message)
-            logger.debug(
-                f"Received data in LobbyScreen.handle_message: {data}, from socket: {socket_name}"
+            wire_logger.debug(
+                "Received data in LobbyScreen.handle_message: %s, from socket: %s",
+                data,
+                socket_name,
             )
             if "servers" in data:
                 self.server_list = data["servers"]
-                logger.debug(f"Server list: {self.server_list}")
+                self.list_version = data.get("version")
+                logger.debug("Server list: %s", self.server_list)
                 self.server_list_view.update_items(self.server_list)
+            if "servers_delta" in data:
+                self.apply_server_delta(data["servers_delta"])
             if "server_id" in data:
                 self.current_server_id = data["server_id"]
             if "message" in data:
-                logger.debug(f"Received message: {data['message']}")
+                wire_logger.debug("Received message: %s", data["message"])
                 self.message_log.insert(0, f'{data["message"]}')
                 # if len(self.message_log) > 10:
                 #     self.message_log.pop(-1)
             if "echo" in data:
-                logger.debug(f"Received echo message: {data['echo']}")
+                wire_logger.debug("Received echo message: %s", data["echo"])
                 self.message_log.insert(0, f'Echo: {data["echo"]}')
+            if "batch" in data:
+                # Rooms in tick mode send a tick's echoes in one frame.
+                for item in data["batch"]:
+                    if "echo" in item:
+                        self.message_log.insert(0, f'Echo: {item["echo"]}')
             if "host" in data and "port" in data:
                 logger.debug(
                     f"Connecting to echo server: {data['host']}:{data['port']}"
@@ -468,7 +503,7 @@ async def main():
     lobby = LobbyScreen(ws_client)
 
     def on_message(message, socket_name):
-        logger.debug(f"Received message: {message}")
+        wire_logger.debug("Received message: %s", message)
         lobby.handle_message(message, socket_name)
 
     ws_client.set_message_callback(on_message)
@@ -485,6 +520,14 @@ async def main():
 
     # list_request_task = asyncio.create_task(periodic_list_request())
 
+    async def subscribe_server_list():
+        while not ws_client.socket:
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)  # Let the non-blocking connect finish
+        lobby.subscribe_servers()
+
+    subscribe_task = asyncio.create_task(subscribe_server_list())
+
     while running:
 
         for event in pygame.event.get():
@@ -492,8 +535,6 @@ async def main():
             #     running = False
             #     break
             lobby.handle_event(event)
-        if pygame.time.get_ticks() % 2000 < 100:
-            ws_client.send('{"command": "list"}')
         lobby.handle_mouse_pos(pygame.mouse.get_pos())
         lobby.draw(screen)
         pygame.display.flip()
@@ -0,0 +1,183 @@
+"""
+Room broadcast latency through the room bus.
+
+A sender and a receiver join room 1. In the ``local`` case both connect to
+one server process. In the ``unix`` case they connect to two server
+processes joined through a BusBroker process, so every echo crosses the
+bus. The sender chats at ``--rate`` messages per second for ``--count``
+messages, then sends another ``--count`` as fast as it can. The table shows
+receive latency percentiles for the paced part and delivered messages per
+second for the burst.
+
+Usage (from the repository root):
+    python -m networking.bench_bus --count 2000 --rate 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import websockets
+
+from networking.game_server import MainServer
+
+
+async def serve(options):
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=options.port,
+        rooms="shared",
+        room_ttl=0,
+        room_options={
+            "bus": options.serve,
+            "compression": None,
+            "send_queue_size": 2 * options.count,
+        },
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    await main_server.create_echo_server()
+    print(json.dumps({"ready": options.port}), flush=True)
+    await server_task
+
+
+async def start_child(*args):
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", *args, stdout=asyncio.subprocess.PIPE
+    )
+
+
+async def start_server(port, bus):
+    child = await start_child(
+        "networking.bench_bus", "--serve", bus, "--port", str(port)
+    )
+    await child.stdout.readline()
+    return child
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def measure(options, send_port, receive_port):
+    room = "/room/1"
+    sender = await websockets.connect(f"ws://127.0.0.1:{send_port}{room}")
+    receiver = await websockets.connect(f"ws://127.0.0.1:{receive_port}{room}")
+    # Let the rooms' subscriptions reach the broker.
+    await asyncio.sleep(0.5)
+    latencies = []
+    burst = {"received": 0, "last": None}
+    total = options.count * 2
+
+    async def receive():
+        received = 0
+        async for message in receiver:
+            data = json.loads(message)
+            if "echo" not in data:
+                continue
+            now = time.perf_counter()
+            echo = data["echo"]
+            if echo["burst"]:
+                burst["received"] += 1
+                burst["last"] = now
+            else:
+                latencies.append(now - echo["sent"])
+            received += 1
+            if received == total:
+                return
+
+    async def drain_sender():
+        async for _ in sender:
+            pass
+
+    receiving = asyncio.create_task(receive())
+    draining = asyncio.create_task(drain_sender())
+    for i in range(options.count):
+        await sender.send(
+            json.dumps({"message": {"sent": time.perf_counter(), "burst": False}})
+        )
+        await asyncio.sleep(1 / options.rate)
+    await asyncio.sleep(0.5)
+    burst_started = time.perf_counter()
+    for i in range(options.count):
+        await sender.send(
+            json.dumps({"message": {"sent": time.perf_counter(), "burst": True}})
+        )
+    try:
+        await asyncio.wait_for(receiving, 30)
+    except asyncio.TimeoutError:
+        pass
+    draining.cancel()
+    await sender.close()
+    await receiver.close()
+    latencies.sort()
+    burst_time = (burst["last"] or burst_started) - burst_started
+    return {
+        "p50": percentile(latencies, 0.5) * 1000 if latencies else float("nan"),
+        "p99": percentile(latencies, 0.99) * 1000 if latencies else float("nan"),
+        "max": latencies[-1] * 1000 if latencies else float("nan"),
+        "paced": len(latencies),
+        "burst": burst["received"],
+        "burst_rate": burst["received"] / burst_time if burst_time else 0,
+    }
+
+
+async def run(options):
+    print(
+        f"{'bus':<7} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+        f"{'paced':>7} {'burst':>7} {'burst msg/s':>12}"
+    )
+    results = {}
+
+    children = [await start_server(options.port, "local")]
+    try:
+        results["local"] = await measure(options, options.port, options.port)
+    finally:
+        for child in children:
+            child.terminate()
+            await child.wait()
+
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    broker = await start_child("networking.pubsub", "--socket", path)
+    while not os.path.exists(path):
+        await asyncio.sleep(0.05)
+    children = [
+        await start_server(options.port, f"unix:{path}"),
+        await start_server(options.port + 1, f"unix:{path}"),
+    ]
+    try:
+        results["unix"] = await measure(options, options.port, options.port + 1)
+    finally:
+        for child in children + [broker]:
+            child.terminate()
+            await child.wait()
+
+    for name, result in results.items():
+        print(
+            f"{name:<7} {result['p50']:>7.2f} {result['p99']:>7.2f} "
+            f"{result['max']:>7.1f} {result['paced']:>7} {result['burst']:>7} "
+            f"{result['burst_rate']:>12.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room bus latency benchmark")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if options.serve:
+        asyncio.run(serve(options))
+        return
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Broadcast throughput with and without traffic capture.
+
+Starts a shared-mode server in a child process, once plain and once with
+``--capture``. ``--clients`` clients join room 1 and one of them sends
+``--count`` messages as fast as it can. The table shows delivered echoes
+per second, and the capture file's size and bytes per recorded frame.
+
+Usage (from the repository root):
+    python -m networking.bench_capture --clients 10 --count 5000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+import time
+
+import websockets
+
+from networking import capture
+from networking.game_server import MainServer
+
+
+async def serve(options):
+    if options.capture_to:
+        capture.enable(options.capture_to)
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=options.port,
+        rooms="shared",
+        room_ttl=0,
+        room_options={
+            "compression": None,
+            "send_queue_size": 2 * options.count,
+        },
+    )
+    stopped = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    await main_server.create_echo_server()
+    print(json.dumps({"ready": options.port}), flush=True)
+    await stopped.wait()
+    # Write out what the recorder still buffers before the process exits;
+    # the default SIGTERM action would skip it.
+    capture.disable()
+    server_task.cancel()
+
+
+async def measure(options, capture_to):
+    args = ["--serve", "--port", str(options.port)]
+    if capture_to:
+        args += ["--capture-to", capture_to]
+    child = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "networking.bench_capture",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    await child.stdout.readline()
+    url = f"ws://127.0.0.1:{options.port}/room/1"
+    try:
+        clients = [
+            await websockets.connect(url, compression=None)
+            for _ in range(options.clients)
+        ]
+
+        async def receive(websocket):
+            received = 0
+            async for _ in websocket:
+                received += 1
+                if received == options.count:
+                    return
+
+        receivers = [asyncio.create_task(receive(client)) for client in clients]
+        message = json.dumps({"message": "x" * options.size})
+        started = time.perf_counter()
+        for _ in range(options.count):
+            await clients[0].send(message)
+        await asyncio.wait_for(asyncio.gather(*receivers), 120)
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            await client.close()
+    finally:
+        child.terminate()
+        await child.wait()
+    return options.count * options.clients / elapsed
+
+
+async def run(options):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.cap")
+    plain = await measure(options, None)
+    captured = await measure(options, path)
+    records = capture.read(path)
+    size = os.path.getsize(path)
+    print(f"{'capture':<8} {'echoes/s':>10} {'file bytes':>11} {'bytes/frame':>12}")
+    print(f"{'off':<8} {plain:>10.0f} {'-':>11} {'-':>12}")
+    print(
+        f"{'on':<8} {captured:>10.0f} {size:>11} "
+        f"{size / max(len(records), 1):>12.1f}"
+    )
+    os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Traffic capture benchmark")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=64, help="Message bytes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--capture-to", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if options.serve:
+        asyncio.run(serve(options))
+        return
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
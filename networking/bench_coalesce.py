@@ -0,0 +1,121 @@
+"""
+Compares EchoServer's immediate broadcasts with tick-mode coalescing.
+
+One room holds ``--clients`` clients, each sending ``--rate`` chat messages
+per second from a child process. For every mode the table shows the echoes
+clients received per second, the frames the server sent (each one a
+websocket send and, with an idle socket, one send syscall), sends per
+delivered echo and the server's CPU time per delivered echo.
+
+Usage (from the repository root):
+    python -m networking.bench_coalesce --clients 50 --rate 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+
+import websockets
+
+from networking import metrics
+from networking.game_server import EchoServer
+
+
+async def swarm(address, clients, rate, duration):
+    received = 0
+
+    async def client(index):
+        nonlocal received
+        async with websockets.connect(address) as websocket:
+
+            async def receive():
+                nonlocal received
+                async for message in websocket:
+                    received += len(json.loads(message).get("batch", (None,)))
+
+            receiver = asyncio.create_task(receive())
+            await asyncio.sleep(random.uniform(0, 1 / rate))
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                await websocket.send(json.dumps({"message": {"from": index}}))
+                await asyncio.sleep(1 / rate)
+            await asyncio.sleep(0.5)
+            receiver.cancel()
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    print(json.dumps({"received": received}))
+
+
+async def run(options, tick, exclude_sender, port):
+    metrics.registry = metrics.Metrics()
+    room = EchoServer(
+        "127.0.0.1", port, name="bench", tick=tick, exclude_sender=exclude_sender
+    )
+    server_task = asyncio.create_task(room.start())
+    await asyncio.sleep(0.2)
+    child = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "networking.bench_coalesce",
+        "--swarm",
+        f"ws://127.0.0.1:{port}",
+        "--clients",
+        str(options.clients),
+        "--rate",
+        str(options.rate),
+        "--duration",
+        str(options.duration),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    cpu = time.process_time()
+    received = json.loads(await child.stdout.readline())["received"]
+    cpu = time.process_time() - cpu
+    await child.wait()
+    sends = room.metrics.messages_out
+    await room.close()
+    await server_task
+    return received, sends, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Echo coalescing benchmark")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--tick-ms", type=float, default=16.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--swarm", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if options.swarm:
+        asyncio.run(
+            swarm(options.swarm, options.clients, options.rate, options.duration)
+        )
+        return
+
+    tick = options.tick_ms / 1000
+    cases = [
+        ("immediate", None, False),
+        (f"tick {options.tick_ms:g} ms", tick, False),
+        (f"tick {options.tick_ms:g} ms excl", tick, True),
+    ]
+    print(
+        f"{'mode':<20} {'delivered/s':>12} {'sends':>9} "
+        f"{'sends/msg':>10} {'cpu us/msg':>11}"
+    )
+    for i, (name, tick, exclude_sender) in enumerate(cases):
+        received, sends, cpu = asyncio.run(
+            run(options, tick, exclude_sender, options.port + i)
+        )
+        print(
+            f"{name:<20} {received / options.duration:>12.0f} {sends:>9} "
+            f"{sends / received:>10.3f} {cpu / received * 1e6:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
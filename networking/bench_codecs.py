@@ -0,0 +1,74 @@
+"""
+Codec microbenchmarks: bytes on the wire and encode/decode time per message
+for the messages the lobby and rooms actually send.
+
+"msgpack (pure)" is the fallback packer in networking.codec; "msgpack (C)"
+is the optional ``msgpack`` extension, reported only when it is installed.
+
+Usage (from the repository root):
+    python -m networking.bench_codecs --rounds 20000
+"""
+
+import argparse
+import timeit
+
+from networking import codec
+
+
+def sample_messages():
+    return {
+        "pong state": {
+            "player_0": {"pos": 312.0, "score": 3},
+            "player_1": {"pos": 180.0, "score": 5},
+            "ball": {"pos": [412.0, 96.0]},
+        },
+        "echo chat": {"echo": "hello from the other tab", "sender": 17},
+        "room list (50)": {
+            "servers": [
+                {"id": i, "address": f"ws://localhost:8765/room/{i}", "clients": i % 4}
+                for i in range(1, 51)
+            ]
+        },
+        "lobby command": {"command": "join", "server_id": 42},
+    }
+
+
+def codecs():
+    entries = [("json", codec.JSON)]
+    if codec.msgpack is not None:
+        entries.append(("msgpack (C)", codec.MSGPACK))
+
+    class PureMsgPack:
+        text = False
+
+        def encode(self, data):
+            out = bytearray()
+            codec._pack(data, out)
+            return bytes(out)
+
+        def decode(self, message):
+            return next(codec.unpack_stream(message))
+
+    entries.append(("msgpack (pure)", PureMsgPack()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wire codec microbenchmarks")
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'message':<16} {'codec':<15} {'bytes':>6} {'enc us':>8} {'dec us':>8}")
+    for label, message in sample_messages().items():
+        for name, c in codecs():
+            encoded = c.encode(message)
+            enc = timeit.timeit(lambda: c.encode(message), number=args.rounds)
+            dec = timeit.timeit(lambda: c.decode(encoded), number=args.rounds)
+            print(
+                f"{label:<16} {name:<15} {len(encoded):>6} "
+                f"{enc / args.rounds * 1e6:>8.2f} {dec / args.rounds * 1e6:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compares per-recipient and encode-once broadcast for a busy room.
+
+Every tick a Pong-sized game state is serialized and broadcast to the room
+through EchoServer's send queues. Clients are in-process stand-ins whose
+``send`` does what websockets does for a server frame: UTF-8 encode a str
+payload, then build the frame with ``Frame.serialize`` (optionally through a
+per-connection permessage-deflate extension).
+
+"per-recipient" replays the previous broadcast, which built
+``message + "\\n"`` for every client and let each send encode it;
+"encode-once" is the current EchoServer.broadcast.
+
+Reported per tick: CPU time, peak transient bytes held by the tick and the
+number of payload encodes. The CPU column is also scaled to a 120 Hz tick
+rate as a share of one core.
+
+Usage (from the repository root):
+    python -m networking.bench_encode_once --clients 100 --ticks 600
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import tracemalloc
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.frames import Frame, Opcode
+
+from networking.game_server import EchoServer
+
+
+class StubClient:
+    encodes = 0
+
+    def __init__(self, deflate=False):
+        self.remote_address = ("127.0.0.1", 0)
+        self.extensions = [PerMessageDeflate(False, False, 15, 15)] if deflate else []
+
+    async def send(self, message, text=None):
+        if isinstance(message, str):
+            StubClient.encodes += 1
+            message = message.encode("utf-8")
+        Frame(Opcode.TEXT, message).serialize(mask=False, extensions=self.extensions)
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def game_state():
+    return {
+        "player_0": {"pos": random.uniform(0, 600), "score": 3},
+        "player_1": {"pos": random.uniform(0, 600), "score": 5},
+        "ball": {"pos": [random.uniform(0, 800), random.uniform(0, 600)]},
+    }
+
+
+async def run(mode, client_count, ticks, deflate):
+    server = EchoServer("127.0.0.1", 0, send_queue_size=8)
+    for _ in range(client_count):
+        server.add_client(StubClient(deflate))
+
+    async def per_recipient_broadcast(state):
+        message = json.dumps(state)
+        for session in server.clients.values():
+            session.enqueue(message + "\n")
+
+    broadcast = server.broadcast if mode == "encode-once" else per_recipient_broadcast
+
+    async def tick():
+        await broadcast(game_state())
+        # Let every writer task drain its queue before the next tick.
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    # CPU is timed without tracemalloc, which would dominate the numbers.
+    StubClient.encodes = 0
+    cpu_started = time.process_time()
+    for _ in range(ticks):
+        await tick()
+    cpu = time.process_time() - cpu_started
+    encodes = StubClient.encodes
+
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(ticks):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        await tick()
+        peak_total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    for websocket in list(server.clients):
+        server.remove_client(websocket)
+    return {
+        "cpu_us_per_tick": cpu / ticks * 1e6,
+        "peak_bytes_per_tick": peak_total // ticks,
+        "encodes_per_tick": encodes / ticks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode-once broadcast benchmark")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=120.0)
+    parser.add_argument(
+        "--deflate", action="store_true", help="Frame through permessage-deflate"
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(
+        f"{'mode':<14} {'cpu us/tick':>12} {'core % @' + str(int(args.rate)) + 'Hz':>14} "
+        f"{'peak B/tick':>12} {'encodes/tick':>13}"
+    )
+    for mode in ("per-recipient", "encode-once"):
+        r = asyncio.run(run(mode, args.clients, args.ticks, args.deflate))
+        core = r["cpu_us_per_tick"] * args.rate / 1e4
+        print(
+            f"{mode:<14} {r['cpu_us_per_tick']:>12.1f} {core:>14.1f} "
+            f"{r['peak_bytes_per_tick']:>12} {r['encodes_per_tick']:>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
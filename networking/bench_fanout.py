@@ -0,0 +1,116 @@
+"""
+Measures broadcast fan-out latency of EchoServer with one stalled client.
+
+Clients are in-process stand-ins whose ``send`` yields to the loop (and, for
+the stalled client, sleeps), so the numbers isolate the room's fan-out path
+from the network. Latency is the time from calling ``broadcast`` until a
+healthy client's send for that message completes; the stalled client is left
+out of the percentiles.
+
+The "sequential" rows replay the previous broadcast loop, which awaited every
+client's send in turn.
+
+Usage (from the repository root):
+    python -m networking.bench_fanout --clients 2 50 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+from networking.game_server import EchoServer
+
+
+class StubClient:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.remote_address = ("127.0.0.1", 0)
+        self.received = {}
+
+    async def send(self, message, text=None):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        else:
+            await asyncio.sleep(0)
+        self.received[json.loads(message)["id"]] = time.perf_counter()
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def sequential_broadcast(clients, message):
+    for client in clients:
+        await client.send(message + "\n")
+
+
+async def run(mode, client_count, messages, interval, stall, policy):
+    # The stalled client goes first so the sequential loop meets it before
+    # any healthy client, like an unlucky position in the room's client set.
+    clients = [StubClient(delay=stall)]
+    clients.extend(StubClient() for _ in range(client_count - 1))
+    server = EchoServer("127.0.0.1", 0, slow_consumer_policy=policy)
+    if mode == "queued":
+        for client in clients:
+            server.add_client(client)
+
+    sent_at = {}
+    for i in range(messages):
+        sent_at[i] = time.perf_counter()
+        if mode == "queued":
+            await server.broadcast({"id": i})
+        else:
+            await sequential_broadcast(clients, json.dumps({"id": i}))
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.2)
+
+    latencies = [
+        (received - sent_at[i]) * 1000
+        for client in clients[1:]
+        for i, received in client.received.items()
+    ]
+    for client in clients:
+        server.remove_client(client)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast fan-out benchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[2, 50, 500])
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=1 / 60)
+    parser.add_argument(
+        "--stall", type=float, default=0.05, help="Send delay of the slow client"
+    )
+    parser.add_argument("--policy", default="drop_oldest")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'mode':<11} {'clients':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for client_count in args.clients:
+        for mode in ("sequential", "queued"):
+            latencies = asyncio.run(
+                run(
+                    mode,
+                    client_count,
+                    args.messages,
+                    args.interval,
+                    args.stall,
+                    args.policy,
+                )
+            )
+            print(
+                f"{mode:<11} {client_count:>7} {statistics.median(latencies):>8.3f} "
+                f"{percentile(latencies, 99):>8.3f} {max(latencies):>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
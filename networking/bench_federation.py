@@ -0,0 +1,206 @@
+"""
+Lobby throughput and consistency across federated lobby nodes.
+
+For each node count, starts that many MainServer processes sharing one
+``--registry`` (a fresh SQLite file by default) with hash placement and
+shared rooms, then ``--clients`` client processes that each keep
+``--connections`` lobby connections open, spread round-robin over the
+nodes. Every connection loops over ``list``, ``join`` of a random known
+room and, every ``--create-every`` requests, ``create``, for
+``--duration`` seconds. The table shows lobby requests per second over all
+nodes, and whether every node then lists the same rooms.
+
+Usage (from the repository root):
+    python -m networking.bench_federation --nodes 1 2 4 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+import websockets
+
+from networking.game_server import MainServer
+
+
+async def serve(options):
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=options.port,
+        rooms="shared",
+        room_ttl=0,
+        registry=options.serve,
+        placement="hash",
+        sync_interval=options.sync_interval,
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    print(json.dumps({"ready": options.port}), flush=True)
+    await server_task
+
+
+async def lobby_client(port, options, deadline, counts):
+    async with websockets.connect(
+        f"ws://127.0.0.1:{port}", compression=None
+    ) as websocket:
+        room_ids = [1]
+        requests = 0
+        while time.monotonic() < deadline:
+            if options.create_every and requests % options.create_every == 0:
+                await websocket.send(json.dumps({"command": "create"}))
+            elif requests % 2:
+                await websocket.send(json.dumps({"command": "list"}))
+            else:
+                server_id = random.choice(room_ids)
+                await websocket.send(
+                    json.dumps({"command": "join", "server_id": server_id})
+                )
+            reply = json.loads(await websocket.recv())
+            if "servers" in reply:
+                room_ids = [room["id"] for room in reply["servers"]] or room_ids
+            elif "error" in reply:
+                counts["errors"] += 1
+            requests += 1
+        counts["requests"] += requests
+
+
+async def run_clients(options):
+    ports = [int(port) for port in options.client.split(",")]
+    deadline = time.monotonic() + options.duration
+    counts = {"requests": 0, "errors": 0}
+    await asyncio.gather(
+        *(
+            lobby_client(ports[i % len(ports)], options, deadline, counts)
+            for i in range(options.connections)
+        )
+    )
+    print(json.dumps(counts), flush=True)
+
+
+async def start_child(*args):
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "networking.bench_federation",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+    )
+
+
+async def list_rooms(port):
+    async with websockets.connect(f"ws://127.0.0.1:{port}") as websocket:
+        await websocket.send(json.dumps({"command": "list"}))
+        reply = json.loads(await websocket.recv())
+    return sorted((room["id"], room["address"]) for room in reply["servers"])
+
+
+async def measure(options, node_count):
+    registry = options.registry
+    if registry is None:
+        registry = f"sqlite:{os.path.join(tempfile.mkdtemp(), 'rooms.db')}"
+    ports = [options.port + i for i in range(node_count)]
+    nodes = []
+    clients = []
+    try:
+        for port in ports:
+            child = await start_child(
+                "--serve",
+                registry,
+                "--port",
+                str(port),
+                "--sync-interval",
+                str(options.sync_interval),
+            )
+            await child.stdout.readline()
+            nodes.append(child)
+        # Let every node see the others before rooms get placed.
+        await asyncio.sleep(2 * options.sync_interval)
+        # Room 1, so joins have something to find from the start.
+        async with websockets.connect(f"ws://127.0.0.1:{ports[0]}") as websocket:
+            await websocket.send(json.dumps({"command": "create"}))
+            await websocket.recv()
+        started = time.perf_counter()
+        clients = [
+            await start_child(
+                "--client",
+                ",".join(map(str, ports)),
+                "--connections",
+                str(options.connections),
+                "--duration",
+                str(options.duration),
+                "--create-every",
+                str(options.create_every),
+            )
+            for _ in range(options.clients)
+        ]
+        requests = errors = 0
+        for child in clients:
+            counts = json.loads(await child.stdout.readline())
+            requests += counts["requests"]
+            errors += counts["errors"]
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(2 * options.sync_interval)
+        listings = [await list_rooms(port) for port in ports]
+    finally:
+        for child in clients + nodes:
+            if child.returncode is None:
+                child.terminate()
+            await child.wait()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rate": requests / elapsed,
+        "rooms": len(listings[0]),
+        "consistent": all(listing == listings[0] for listing in listings),
+    }
+
+
+async def run(options):
+    print(
+        f"{'nodes':>5} {'requests':>9} {'req/s':>8} {'errors':>7} "
+        f"{'rooms':>6} {'consistent':>11}"
+    )
+    for node_count in options.nodes:
+        result = await measure(options, node_count)
+        print(
+            f"{node_count:>5} {result['requests']:>9} {result['rate']:>8.0f} "
+            f"{result['errors']:>7} {result['rooms']:>6} "
+            f"{str(result['consistent']):>11}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Federated lobby benchmark")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=2, help="Client processes")
+    parser.add_argument(
+        "--connections", type=int, default=16, help="Connections per client process"
+    )
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--create-every", type=int, default=50)
+    parser.add_argument(
+        "--registry",
+        help="Registry spec shared by the nodes (default: a new SQLite file)",
+    )
+    parser.add_argument("--sync-interval", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--client", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if options.serve:
+        asyncio.run(serve(options))
+    elif options.client:
+        asyncio.run(run_clients(options))
+    else:
+        asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
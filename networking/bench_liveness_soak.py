@@ -0,0 +1,193 @@
+"""
+Dead-peer soak: thousands of room connections, a random share of which
+vanish without closing (they stop reading and sending, like a tab behind a
+dropped NAT mapping or a frozen client).
+
+The lobby runs in shared mode with ``--clients`` connections spread over
+rooms of ``--room-size``; one client per room chats at ``--rate`` messages
+per second. Every second each remaining listener vanishes with probability
+``--vanish`` (speakers stay, so the broadcast rate per room is constant). Every ``--report`` seconds the table shows the connections
+the server still holds, how many it has reaped for missing pongs,
+resident memory, and broadcast frames sent per second in total and per
+held connection. With heartbeats the held count follows the live clients
+and frames per second shrink with it; with ``--no-heartbeat`` vanished
+clients keep costing a frame per broadcast until the end.
+
+Usage (from the repository root):
+    python -m networking.bench_liveness_soak --clients 10000 --processes 4
+    python -m networking.bench_liveness_soak --clients 10000 --no-heartbeat
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+
+import websockets
+
+from networking import metrics
+from networking.bench_rooms import rss_bytes
+from networking.game_server import MainServer
+
+
+async def swarm(options, first, count):
+    vanished = 0
+    listeners = []
+
+    async def client(index):
+        nonlocal vanished
+        room = index // options.room_size + 1
+        address = f"ws://127.0.0.1:{options.port}/room/{room}"
+        try:
+            async with websockets.connect(
+                address, open_timeout=120, ping_interval=None
+            ) as websocket:
+                speaker = index % options.room_size == 0
+                gone = asyncio.Event()
+                if not speaker:
+                    listeners.append(gone)
+
+                async def receive():
+                    async for _ in websocket:
+                        pass
+
+                receiver = asyncio.create_task(receive())
+                while not gone.is_set():
+                    if speaker:
+                        await websocket.send(json.dumps({"message": index}))
+                    try:
+                        await asyncio.wait_for(gone.wait(), 1 / options.rate)
+                    except asyncio.TimeoutError:
+                        pass
+                # Vanish: stop reading and sending, but keep the socket open.
+                receiver.cancel()
+                websocket.transport.pause_reading()
+                await asyncio.sleep(options.duration * 2)
+        except (
+            OSError,
+            asyncio.TimeoutError,
+            websockets.exceptions.WebSocketException,
+        ):
+            pass
+
+    tasks = [asyncio.create_task(client(i)) for i in range(first, first + count)]
+    await asyncio.sleep(options.ramp)
+    deadline = time.perf_counter() + options.duration
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(1)
+        for gone in listeners:
+            if not gone.is_set() and random.random() < options.vanish:
+                gone.set()
+                vanished += 1
+    print(json.dumps({"vanished": vanished}), flush=True)
+    # Stay connected until the parent has taken its last reading.
+    await asyncio.sleep(options.report)
+    for task in tasks:
+        task.cancel()
+
+
+async def run(options):
+    metrics.registry = metrics.Metrics()
+    heartbeat = (
+        {"ping_interval": None}
+        if options.no_heartbeat
+        else {
+            "ping_interval": options.ping_interval,
+            "ping_timeout": options.ping_timeout,
+            "close_timeout": options.close_timeout,
+        }
+    )
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=options.port,
+        rooms="shared",
+        room_ttl=0,
+        room_options=heartbeat,
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    rooms = -(-options.clients // options.room_size)
+    for _ in range(rooms):
+        await main_server.create_echo_server()
+
+    share, extra = divmod(options.clients, options.processes)
+    children = []
+    first = 0
+    for i in range(options.processes):
+        count = share + (1 if i < extra else 0)
+        children.append(
+            await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "networking.bench_liveness_soak",
+                "--swarm",
+                f"{first},{count}",
+                *sys.argv[1:],
+                stdout=asyncio.subprocess.PIPE,
+            )
+        )
+        first += count
+
+    def totals():
+        room_metrics = list(metrics.registry.rooms.values())
+        return (
+            sum(len(room.clients()) for room in room_metrics),
+            sum(room.reaped["ping_timeout"] for room in room_metrics),
+            sum(room.messages_out for room in room_metrics),
+        )
+
+    await asyncio.sleep(options.ramp)
+    print(
+        f"{'t s':>5} {'held':>7} {'reaped':>7} {'rss MB':>7} "
+        f"{'frames/s':>9} {'frames/s/held':>14}"
+    )
+    _, _, sent = totals()
+    started = time.perf_counter()
+    for _ in range(int(options.duration // options.report)):
+        await asyncio.sleep(options.report)
+        held, reaped, now_sent = totals()
+        rate = (now_sent - sent) / options.report
+        sent = now_sent
+        print(
+            f"{time.perf_counter() - started:>5.0f} {held:>7} {reaped:>7} "
+            f"{rss_bytes() / 2**20:>7.1f} {rate:>9.0f} {rate / max(held, 1):>14.3f}"
+        )
+    vanished = 0
+    for child in children:
+        vanished += json.loads(await child.stdout.readline())["vanished"]
+        await child.wait()
+    print(f"clients {options.clients}, vanished {vanished}")
+    await main_server.shutdown()
+    await server_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dead-peer reaping soak")
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--room-size", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--vanish", type=float, default=0.02)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--ramp", type=float, default=45.0)
+    parser.add_argument("--report", type=float, default=10.0)
+    parser.add_argument("--ping-interval", type=float, default=5.0)
+    parser.add_argument("--ping-timeout", type=float, default=10.0)
+    parser.add_argument("--close-timeout", type=float, default=2.0)
+    parser.add_argument("--no-heartbeat", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--swarm", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if options.swarm:
+        first, count = map(int, options.swarm.split(","))
+        asyncio.run(swarm(options, first, count))
+        return
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
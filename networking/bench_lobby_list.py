@@ -0,0 +1,168 @@
+"""
+Lobby CPU with many idle lobby clients: ``list`` polling vs ``subscribe_list``.
+
+The lobby runs in this process with a fixed set of rooms and, optionally, a
+little room churn (one room created and one closed every ``--churn``
+seconds). Idle lobby clients run
+in a child process so their CPU is not counted. In "poll" mode every client
+sends ``list`` every ``--poll-interval`` seconds like the pygbag lobbies did
+(about six requests per two seconds); in "subscribe" mode each client sends
+``subscribe_list`` once and then only receives deltas.
+
+Reported: lobby CPU as a share of one core over the measurement window, and
+the bytes the clients received per second.
+
+Usage (from the repository root):
+    python -m networking.bench_lobby_list --clients 0 500 1000 2000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+
+import websockets
+
+from networking.game_server import MainServer
+
+
+async def idle_clients(address, count, mode, poll_interval, duration):
+    received = 0
+    connected = 0
+    all_connected = asyncio.Event()
+
+    async def client():
+        nonlocal received, connected
+        async with websockets.connect(address, open_timeout=60) as websocket:
+            connected += 1
+            if connected == count:
+                all_connected.set()
+            if mode == "subscribe":
+                await websocket.send(json.dumps({"command": "subscribe_list"}))
+                async for message in websocket:
+                    received += len(message)
+            else:
+
+                async def poll():
+                    while True:
+                        await websocket.send(json.dumps({"command": "list"}))
+                        await asyncio.sleep(poll_interval)
+
+                poller = asyncio.create_task(poll())
+                async for message in websocket:
+                    received += len(message)
+                poller.cancel()
+
+    tasks = [asyncio.create_task(client()) for _ in range(count)]
+    await all_connected.wait()
+    print("ready", flush=True)
+    await asyncio.sleep(duration)
+    print(received, flush=True)
+    for task in tasks:
+        task.cancel()
+
+
+async def run(mode, clients, rooms, duration, poll_interval, churn_interval, port):
+    main_server = MainServer(host="127.0.0.1", port=port, rooms="shared", room_ttl=0)
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    for _ in range(rooms):
+        await main_server.create_echo_server()
+
+    async def churn():
+        while True:
+            await asyncio.sleep(churn_interval)
+            await main_server.create_echo_server()
+            await main_server.close_room(min(main_server.echo_servers))
+
+    received = 0
+    if clients:
+        child = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "networking.bench_lobby_list",
+            "--child",
+            mode,
+            "--clients",
+            str(clients),
+            "--duration",
+            str(duration),
+            "--poll-interval",
+            str(poll_interval),
+            "--port",
+            str(port),
+            stdout=asyncio.subprocess.PIPE,
+        )
+        await child.stdout.readline()
+    churn_task = asyncio.create_task(churn()) if churn_interval else None
+    cpu_started = time.process_time()
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - cpu_started
+    if churn_task is not None:
+        churn_task.cancel()
+    if clients:
+        received = int(await child.stdout.readline())
+        await child.wait()
+    server_task.cancel()
+    return {"cpu_pct": cpu / duration * 100, "kb_per_s": received / duration / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lobby room list benchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[0, 500, 1000, 2000])
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--poll-interval", type=float, default=0.33)
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=1.0,
+        help="Seconds between room changes (0: none)",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--child", choices=("poll", "subscribe"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    if args.child:
+        address = f"ws://127.0.0.1:{args.port}"
+        asyncio.run(
+            idle_clients(
+                address,
+                args.clients[0],
+                args.child,
+                args.poll_interval,
+                args.duration,
+            )
+        )
+        return
+
+    print(f"{'mode':<10} {'clients':>7} {'lobby cpu %':>12} {'client KB/s':>12}")
+    run_index = 0
+    for clients in args.clients:
+        for mode in ("poll", "subscribe"):
+            # Fresh ports per run; room ports are taken above the lobby's.
+            port = args.port + run_index * 1000
+            run_index += 1
+            r = asyncio.run(
+                run(
+                    mode,
+                    clients,
+                    args.rooms,
+                    args.duration,
+                    args.poll_interval,
+                    args.churn,
+                    port,
+                )
+            )
+            print(
+                f"{mode:<10} {clients:>7} {r['cpu_pct']:>12.1f} {r['kb_per_s']:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
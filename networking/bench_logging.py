@@ -0,0 +1,139 @@
+"""
+Cost of per-message logging on the calling thread.
+
+Logs ``--records`` per-message INFO lines ("Received message from ...") to a
+file with each networking.logs configuration and reports how long every call
+blocked the caller (the event loop, in a server), plus the lines that reached
+the file. ``--sink-latency-ms`` makes every write block that long, like a
+terminal, a pipe to a busy log collector or a slow disk. A second table
+shows a disabled DEBUG call with an f-string argument against the lazy
+%-style form.
+
+Usage (from the repository root):
+    python -m networking.bench_logging --records 20000
+    python -m networking.bench_logging --records 2000 --rate 1000 --sink-latency-ms 0.5
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from networking import logs
+
+CASES = (
+    ("sync", {}),
+    ("queue", {"queue": True}),
+    ("queue + sample 10/s", {"queue": True, "sample": {"bench.messages": 10.0}}),
+)
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, path, latency):
+        super().__init__(path, mode="w")
+        self.latency = latency
+
+    def emit(self, record):
+        super().emit(record)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_case(options, path, configure_options):
+    logs.configure(
+        handlers=[SlowFileHandler(path, options.sink_latency_ms / 1000)],
+        **configure_options,
+    )
+    log = logging.getLogger("bench.messages")
+    client = "127.0.0.1:50000"
+    message = "x" * options.size
+    timings = []
+    started = time.perf_counter()
+    for i in range(options.records):
+        call_started = time.perf_counter_ns()
+        log.info("Received message from %s: %s %d", client, message, i)
+        timings.append(time.perf_counter_ns() - call_started)
+        if options.rate:
+            time.sleep(1 / options.rate)
+    logged = time.perf_counter() - started
+    logs.stop()
+    written = time.perf_counter() - started
+    logs.configure(level=logging.CRITICAL, handlers=[logging.NullHandler()])
+    with open(path) as f:
+        lines = sum(1 for _ in f)
+    timings.sort()
+    return {
+        "mean": statistics.fmean(timings) / 1000,
+        "p50": percentile(timings, 0.5) / 1000,
+        "p99": percentile(timings, 0.99) / 1000,
+        "max": timings[-1] / 1000,
+        "lines": lines,
+        "logged": logged,
+        "written": written,
+    }
+
+
+def disabled_cost(count=200000):
+    logs.configure(level=logging.WARNING, handlers=[logging.NullHandler()])
+    log = logging.getLogger("bench.messages")
+    data = {"command": "message", "message": "x" * 64, "seq": 1}
+    started = time.perf_counter()
+    for _ in range(count):
+        log.debug(f"Received message: {data}")
+    eager = (time.perf_counter() - started) / count
+    started = time.perf_counter()
+    for _ in range(count):
+        log.debug("Received message: %s", data)
+    lazy = (time.perf_counter() - started) / count
+    return eager, lazy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=100, help="Message bytes")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Records per second to log at (0 logs as fast as possible)",
+    )
+    parser.add_argument(
+        "--sink-latency-ms",
+        type=float,
+        default=0,
+        help="Time every log write blocks for",
+    )
+    options = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        print(
+            f"{'mode':<22} {'mean us':>8} {'p50 us':>7} {'p99 us':>7} "
+            f"{'max us':>8} {'lines':>7} {'logged s':>9} {'written s':>10}"
+        )
+        for name, configure_options in CASES:
+            result = run_case(options, path, configure_options)
+            print(
+                f"{name:<22} {result['mean']:>8.2f} {result['p50']:>7.2f} "
+                f"{result['p99']:>7.2f} {result['max']:>8.0f} {result['lines']:>7} "
+                f"{result['logged']:>9.2f} {result['written']:>10.2f}"
+            )
+    finally:
+        os.unlink(path)
+
+    eager, lazy = disabled_cost()
+    print()
+    print(f"disabled debug, f-string   {eager * 1e9:>6.0f} ns/call")
+    print(f"disabled debug, %-style    {lazy * 1e9:>6.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measures the cost of metrics on the room hot path.
+
+One stand-in client streams chat messages into an EchoServer; every message
+goes through handle_client, broadcast and each recipient's writer task,
+exactly as on a live room. Clients are in-process stand-ins whose ``send``
+does nothing, so the figures are the server's own CPU per message. Each mode
+runs several times, alternating, and the best run is kept.
+
+Usage (from the repository root):
+    python -m networking.bench_metrics --clients 2 50 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from networking import metrics
+from networking.game_server import EchoServer
+
+
+class StubClient:
+    def __init__(self, messages=()):
+        self.remote_address = ("127.0.0.1", 0)
+        self.messages = messages
+
+    async def send(self, message, text=None):
+        pass
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+    async def __aiter__(self):
+        for message in self.messages:
+            yield message
+            # Let the writer tasks drain before the next message.
+            await asyncio.sleep(0)
+
+
+async def run(client_count, message_count):
+    server = EchoServer("127.0.0.1", 0, send_queue_size=64)
+    for _ in range(client_count - 1):
+        server.add_client(StubClient())
+    message = json.dumps({"message": "x" * 32})
+    sender = StubClient([message] * message_count)
+    started = time.process_time()
+    await server.handle_client(sender)
+    cpu = time.process_time() - started
+    for websocket in list(server.clients):
+        server.remove_client(websocket)
+    return cpu / message_count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics overhead benchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[2, 50, 200])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'clients':>7} {'off us/msg':>11} {'on us/msg':>10} {'overhead':>9}")
+    for client_count in args.clients:
+        best = {"off": float("inf"), "on": float("inf")}
+        for _ in range(args.repeat):
+            for mode in best:
+                metrics.registry = metrics.Metrics() if mode == "on" else None
+                cost = asyncio.run(run(client_count, args.messages))
+                best[mode] = min(best[mode], cost)
+        overhead = (best["on"] / best["off"] - 1) * 100
+        print(
+            f"{client_count:>7} {best['off']:>11.1f} {best['on']:>10.1f} "
+            f"{overhead:>8.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
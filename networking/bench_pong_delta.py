@@ -0,0 +1,143 @@
+"""
+Bytes per game state with and without delta compression.
+
+Runs a PongServer in this process with two players joined over
+websockets, for each codec in ``--codecs`` and each mode:
+
+- full: players never ack, so every state is sent whole, as before
+  delta compression
+- delta: players ack every state as it arrives
+- lagged: players ack ``--ack-delay`` ms late, so deltas are taken
+  against older baselines; past STATE_HISTORY states they are full again
+
+The table shows per player the bytes per state frame and per second, the
+share of full states, and whether every state the players rebuilt
+matched the one the server sent.
+
+Usage (from the repository root):
+    python -m networking.bench_pong_delta --codecs json msgpack --ack-delay 100 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import websockets
+
+from networking.codec import CODECS, JSON
+from pong_server.main import PongServer
+
+
+async def measure(options, codec, ack_delay):
+    server = PongServer("127.0.0.1", options.port)
+    server.send_rate = options.send_rate
+    server_task = asyncio.create_task(server.start())
+    await asyncio.sleep(0.1)
+    url = f"ws://127.0.0.1:{options.port}"
+    subprotocols = [codec.subprotocol] if codec is not JSON else None
+    players = [
+        await websockets.connect(url, subprotocols=subprotocols, compression=None)
+        for _ in range(2)
+    ]
+    for player in players:
+        await player.send(codec.encode({"ask_name": True}), text=codec.text)
+    stats = {"frames": 0, "bytes": 0, "full": 0, "wrong": 0}
+    counting = False
+
+    async def ack(player, seq):
+        if ack_delay:
+            await asyncio.sleep(ack_delay / 1000)
+        try:
+            await player.send(codec.encode({"ack": seq}), text=codec.text)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def receive(player):
+        states = {}
+        async for message in player:
+            data = codec.decode(message)
+            if "seq" not in data:
+                continue
+            seq = data.pop("seq")
+            base = data.pop("base", None)
+            if base is None:
+                state = data
+            else:
+                state = {name: dict(fields) for name, fields in states[base].items()}
+                for name, fields in data.items():
+                    state[name].update(fields)
+            states[seq] = state
+            if counting:
+                stats["frames"] += 1
+                stats["bytes"] += len(message)
+                stats["full"] += base is None
+                stats["wrong"] += state != server.state_history.get(seq, state)
+            if ack_delay is not None:
+                asyncio.create_task(ack(player, seq))
+
+    readers = [asyncio.create_task(receive(player)) for player in players]
+    while not server.game_running:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.5)
+    counting = True
+    started = time.monotonic()
+    await asyncio.sleep(options.duration)
+    elapsed = time.monotonic() - started
+    counting = False
+    server.running = False
+    for player in players:
+        await player.close()
+    for reader in readers:
+        reader.cancel()
+    server.server.close()
+    await server_task
+    frames = max(stats["frames"], 1)
+    return {
+        "per_frame": stats["bytes"] / frames,
+        "per_second": stats["bytes"] / len(players) / elapsed,
+        "full": stats["full"] / frames * 100,
+        "correct": stats["wrong"] == 0,
+    }
+
+
+async def run(options):
+    modes = [("full", None), ("delta", 0)]
+    modes += [(f"lagged {delay:g}ms", delay) for delay in options.ack_delay]
+    print(
+        f"{'codec':<8} {'mode':<15} {'bytes/state':>11} {'bytes/s':>8} "
+        f"{'full %':>7} {'correct':>8}"
+    )
+    for name in options.codecs:
+        codec = CODECS[f"pygbag.{name}"]
+        for mode, ack_delay in modes:
+            result = await measure(options, codec, ack_delay)
+            print(
+                f"{name:<8} {mode:<15} {result['per_frame']:>11.1f} "
+                f"{result['per_second']:>8.0f} {result['full']:>7.1f} "
+                f"{str(result['correct']):>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pong delta compression benchmark")
+    parser.add_argument(
+        "--codecs", nargs="+", choices=("json", "msgpack"), default=["json"]
+    )
+    parser.add_argument(
+        "--ack-delay",
+        type=float,
+        nargs="*",
+        default=[100, 2000],
+        help="Milliseconds players hold each ack in the lagged modes",
+    )
+    parser.add_argument("--send-rate", type=float, default=PongServer.send_rate)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=9400)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Size and cost of each Pong game state format.
+
+Plays ``--states`` game states of a match offline with PongServer.step(),
+taking one every sim_rate / ``--send-rate`` steps, and for each format
+measures:
+
+- bytes per state and per second at ``--send-rate``
+- encode: server time per state, from the state dict to the frame
+- decode: client time per state, from the frame to the state dict the
+  game draws, with the multiplayer_pong client's own code for packed
+  states (delta decoding includes merging onto the baseline)
+- the largest position error the format introduces
+
+Delta formats take each state against the one before it, as for a player
+that acks every state. Times are CPython on this machine; the pygbag
+client runs CPython compiled to WebAssembly, typically a few times slower.
+
+Usage (from the repository root):
+    python -m networking.bench_pong_packed --states 20000
+    python -m networking.bench_pong_packed --sim-rate 97
+"""
+
+import argparse
+import base64
+import time
+
+from multiplayer_pong import packed_state
+from networking.codec import JSON, MSGPACK
+from pong_server.main import PongServer, copy_state, pack_state, state_delta
+
+
+def play(options):
+    server = PongServer("127.0.0.1", 0)
+    server.sim_rate = options.sim_rate
+    server.random.seed(1)
+    server.ball_vel = server.serve_velocity()
+    steps = round(server.sim_rate / options.send_rate)
+    states = []
+    for _ in range(options.states):
+        for _ in range(steps):
+            server.step()
+        states.append(copy_state(server.game_state))
+    return states
+
+
+def merge(base, delta):
+    state = {name: dict(fields) for name, fields in base.items()}
+    for name, fields in delta.items():
+        state[name].update(fields)
+    return state
+
+
+def position_error(state, decoded):
+    return max(
+        abs(state["player_0"]["pos"] - decoded["player_0"]["pos"]),
+        abs(state["player_1"]["pos"] - decoded["player_1"]["pos"]),
+        abs(state["ball"]["pos"][0] - decoded["ball"]["pos"][0]),
+        abs(state["ball"]["pos"][1] - decoded["ball"]["pos"][1]),
+    )
+
+
+def formats():
+    def full(codec):
+        def encode(seq, state, previous):
+            return codec.encode({"seq": seq, **state})
+
+        def decode(frame, previous):
+            data = codec.decode(frame)
+            del data["seq"]
+            return data
+
+        return encode, decode
+
+    def delta(codec):
+        def encode(seq, state, previous):
+            return codec.encode(
+                {"seq": seq, "base": seq - 1, **state_delta(previous, state)}
+            )
+
+        def decode(frame, previous):
+            data = codec.decode(frame)
+            del data["seq"], data["base"]
+            return merge(previous, data)
+
+        return encode, decode
+
+    def packed_text():
+        def encode(seq, state, previous):
+            return base64.b64encode(pack_state(seq, state)) + b"\n"
+
+        def decode(frame, previous):
+            # The pygbag client gets the line as text without its newline.
+            return packed_state.unpack_state(frame[:-1].decode("ascii"))[1]
+
+        return encode, decode
+
+    def packed_binary():
+        def encode(seq, state, previous):
+            return pack_state(seq, state)
+
+        def decode(frame, previous):
+            return packed_state.decode_packet(frame)[1]
+
+        return encode, decode
+
+    return {
+        "json full": full(JSON),
+        "json delta": delta(JSON),
+        "msgpack full": full(MSGPACK),
+        "msgpack delta": delta(MSGPACK),
+        "packed text": packed_text(),
+        "packed binary": packed_binary(),
+    }
+
+
+def measure(states, encode, decode):
+    started = time.perf_counter()
+    frames = [
+        encode(seq, state, states[seq - 1]) for seq, state in enumerate(states[1:], 1)
+    ]
+    encode_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    decoded = [decode(frame, states[seq - 1]) for seq, frame in enumerate(frames, 1)]
+    decode_seconds = time.perf_counter() - started
+    return {
+        "bytes": sum(len(frame) for frame in frames) / len(frames),
+        "encode": encode_seconds / len(frames) * 1e6,
+        "decode": decode_seconds / len(frames) * 1e6,
+        "error": max(
+            position_error(state, result) for state, result in zip(states[1:], decoded)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pong state format benchmark")
+    parser.add_argument("--states", type=int, default=20000)
+    parser.add_argument(
+        "--sim-rate",
+        type=float,
+        default=PongServer.sim_rate,
+        help="Rates other than 120 put the ball between fixed-point steps",
+    )
+    parser.add_argument("--send-rate", type=float, default=PongServer.send_rate)
+    options = parser.parse_args()
+    states = play(options)
+    print(
+        f"{'format':<14} {'bytes/state':>11} {'bytes/s':>8} {'encode us':>10} "
+        f"{'decode us':>10} {'max error px':>13}"
+    )
+    for name, (encode, decode) in formats().items():
+        result = measure(states, encode, decode)
+        print(
+            f"{name:<14} {result['bytes']:>11.1f} "
+            f"{result['bytes'] * options.send_rate:>8.0f} "
+            f"{result['encode']:>10.2f} {result['decode']:>10.2f} "
+            f"{result['error']:>13.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
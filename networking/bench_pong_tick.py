@@ -0,0 +1,131 @@
+"""
+Pong state bandwidth and physics at different send rates and loop loads.
+
+Runs a PongServer in this process with two players joined over
+websockets, once per ``--send-rates`` value and once per ``--stalls``
+value. A stall blocks the event loop for that many milliseconds every
+``--stall-every`` seconds, like a busy neighbour room. The table shows
+per player: state frames and bytes per second, physics steps per second
+(should stay at ``--sim-rate``), steps skipped after stalls longer than
+``--max-catch-up``, and whether replaying the same number of steps from
+the same seed offline ends with the same ball and scores.
+
+Usage (from the repository root):
+    python -m networking.bench_pong_tick --send-rates 120 30 --stalls 0 20 60
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import websockets
+
+from pong_server.main import PongServer
+
+SEED = 1
+
+
+async def measure(options, send_rate, stall_ms):
+    server = PongServer("127.0.0.1", options.port)
+    server.sim_rate = options.sim_rate
+    server.send_rate = send_rate
+    server.max_catch_up = options.max_catch_up
+    server.random.seed(SEED)
+    server.ball_vel = server.serve_velocity()
+    server_task = asyncio.create_task(server.start())
+    await asyncio.sleep(0.1)
+    url = f"ws://127.0.0.1:{options.port}"
+    players = [await websockets.connect(url, compression=None) for _ in range(2)]
+    for player in players:
+        await player.send(json.dumps({"ask_name": True}))
+    counts = [[0, 0] for _ in players]
+    counting = False
+
+    async def receive(index, player):
+        async for message in player:
+            if counting:
+                counts[index][0] += 1
+                counts[index][1] += len(message)
+
+    async def stall():
+        while True:
+            await asyncio.sleep(options.stall_every)
+            time.sleep(stall_ms / 1000)
+
+    readers = [asyncio.create_task(receive(i, p)) for i, p in enumerate(players)]
+    while not server.game_running:
+        await asyncio.sleep(0.01)
+    staller = asyncio.create_task(stall()) if stall_ms else None
+    await asyncio.sleep(0.5)
+    counting = True
+    steps = server.steps
+    started = time.monotonic()
+    await asyncio.sleep(options.duration)
+    elapsed = time.monotonic() - started
+    steps = server.steps - steps
+    counting = False
+    if staller is not None:
+        staller.cancel()
+    server.running = False
+    for player in players:
+        await player.close()
+    for reader in readers:
+        reader.cancel()
+    server.server.close()
+    await server_task
+
+    replayed = PongServer("127.0.0.1", options.port)
+    replayed.sim_rate = options.sim_rate
+    replayed.random.seed(SEED)
+    replayed.ball_vel = replayed.serve_velocity()
+    for _ in range(server.steps):
+        replayed.step()
+    return {
+        "frames": sum(frames for frames, _ in counts) / len(counts) / elapsed,
+        "bytes": sum(size for _, size in counts) / len(counts) / elapsed,
+        "steps": steps / elapsed,
+        "skipped": server.skipped_steps,
+        "identical": replayed.game_state == server.game_state
+        and replayed.ball_vel == server.ball_vel,
+    }
+
+
+async def run(options):
+    print(
+        f"{'send Hz':>7} {'stall ms':>8} {'frames/s':>9} {'bytes/s':>9} "
+        f"{'steps/s':>8} {'skipped':>8} {'identical':>10}"
+    )
+    for send_rate in options.send_rates:
+        for stall_ms in options.stalls:
+            result = await measure(options, send_rate, stall_ms)
+            print(
+                f"{send_rate:>7g} {stall_ms:>8g} {result['frames']:>9.1f} "
+                f"{result['bytes']:>9.0f} {result['steps']:>8.1f} "
+                f"{result['skipped']:>8} {str(result['identical']):>10}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pong tick rate benchmark")
+    parser.add_argument("--sim-rate", type=float, default=PongServer.sim_rate)
+    parser.add_argument("--send-rates", type=float, nargs="+", default=[120, 30])
+    parser.add_argument(
+        "--stalls",
+        type=float,
+        nargs="+",
+        default=[0, 20, 60],
+        help="Milliseconds the event loop is blocked for at a time",
+    )
+    parser.add_argument("--stall-every", type=float, default=0.1)
+    parser.add_argument("--max-catch-up", type=float, default=PongServer.max_catch_up)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=9400)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Shows how one flooding client affects a neighbouring room, with and without
+per-connection rate limits.
+
+The lobby runs in shared mode, so every room lives on one event loop. Room A
+holds ``--listeners`` clients plus one abuser that sends chat messages as
+fast as the connection allows. Room B holds a prober that sends a message
+every 50 ms and times the round trip to its own echo. Abuser and prober run
+in separate child processes so neither slows the other down.
+
+Rows: no abuser (baseline), abuser without limits, and abuser with the
+default echo limit under each action. The "limited" column is the number of
+rate limiter decisions recorded in room A's metrics.
+
+Usage (from the repository root):
+    python -m networking.bench_ratelimit --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+
+import websockets
+
+from networking import metrics
+from networking.game_server import MainServer
+from networking.ratelimit import DEFAULT_LIMITS, RateLimit
+
+
+async def flood(address, listeners, duration):
+    async def listener():
+        async with websockets.connect(address) as websocket:
+            async for _ in websocket:
+                pass
+
+    async def abuser():
+        payload = json.dumps({"message": "x" * 64})
+        deadline = time.perf_counter() + duration
+        try:
+            async with websockets.connect(address) as websocket:
+                while time.perf_counter() < deadline:
+                    await websocket.send(payload)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    tasks = [asyncio.create_task(listener()) for _ in range(listeners)]
+    await asyncio.sleep(0.5)
+    await abuser()
+    for task in tasks:
+        task.cancel()
+
+
+async def probe(address, duration):
+    latencies = []
+    async with websockets.connect(address) as websocket:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await websocket.send(json.dumps({"message": started}))
+            await websocket.recv()
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.05)
+    latencies.sort()
+    print(
+        json.dumps(
+            {
+                "p50": statistics.median(latencies),
+                "p99": latencies[int(len(latencies) * 0.99)],
+            }
+        )
+    )
+
+
+async def run(rate_limit, abuse, listeners, duration, port):
+    metrics.registry = metrics.Metrics()
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=port,
+        rooms="shared",
+        room_ttl=0,
+        room_options={"rate_limit": rate_limit},
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    room_a = await main_server.create_echo_server()
+    room_b = await main_server.create_echo_server()
+
+    children = []
+    if abuse:
+        children.append(
+            await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "networking.bench_ratelimit",
+                "--flood",
+                room_a,
+                "--listeners",
+                str(listeners),
+                "--duration",
+                str(duration + 1),
+            )
+        )
+        await asyncio.sleep(1.0)
+    prober = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "networking.bench_ratelimit",
+        "--probe",
+        room_b,
+        "--duration",
+        str(duration),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    result = json.loads(await prober.stdout.readline())
+    await prober.wait()
+    for child in children:
+        await child.wait()
+    room_metrics = metrics.registry.rooms["1"]
+    result["abuser_msgs"] = room_metrics.messages_in
+    result["limited"] = sum(room_metrics.limited.values())
+    await main_server.shutdown()
+    await server_task
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limit isolation benchmark")
+    parser.add_argument("--listeners", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--flood", help=argparse.SUPPRESS)
+    parser.add_argument("--probe", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if args.flood:
+        asyncio.run(flood(args.flood, args.listeners, args.duration))
+        return
+    if args.probe:
+        asyncio.run(probe(args.probe, args.duration))
+        return
+
+    echo = DEFAULT_LIMITS["echo"]
+    cases = [("baseline", None, False), ("no limit", None, True)]
+    for action in ("drop", "delay", "disconnect"):
+        limit = RateLimit(echo.rate, echo.burst, echo.max_size, action)
+        cases.append((f"limit {action}", limit, True))
+
+    print(
+        f"{'case':<17} {'room B p50 ms':>14} {'p99 ms':>8} "
+        f"{'abuser msgs':>12} {'limited':>8}"
+    )
+    for i, (name, limit, abuse) in enumerate(cases):
+        r = asyncio.run(run(limit, abuse, args.listeners, args.duration, args.port + i))
+        print(
+            f"{name:<17} {r['p50']:>14.2f} {r['p99']:>8.2f} "
+            f"{r['abuser_msgs']:>12} {r['limited']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
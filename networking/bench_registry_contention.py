@@ -0,0 +1,113 @@
+"""
+Lobby contention benchmark: list/join throughput while rooms are created.
+
+A number of lobby clients spam ``list`` and ``join`` over real websocket
+connections while "creator" clients keep issuing ``create`` as fast as the
+lobby answers. With the room registry published as copy-on-write snapshots,
+readers never wait behind a create, so list/join throughput should fall
+only with the extra CPU work, not with lock convoys.
+
+Usage (from the repository root):
+    python -m networking.bench_registry_contention --creators 0 4 16
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+import websockets
+
+from networking.game_server import MainServer
+
+
+async def reader(address, deadline, latencies):
+    async with websockets.connect(address) as websocket:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await websocket.send(json.dumps({"command": "list"}))
+            rooms = json.loads(await websocket.recv())["servers"]
+            if rooms:
+                server_id = rooms[len(latencies) % len(rooms)]["id"]
+                await websocket.send(
+                    json.dumps({"command": "join", "server_id": server_id})
+                )
+                await websocket.recv()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def creator(main_server, address, deadline, created, max_rooms):
+    async with websockets.connect(address) as websocket:
+        while time.perf_counter() < deadline:
+            await websocket.send(json.dumps({"command": "create"}))
+            await websocket.recv()
+            created.append(1)
+            # Retire the oldest rooms so list replies stay the same size and
+            # the numbers measure contention rather than a growing payload.
+            while len(main_server.echo_servers) > max_rooms:
+                await main_server.close_room(min(main_server.echo_servers))
+
+
+async def run(readers, creators, duration, port, mode, max_rooms):
+    main_server = MainServer(
+        host="127.0.0.1", port=port, rooms=mode, room_base_port=port + 1
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    address = f"ws://127.0.0.1:{port}"
+    for _ in range(8):
+        await main_server.create_echo_server()
+
+    latencies, created = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        *(reader(address, deadline, latencies) for _ in range(readers)),
+        *(
+            creator(main_server, address, deadline, created, max_rooms)
+            for _ in range(creators)
+        ),
+    )
+    server_task.cancel()
+    for server_id in list(main_server.echo_servers):
+        await main_server.close_room(server_id)
+    latencies.sort()
+    return {
+        "ops_per_s": len(latencies) / duration,
+        "creates_per_s": len(created) / duration,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "rooms": main_server.room_counters["created"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room registry contention benchmark")
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--creators", type=int, nargs="+", default=[0, 4, 16])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=("shared", "thread"), default="shared")
+    parser.add_argument("--max-rooms", type=int, default=64)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(
+        f"{'creators':>8} {'list+join/s':>12} {'creates/s':>10} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'rooms':>6}"
+    )
+    for i, creators in enumerate(args.creators):
+        # Each run gets fresh ports; room ports are taken above the lobby's.
+        port = args.port + i * 1000
+        r = asyncio.run(
+            run(args.readers, creators, args.duration, port, args.mode, args.max_rooms)
+        )
+        print(
+            f"{creators:>8} {r['ops_per_s']:>12.0f} {r['creates_per_s']:>10.0f} "
+            f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rooms']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Room lifecycle soak: create rooms, visit them, leave and let the reaper
+clean up, over and over. Resident memory, thread count and open file
+descriptors should stay flat once the interpreter has warmed up; a leak in
+room teardown shows up as a steady climb.
+
+Usage (from the repository root):
+    python -m networking.bench_room_soak --mode thread --cycles 20 --rooms 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+
+import websockets
+
+from networking.bench_rooms import open_fds, rss_bytes
+from networking.game_server import MainServer
+
+
+async def visit(address):
+    async with websockets.connect(address) as websocket:
+        await websocket.send(json.dumps({"message": "hello"}))
+        await websocket.recv()
+
+
+async def visit_all(addresses):
+    await asyncio.gather(*(visit(address) for address in addresses))
+
+
+async def soak(mode, cycles, rooms_per_cycle, port, ttl):
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=port,
+        rooms=mode,
+        room_ttl=ttl,
+        reap_interval=ttl / 2,
+        room_base_port=port + 1,
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+
+    print(
+        f"{'cycle':>5} {'rss MB':>8} {'threads':>8} {'fds':>5} {'live':>5} {'reaped':>7}"
+    )
+    for cycle in range(cycles):
+        addresses = [
+            await main_server.create_echo_server() for _ in range(rooms_per_cycle)
+        ]
+        if mode == "thread":
+            await asyncio.sleep(0.2)
+        # Clients run in a child process so their memory is not counted.
+        visitor = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "networking.bench_room_soak", "--visit", *addresses
+        )
+        await visitor.wait()
+        while main_server.room_stats()["live"]:
+            await asyncio.sleep(ttl / 2)
+        stats = main_server.room_stats()
+        print(
+            f"{cycle:>5} {rss_bytes() / 2**20:>8.1f} {threading.active_count():>8} "
+            f"{open_fds():>5} {stats['live']:>5} {stats['reaped']:>7}"
+        )
+    server_task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room lifecycle soak test")
+    parser.add_argument("--mode", choices=("thread", "shared"), default="thread")
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttl", type=float, default=1.0)
+    parser.add_argument("--visit", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.visit:
+        asyncio.run(visit_all(args.visit))
+        return
+    asyncio.run(soak(args.mode, args.cycles, args.rooms, args.port, args.ttl))
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares the thread-per-room and shared-loop room modes of MainServer.
+
+Each mode runs in a fresh interpreter so the numbers do not bleed into each
+other. For every room count the child process creates that many rooms,
+waits until they are ready to accept connections and reports resident
+memory, thread count and open file descriptors.
+
+Usage (from the repository root):
+    python -m networking.bench_rooms --rooms 100 500 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from networking.game_server import MainServer
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+async def measure(mode, room_count, port):
+    main_server = MainServer(host="127.0.0.1", port=port, rooms=mode)
+    base_rss = rss_bytes()
+    base_fds = open_fds()
+    started = time.perf_counter()
+    for _ in range(room_count):
+        await main_server.create_echo_server()
+
+    # Thread mode binds each room asynchronously on its own loop; wait until
+    # every room has a listening socket before measuring.
+    if mode == "thread":
+        while any(
+            server.server is None for server, _ in main_server.echo_servers.values()
+        ):
+            await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    rss_delta = rss_bytes() - base_rss
+    return {
+        "mode": mode,
+        "rooms": room_count,
+        "create_seconds": round(elapsed, 3),
+        "threads": threading.active_count(),
+        "listening_fds": open_fds() - base_fds,
+        "rss_delta_mb": round(rss_delta / 2**20, 2),
+        "bytes_per_room": rss_delta // max(room_count, 1),
+    }
+
+
+def run_child(mode, room_count, port):
+    result = asyncio.run(measure(mode, room_count, port))
+    print(json.dumps(result))
+    sys.stdout.flush()
+    # Thread-mode rooms never stop on their own; skip interpreter teardown.
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room hosting benchmark")
+    parser.add_argument("--rooms", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--modes", nargs="+", default=["thread", "shared"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "ROOMS"))
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), args.port)
+        return
+
+    print(
+        f"{'mode':<8} {'rooms':>6} {'create s':>9} {'threads':>8} {'fds':>6} {'rss MB':>8} {'B/room':>9}"
+    )
+    for room_count in args.rooms:
+        for mode in args.modes:
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "networking.bench_rooms",
+                    "--port",
+                    str(args.port),
+                    "--child",
+                    mode,
+                    str(room_count),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{r['mode']:<8} {r['rooms']:>6} {r['create_seconds']:>9} {r['threads']:>8} "
+                f"{r['listening_fds']:>6} {r['rss_delta_mb']:>8} {r['bytes_per_room']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Memory cost of idle connections.
+
+Opens ``--clients`` idle websocket connections (from ``--processes`` child
+processes, at most ``--concurrency`` handshakes in flight each) to rooms of
+``--room-size`` on a shared-mode lobby, then reports the server process's
+resident memory growth per connection. Python heap growth per connection
+(tracemalloc) and the size of one session record on its own are shown too;
+the rest of each connection is websockets' connection object, its handler
+task and buffers.
+
+Budget: 10k idle sessions per process within 300 MB of RSS growth
+(30 KB per connection) with room compression off. permessage-deflate keeps
+zlib state for every connection on top of that, about 33 KB each.
+
+Usage (from the repository root):
+    python -m networking.bench_session_memory --clients 10000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+
+import websockets
+
+from networking.bench_rooms import rss_bytes
+from networking.game_server import ClientSession, MainServer
+
+BUDGET_BYTES = 30 * 1024
+
+
+class StubConnection:
+    subprotocol = None
+    remote_address = ("127.0.0.1", 0)
+
+    async def send(self, message, text=None):
+        pass
+
+
+async def hold(options, first, count):
+    limit = asyncio.Semaphore(options.concurrency)
+    connected = 0
+    done = asyncio.Event()
+
+    async def client(index):
+        nonlocal connected
+        room = index // options.room_size + 1
+        address = f"ws://127.0.0.1:{options.port}/room/{room}"
+        async with limit:
+            websocket = await websockets.connect(
+                address,
+                open_timeout=120,
+                ping_interval=None,
+                compression=None if options.compression == "none" else "deflate",
+            )
+        connected += 1
+        if connected == count:
+            print(json.dumps({"connected": connected}), flush=True)
+        await done.wait()
+        await websocket.close()
+
+    tasks = [asyncio.create_task(client(i)) for i in range(first, first + count)]
+    # The parent closes our stdin once it has measured.
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+    done.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def record_bytes(count=10000):
+    """tracemalloc size of ``count`` idle ClientSession records."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [ClientSession(StubConnection()) for _ in range(count)]
+    await asyncio.sleep(0)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for session in sessions:
+        session.close()
+    return (after - before) / count
+
+
+async def run(options):
+    per_record = await record_bytes()
+    main_server = MainServer(
+        host="127.0.0.1",
+        port=options.port,
+        rooms="shared",
+        room_ttl=0,
+        room_options={
+            "compression": None if options.compression == "none" else "deflate"
+        },
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    for _ in range(-(-options.clients // options.room_size)):
+        await main_server.create_echo_server()
+
+    gc.collect()
+    rss_before = rss_bytes()
+    if options.tracemalloc:
+        tracemalloc.start()
+    share, extra = divmod(options.clients, options.processes)
+    children = []
+    first = 0
+    started = time.perf_counter()
+    for i in range(options.processes):
+        count = share + (1 if i < extra else 0)
+        children.append(
+            await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "networking.bench_session_memory",
+                "--hold",
+                f"{first},{count}",
+                *sys.argv[1:],
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+        )
+        first += count
+    for child in children:
+        await child.stdout.readline()
+    connect_time = time.perf_counter() - started
+    await asyncio.sleep(1)
+    gc.collect()
+    held = sum(len(room.clients) for room, _ in main_server.echo_servers.values())
+    rss_growth = rss_bytes() - rss_before
+    heap = tracemalloc.get_traced_memory()[0] if options.tracemalloc else None
+    for child in children:
+        child.stdin.close()
+        await child.wait()
+
+    print(f"idle connections held     {held} (opened in {connect_time:.1f} s)")
+    print(f"session record            {per_record:.0f} B")
+    if heap is not None:
+        print(f"python heap / connection  {heap / held:.0f} B")
+    print(f"RSS growth / connection   {rss_growth / held:.0f} B")
+    print(
+        f"RSS growth                {rss_growth / 2**20:.1f} MB "
+        f"(budget {BUDGET_BYTES * held / 2**20:.0f} MB: "
+        f"{'within' if rss_growth <= BUDGET_BYTES * held else 'OVER'})"
+    )
+    await main_server.shutdown()
+    await server_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idle connection memory benchmark")
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--room-size", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--compression", choices=("deflate", "none"), default="none")
+    parser.add_argument(
+        "--tracemalloc", action="store_true", help="Also trace the Python heap"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--hold", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if options.hold:
+        first, count = map(int, options.hold.split(","))
+        asyncio.run(hold(options, first, count))
+        return
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Room teardown benchmark: how long closing every room takes.
+
+Creates ``--rooms`` rooms, puts a client in every ``--occupied``-th one (the
+clients run in a child process and count the ``room_closing`` notices they
+receive), then closes all rooms the way ``nuke`` does. Reports the total
+wall time, per-room p50/max, how many clients were told the room was
+closing, and the thread and file descriptor counts left afterwards.
+``--sequential`` closes the rooms one after another, as ``nuke`` used to.
+
+Usage (from the repository root):
+    python -m networking.bench_shutdown --mode thread --rooms 1000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+
+import websockets
+
+from networking.bench_rooms import open_fds
+from networking.game_server import MainServer
+
+
+async def occupy(addresses):
+    notified = 0
+
+    async def client(address):
+        nonlocal notified
+        async with websockets.connect(address, open_timeout=60) as websocket:
+            async for message in websocket:
+                if "room_closing" in json.loads(message):
+                    notified += 1
+
+    tasks = [asyncio.create_task(client(address)) for address in addresses]
+    await asyncio.sleep(1.0)
+    print("ready", flush=True)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    print(notified, flush=True)
+
+
+async def close_sequentially(main_server):
+    started = time.perf_counter()
+    count = 0
+    for server_id in list(main_server.echo_servers):
+        count += await main_server.close_room(server_id)
+    return {
+        "rooms": count,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def run(mode, rooms, occupied, port, sequential):
+    main_server = MainServer(
+        host="127.0.0.1", port=port, rooms=mode, room_ttl=0, room_base_port=port + 1
+    )
+    server_task = asyncio.create_task(main_server.start())
+    await asyncio.sleep(0.2)
+    addresses = [await main_server.create_echo_server() for _ in range(rooms)]
+    if mode == "thread":
+        await asyncio.sleep(1.0)
+    fds_before, threads_before = open_fds(), threading.active_count()
+
+    occupants = addresses[::occupied] if occupied else []
+    child = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "networking.bench_shutdown",
+        "--occupy",
+        *occupants,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    await child.stdout.readline()
+
+    if sequential:
+        teardown = await close_sequentially(main_server)
+    else:
+        teardown = await main_server.close_rooms(list(main_server.echo_servers))
+    notified = int(await child.stdout.readline())
+    await child.wait()
+    await main_server.shutdown()
+    await server_task
+    return {
+        **teardown,
+        "clients": len(occupants),
+        "notified": notified,
+        "threads": f"{threads_before} -> {threading.active_count()}",
+        "fds": f"{fds_before} -> {open_fds()}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room teardown benchmark")
+    parser.add_argument("--mode", choices=("thread", "shared"), default="thread")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument(
+        "--occupied", type=int, default=2, help="Put a client in every Nth room"
+    )
+    parser.add_argument("--sequential", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--occupy", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.occupy is not None:
+        asyncio.run(occupy(args.occupy))
+        return
+    print(
+        json.dumps(
+            asyncio.run(
+                run(args.mode, args.rooms, args.occupied, args.port, args.sequential)
+            )
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cost of room and match snapshots, and how fast a restart restores them.
+
+Builds ``--rooms`` shared-mode rooms on a MainServer and ``--matches``
+PongServer matches on a PongLobby, without starting any listeners. Then
+snapshots each ``--snapshots`` times. The table shows:
+
+- capture: time on the event loop per snapshot
+- write: time on the writer thread (encode, append, fsync)
+- size of one snapshot record
+- load: read and decode the file
+- restore: load the file and recreate every room or match in a fresh
+  server. Restored matches start their threads and listeners on ports
+  9000 and up, as they would on a real restart.
+
+Usage (from the repository root):
+    python -m networking.bench_snapshots --rooms 5000 --matches 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from networking import snapshots
+from networking.game_server import MainServer
+from pong_server.main import PongLobby, PongServer
+
+
+async def measure(options, path, build, restore):
+    writer = (await build(path)).snapshots
+    for _ in range(options.snapshots):
+        # Force a write every time, as if every room had changed.
+        writer.last_payload = None
+        await writer.save()
+    await writer.close(final=False)
+    started = time.perf_counter()
+    snapshots.load(path)
+    load_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    restored = await restore(path)
+    restore_ms = (time.perf_counter() - started) * 1000
+    return {
+        "capture": writer.capture_seconds / options.snapshots * 1000,
+        "write": writer.write_seconds / options.snapshots * 1000,
+        "bytes": writer.last_bytes,
+        "load": load_ms,
+        "restore": restore_ms,
+        "restored": restored,
+    }
+
+
+async def run(options):
+    directory = tempfile.mkdtemp()
+
+    async def build_rooms(path):
+        main_server = MainServer(
+            host="127.0.0.1", rooms="shared", room_ttl=0, snapshot_path=path
+        )
+        for server_id in range(1, options.rooms + 1):
+            await main_server.create_local_room(server_id)
+        return main_server
+
+    async def restore_rooms(path):
+        main_server = MainServer(
+            host="127.0.0.1", rooms="shared", room_ttl=0, snapshot_path=path
+        )
+        await main_server.restore_rooms()
+        return len(main_server.echo_servers)
+
+    async def build_matches(path):
+        lobby = PongLobby(
+            host="127.0.0.1", game_server_class=PongServer, snapshot_path=path
+        )
+        for server_id in range(options.matches):
+            server = PongServer("127.0.0.1", 9000 + server_id)
+            server.new_player_id = 2
+            server.seat_tokens = {"player_0": "a" * 16, "player_1": "b" * 16}
+            lobby.echo_servers[server_id] = (server, None)
+        lobby.next_server_id = options.matches
+        return lobby
+
+    async def restore_matches(path):
+        lobby = PongLobby(
+            host="127.0.0.1", game_server_class=PongServer, snapshot_path=path
+        )
+        snapshot = await asyncio.get_running_loop().run_in_executor(
+            None, snapshots.load, path
+        )
+        lobby.restore(snapshot)
+        restored = len(lobby.echo_servers)
+        for server, _ in lobby.echo_servers.values():
+            server.running = False
+        return restored
+
+    results = {
+        "rooms": await measure(
+            options, os.path.join(directory, "rooms.snap"), build_rooms, restore_rooms
+        ),
+        "pong": await measure(
+            options,
+            os.path.join(directory, "pong.snap"),
+            build_matches,
+            restore_matches,
+        ),
+    }
+    print(
+        f"{'state':<6} {'capture ms':>11} {'write ms':>9} {'bytes':>9} "
+        f"{'load ms':>8} {'restored':>9} {'restore ms':>11}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<6} {result['capture']:>11.2f} {result['write']:>9.2f} "
+            f"{result['bytes']:>9} {result['load']:>8.2f} {result['restored']:>9} "
+            f"{result['restore']:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot benchmark")
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument(
+        "--matches",
+        type=int,
+        default=200,
+        help="Pong matches; each restored match runs a thread of its own",
+    )
+    parser.add_argument("--snapshots", type=int, default=20)
+    options = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+    asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+TLS handshake benchmark, modelled on tsl_handshake_test.py.
+
+A server process accepts TLS connections on an asyncio loop (as the
+websocket servers do), writes two bytes and closes. ``--processes`` client
+processes open connections back to back for ``--duration`` seconds; in the
+"resumed" rows every client offers the session from its previous
+connection. Clients and server may share CPUs, so "server ms/hs" (the
+server process's CPU time per handshake) is the figure that tells what a
+handshake costs the server. Certificates (RSA-2048 and ECDSA P-256) are generated into a
+temporary directory with gen_certs.py.
+
+Rows: the bare SSLContext the servers used to build, then
+networking.tls.server_context with each certificate type, full and resumed.
+"hit rate" is the share of handshakes the client saw resumed; "server
+resumed" is what the server context counted.
+
+Usage (from the repository root):
+    python -m networking.bench_tls --duration 3 --processes 4
+    python -m networking.bench_tls --tls 1.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import socket
+import ssl
+import tempfile
+import time
+
+from gen_certs import generate_self_signed_cert
+from networking import tls
+
+
+def make_certs(directory):
+    paths = {}
+    for key_type in ("rsa", "ecdsa"):
+        cert = os.path.join(directory, f"{key_type}-cert.pem")
+        key = os.path.join(directory, f"{key_type}-key.pem")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_self_signed_cert(
+                "localhost", "US", "State", "City", key, cert, key_type=key_type
+            )
+        paths[key_type] = (cert, key)
+    return paths
+
+
+def build_context(kind, certs):
+    if kind == "bare":
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*certs["rsa"])
+        return context
+    cert, key = certs[kind]
+    return tls.server_context(cert, key)
+
+
+def serve(kind, certs, port, ready, stop, results):
+    context = build_context(kind, certs)
+
+    async def handle(reader, writer):
+        writer.write(b"ok")
+        try:
+            await writer.drain()
+        except OSError:
+            pass
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(
+            handle, "127.0.0.1", port, ssl=context, backlog=1024
+        )
+        ready.set()
+        cpu = time.process_time()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+        server.close()
+        stats = tls.resumption_stats(context)
+        stats["cpu"] = time.process_time() - cpu
+        results.put(stats)
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    asyncio.run(main())
+
+
+def connect(port, resume, version, duration, results):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.maximum_version = version
+    session = None
+    handshakes = reused = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            with context.wrap_socket(
+                sock, server_hostname="localhost", session=session
+            ) as conn:
+                # TLS 1.3 tickets arrive after the handshake.
+                conn.recv(2)
+                handshakes += 1
+                reused += conn.session_reused
+                if resume:
+                    session = conn.session
+    results.put((handshakes, reused))
+
+
+def run(kind, resume, certs, options, port):
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Event(), context.Event()
+    server_results, client_results = context.Queue(), context.Queue()
+    server = context.Process(
+        target=serve, args=(kind, certs, port, ready, stop, server_results)
+    )
+    server.start()
+    ready.wait()
+    version = ssl.TLSVersion.TLSv1_2 if options.tls == "1.2" else ssl.TLSVersion.TLSv1_3
+    clients = [
+        context.Process(
+            target=connect,
+            args=(port, resume, version, options.duration, client_results),
+        )
+        for _ in range(options.processes)
+    ]
+    for client in clients:
+        client.start()
+    counts = [client_results.get() for _ in clients]
+    for client in clients:
+        client.join()
+    stop.set()
+    server_stats = server_results.get()
+    server.join()
+    handshakes = sum(count[0] for count in counts)
+    reused = sum(count[1] for count in counts)
+    return handshakes, reused, server_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TLS handshake benchmark")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--tls", choices=("1.2", "1.3"), default="1.3")
+    parser.add_argument("--port", type=int, default=8765)
+    options = parser.parse_args()
+
+    cases = [
+        ("bare rsa", "bare", False),
+        ("tuned rsa", "rsa", False),
+        ("tuned rsa resumed", "rsa", True),
+        ("tuned ecdsa", "ecdsa", False),
+        ("tuned ecdsa resumed", "ecdsa", True),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        certs = make_certs(directory)
+        print(f"TLS {options.tls}, {options.processes} client processes")
+        print(
+            f"{'case':<20} {'handshakes/s':>13} {'hit rate':>9} "
+            f"{'server resumed':>15} {'server ms/hs':>13}"
+        )
+        for i, (name, kind, resume) in enumerate(cases):
+            handshakes, reused, server_stats = run(
+                kind, resume, certs, options, options.port + i
+            )
+            print(
+                f"{name:<20} {handshakes / options.duration:>13.0f} "
+                f"{reused / handshakes:>9.1%} {server_stats['resumed']:>15} "
+                f"{server_stats['cpu'] / handshakes * 1000:>13.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
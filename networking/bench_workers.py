@@ -0,0 +1,107 @@
+"""
+Measures echo throughput of a RoomWorkerPool as the number of workers grows.
+
+For every worker count the benchmark starts a pool, creates a few rooms per
+worker and drives them from separate client processes. Each client sends a
+message, waits for the next broadcast frame and repeats for the configured
+duration, so the reported figure is delivered frames per second across all
+rooms.
+
+Usage (from the repository root):
+    python -m networking.bench_workers --workers 1 2 4 8 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+
+import websockets
+
+from networking.game_server import RoomWorkerPool
+
+
+async def drive_clients(addresses, clients_per_room, duration):
+    completed = 0
+
+    async def client(address):
+        nonlocal completed
+        async with websockets.connect(address) as websocket:
+            deadline = time.perf_counter() + duration
+            payload = json.dumps({"message": "x" * 32})
+            while time.perf_counter() < deadline:
+                await websocket.send(payload)
+                await websocket.recv()
+                completed += 1
+
+    await asyncio.gather(
+        *(client(a) for a in addresses for _ in range(clients_per_room))
+    )
+    return completed
+
+
+def client_process(addresses, clients_per_room, duration, results):
+    results.put(asyncio.run(drive_clients(addresses, clients_per_room, duration)))
+
+
+async def run(worker_count, rooms_per_worker, clients_per_room, duration, port):
+    pool = RoomWorkerPool("127.0.0.1", port, workers=worker_count)
+    await pool.start()
+    await asyncio.sleep(1)
+    addresses = []
+    for room_id in range(worker_count * rooms_per_worker):
+        room = await pool.create_room(room_id)
+        addresses.append(f"ws://127.0.0.1:{room.port}/room/{room_id}")
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=client_process,
+            args=(addresses[i::worker_count], clients_per_room, duration, results),
+        )
+        for i in range(worker_count)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    pool.stop()
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room worker scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rooms-per-worker", type=int, default=4)
+    parser.add_argument("--clients-per-room", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    print(f"cpu cores: {os.cpu_count()}")
+    baseline = None
+    for worker_count in args.workers:
+        rate = asyncio.run(
+            run(
+                worker_count,
+                args.rooms_per_worker,
+                args.clients_per_room,
+                args.duration,
+                args.port,
+            )
+        )
+        baseline = baseline or rate / worker_count
+        print(
+            f"workers={worker_count:<3} msgs/s={rate:>10.0f} "
+            f"scaling={rate / baseline:>5.2f}x (ideal {worker_count}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Traffic capture.
+
+``enable(path)`` (the servers' ``--capture PATH``) records every frame the
+lobby, its rooms and Pong rooms send or receive from then on. Servers pass
+``serve_options()`` to ``websockets.serve``. While capture is on, it
+swaps in RecordingConnection, which logs each frame on its way through
+send() and recv(). Frames are buffered in memory and a writer thread
+appends them to the file, so the event loop never waits on the disk. If
+the disk falls ``MAX_BUFFERED`` bytes behind, frames are dropped and
+counted instead.
+
+File layout: a header of
+
+    magic    8 bytes b"PGBCAP01"
+    started  8 bytes, big-endian double, wall-clock start time
+
+followed by one record per event:
+
+    time        8 bytes, big-endian double, seconds since the start
+    kind        1 byte, see below
+    connection  4 bytes, big-endian connection number
+    size        4 bytes, big-endian payload size
+    payload
+
+An OPEN record comes before a connection's first frame. Its payload is
+"PORT PATH SUBPROTOCOL" for the server port, request path and negotiated
+subprotocol. CLOSE records have no payload. ``python -m networking.replay``
+plays a capture back.
+"""
+
+import atexit
+import itertools
+import logging
+import struct
+import threading
+import time
+
+from websockets.asyncio.server import ServerConnection
+
+HEADER = struct.Struct(">8sd")
+MAGIC = b"PGBCAP01"
+RECORD = struct.Struct(">dBII")
+
+OPEN, CLOSE, IN_TEXT, IN_BINARY, OUT_TEXT, OUT_BINARY = range(6)
+KIND_NAMES = ("open", "close", "in text", "in binary", "out text", "out binary")
+
+# Bytes waiting for the writer thread before frames are dropped.
+MAX_BUFFERED = 64 * 2**20
+
+# Recorder started by the last enable(), if any.
+recorder = None
+connection_ids = itertools.count(1)
+
+
+class Recorder:
+    """Appends records to ``path`` from a writer thread."""
+
+    def __init__(self, path, flush_interval=0.1):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, time.time()))
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.buffered = 0
+        self.closed = False
+        self.wakeup = threading.Event()
+        self.records = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True, name="capture")
+        self.thread.start()
+
+    def record(self, kind, connection, payload=b""):
+        header = RECORD.pack(
+            time.monotonic() - self.started, kind, connection, len(payload)
+        )
+        with self.lock:
+            if self.buffered > MAX_BUFFERED:
+                self.dropped += 1
+                return
+            self.buffer += (header, payload)
+            self.buffered += RECORD.size + len(payload)
+            self.records += 1
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            parts, self.buffer = self.buffer, []
+            self.buffered = 0
+        if parts:
+            try:
+                self.file.writelines(parts)
+                self.file.flush()
+            except (OSError, ValueError) as e:
+                logging.error(f"Failed to write capture to {self.path}: {e}")
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join()
+        self.flush()
+        self.file.close()
+        if self.dropped:
+            logging.warning(
+                f"Capture {self.path}: dropped {self.dropped} frames the disk "
+                "could not keep up with"
+            )
+
+
+class RecordingConnection(ServerConnection):
+    """ServerConnection that records its frames with the active Recorder."""
+
+    capture_id = None
+
+    def record(self, kind, message):
+        if recorder is None:
+            return
+        if self.capture_id is None:
+            self.capture_id = next(connection_ids)
+            opened = (
+                f"{self.local_address[1]} {self.request.path} {self.subprotocol or ''}"
+            )
+            recorder.record(OPEN, self.capture_id, opened.encode("utf-8"))
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        recorder.record(kind, self.capture_id, bytes(message))
+
+    async def recv(self, decode=None):
+        message = await super().recv(decode)
+        self.record(IN_TEXT if isinstance(message, str) else IN_BINARY, message)
+        return message
+
+    def send(self, message, text=None):
+        # Returns the coroutine of ServerConnection.send rather than
+        # awaiting it, which would cost every frame another coroutine.
+        if isinstance(message, (str, bytes, bytearray, memoryview)):
+            if text is None:
+                text = isinstance(message, str)
+            self.record(OUT_TEXT if text else OUT_BINARY, message)
+        return super().send(message, text=text)
+
+    def connection_lost(self, exc):
+        if self.capture_id is not None and recorder is not None:
+            recorder.record(CLOSE, self.capture_id)
+        super().connection_lost(exc)
+
+
+def enable(path):
+    """Record the traffic of every server started from now on to ``path``."""
+    global recorder
+    if recorder is None:
+        recorder = Recorder(path)
+        logging.info(f"Capturing traffic to {path}")
+    return recorder
+
+
+@atexit.register
+def disable():
+    """Write out what is buffered and close the capture file."""
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        recorder = None
+
+
+def serve_options():
+    """websockets.serve keyword arguments that turn capture on, if enabled."""
+    if recorder is None:
+        return {}
+    return {"create_connection": RecordingConnection}
+
+
+def read(path):
+    """
+    The records of a capture file as (time, kind, connection, payload)
+    tuples, with payloads as memoryview slices of the file data. Stops at
+    a torn last record.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, started = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a capture file")
+    view = memoryview(data)
+    records = []
+    offset = HEADER.size
+    while len(data) - offset >= RECORD.size:
+        at, kind, connection, size = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        if start + size > len(data):
+            break
+        records.append((at, kind, connection, view[start : start + size]))
+        offset = start + size
+    return records
@@ -0,0 +1,282 @@
+"""
+Wire codecs for lobby and room traffic.
+
+A client picks its codec by offering a websocket subprotocol during the
+handshake. Clients that offer none (every pygbag client today) or only
+subprotocols we do not know get JSON, so existing clients keep working and
+both kinds of connection can share a room.
+
+    pygbag.msgpack  MessagePack in binary frames
+    pygbag.json     newline-terminated JSON in text frames (the default)
+
+The MessagePack codec uses the ``msgpack`` package when it is installed and
+falls back to the small pure-Python packer below, which produces the same
+bytes for the types we send (None, bool, int, float, str, bytes, list,
+tuple and dict).
+"""
+
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class DecodeError(ValueError):
+    pass
+
+
+class JsonCodec:
+    name = "json"
+    label = "JSON"
+    subprotocol = "pygbag.json"
+    text = True
+
+    def encode(self, data):
+        return (json.dumps(data) + "\n").encode("utf-8")
+
+    def decode(self, message):
+        try:
+            return json.loads(message)
+        except json.JSONDecodeError as e:
+            raise DecodeError(str(e)) from e
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -0x20 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif 0 <= obj <= 0xFF:
+            out += struct.pack(">BB", 0xCC, obj)
+        elif 0 <= obj <= 0xFFFF:
+            out += struct.pack(">BH", 0xCD, obj)
+        elif 0 <= obj <= 0xFFFFFFFF:
+            out += struct.pack(">BI", 0xCE, obj)
+        elif 0 <= obj:
+            out += struct.pack(">BQ", 0xCF, obj)
+        elif -0x80 <= obj:
+            out += struct.pack(">Bb", 0xD0, obj)
+        elif -0x8000 <= obj:
+            out += struct.pack(">Bh", 0xD1, obj)
+        elif -0x80000000 <= obj:
+            out += struct.pack(">Bi", 0xD2, obj)
+        else:
+            out += struct.pack(">Bq", 0xD3, obj)
+    elif isinstance(obj, float):
+        out += struct.pack(">Bd", 0xCB, obj)
+    elif isinstance(obj, str):
+        raw = obj.encode("utf-8")
+        n = len(raw)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n <= 0xFF:
+            out += struct.pack(">BB", 0xD9, n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xDA, n)
+        else:
+            out += struct.pack(">BI", 0xDB, n)
+        out += raw
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        n = len(obj)
+        if n <= 0xFF:
+            out += struct.pack(">BB", 0xC4, n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xC5, n)
+        else:
+            out += struct.pack(">BI", 0xC6, n)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xDC, n)
+        else:
+            out += struct.pack(">BI", 0xDD, n)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n <= 0xFFFF:
+            out += struct.pack(">BH", 0xDE, n)
+        else:
+            out += struct.pack(">BI", 0xDF, n)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Cannot pack {type(obj).__name__}")
+
+
+# Fixed-width formats after the type byte: (struct format, size).
+_FIXED = {
+    0xCA: (">f", 4),
+    0xCB: (">d", 8),
+    0xCC: (">B", 1),
+    0xCD: (">H", 2),
+    0xCE: (">I", 4),
+    0xCF: (">Q", 8),
+    0xD0: (">b", 1),
+    0xD1: (">h", 2),
+    0xD2: (">i", 4),
+    0xD3: (">q", 8),
+}
+# Length-prefixed types: type byte -> (kind, length format, length size).
+_SIZED = {
+    0xC4: ("bin", ">B", 1),
+    0xC5: ("bin", ">H", 2),
+    0xC6: ("bin", ">I", 4),
+    0xD9: ("str", ">B", 1),
+    0xDA: ("str", ">H", 2),
+    0xDB: ("str", ">I", 4),
+    0xDC: ("array", ">H", 2),
+    0xDD: ("array", ">I", 4),
+    0xDE: ("map", ">H", 2),
+    0xDF: ("map", ">I", 4),
+}
+# Deepest array/map nesting the fallback decoder follows before giving up,
+# well under the recursion limit.
+MAX_DEPTH = 64
+
+
+def _unpack(data, offset, depth=0):
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xE0:
+        return code - 0x100, offset
+    if 0xA0 <= code <= 0xBF:
+        kind, n = "str", code & 0x1F
+    elif 0x90 <= code <= 0x9F:
+        kind, n = "array", code & 0x0F
+    elif 0x80 <= code <= 0x8F:
+        kind, n = "map", code & 0x0F
+    elif code == 0xC0:
+        return None, offset
+    elif code == 0xC2:
+        return False, offset
+    elif code == 0xC3:
+        return True, offset
+    elif code in _FIXED:
+        fmt, size = _FIXED[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + size
+    elif code in _SIZED:
+        kind, fmt, size = _SIZED[code]
+        n = struct.unpack_from(fmt, data, offset)[0]
+        offset += size
+    else:
+        raise DecodeError(f"Unsupported MessagePack type 0x{code:02x}")
+
+    if kind == "str":
+        end = offset + n
+        if end > len(data):
+            raise DecodeError("Truncated MessagePack string")
+        return bytes(data[offset:end]).decode("utf-8"), end
+    if kind == "bin":
+        end = offset + n
+        if end > len(data):
+            raise DecodeError("Truncated MessagePack binary")
+        return bytes(data[offset:end]), end
+    if depth >= MAX_DEPTH:
+        raise DecodeError(f"MessagePack nested deeper than {MAX_DEPTH}")
+    if kind == "array":
+        items = []
+        for _ in range(n):
+            item, offset = _unpack(data, offset, depth + 1)
+            items.append(item)
+        return items, offset
+    result = {}
+    for _ in range(n):
+        key, offset = _unpack(data, offset, depth + 1)
+        result[key], offset = _unpack(data, offset, depth + 1)
+    return result, offset
+
+
+def packb(obj):
+    if msgpack is not None:
+        return msgpack.packb(obj)
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def unpack_stream(data):
+    """Yield every object in a buffer of back-to-back MessagePack values."""
+    offset = 0
+    try:
+        while offset < len(data):
+            obj, offset = _unpack(data, offset)
+            yield obj
+    except DecodeError:
+        raise
+    except (IndexError, TypeError, ValueError, struct.error) as e:
+        raise DecodeError(f"Malformed MessagePack: {e}") from e
+
+
+def unpackb(data):
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(data)
+        except Exception as e:
+            raise DecodeError(f"Malformed MessagePack: {e}") from e
+    objects = list(unpack_stream(data))
+    if len(objects) != 1:
+        raise DecodeError(f"Expected one MessagePack value, got {len(objects)}")
+    return objects[0]
+
+
+class MsgPackCodec:
+    name = "msgpack"
+    label = "MessagePack"
+    subprotocol = "pygbag.msgpack"
+    text = False
+
+    def encode(self, data):
+        return packb(data)
+
+    def decode(self, message):
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        return unpackb(message)
+
+
+JSON = JsonCodec()
+MSGPACK = MsgPackCodec()
+
+# Server preference order when a client offers several.
+CODECS = {codec.subprotocol: codec for codec in (MSGPACK, JSON)}
+
+
+def select_subprotocol(connection, subprotocols):
+    """
+    ``select_subprotocol`` hook for ``websockets.serve``: pick the first
+    codec we support, or no subprotocol at all (JSON) instead of rejecting
+    the handshake.
+    """
+    for subprotocol in CODECS:
+        if subprotocol in subprotocols:
+            return subprotocol
+    return None
+
+
+def codec_for(websocket):
+    return CODECS.get(getattr(websocket, "subprotocol", None), JSON)
+
+
+async def send_data(websocket, data):
+    """Encode ``data`` with the connection's codec and send it."""
+    codec = codec_for(websocket)
+    await websocket.send(codec.encode(data), text=codec.text)
@@ -0,0 +1,424 @@
+"""
+Room directory shared by several lobby nodes.
+
+Each MainServer keeps its own rooms in a RoomRegistry. With a directory
+(``--registry``) it also publishes them, together with a heartbeat and its
+load, and learns about the rooms of every other node, so any node can
+``list`` and ``join`` every room and room ids are unique across nodes.
+Nodes sync every ``sync_interval`` seconds: one call writes the node's
+heartbeat and room client counts and reads everything back, and lobby
+requests are answered from that cached copy. Nodes whose heartbeat is
+older than ``node_ttl`` are left out, along with their rooms.
+
+Backends:
+
+    memory              MemoryDirectory: nodes in this process (tests, benches)
+    sqlite:PATH         SqliteDirectory: a SQLite database in WAL mode, for
+                        nodes on one machine or a shared disk
+    file:PATH           FileDirectory: a JSON file under an flock, a
+                        dependency-free stand-in for local testing
+    module:Class[=ARG]  any RoomDirectory implementation, constructed as
+                        ``Class(ARG)``
+
+The calls block, so lobbies run them in an executor.
+"""
+
+import bisect
+import fcntl
+import functools
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PLACEMENTS = ("local", "hash", "least_load")
+
+
+class RoomDirectory:
+    """
+    Interface of a directory backend. Rooms are dicts with ``id``, ``node``,
+    ``address`` and ``clients``; nodes are dicts with ``id``, ``address``,
+    ``rooms``, ``clients``, ``draining`` and ``seen`` (wall-clock time of
+    the last sync).
+    """
+
+    def allocate_id(self):
+        """Return a room id no node has used yet."""
+        raise NotImplementedError
+
+    def sync(self, node_id, node, rooms, node_ttl):
+        """
+        Record ``node`` (address, rooms, clients, draining) as alive now and
+        the client counts of its ``rooms`` ({room id: (address, clients)}).
+        Return (live nodes by id, rooms of live nodes by id).
+        """
+        raise NotImplementedError
+
+    def place(self, room_id, node_id, address):
+        """Register a room on ``node_id``, before it has any clients."""
+        raise NotImplementedError
+
+    def remove(self, room_ids):
+        raise NotImplementedError
+
+    def lookup(self, room_id, node_ttl):
+        """The room with this id if its node is alive, else None."""
+        raise NotImplementedError
+
+    def leave(self, node_id):
+        """Forget a node and its rooms."""
+        raise NotImplementedError
+
+
+class MemoryDirectory(RoomDirectory):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.nodes = {}
+        self.rooms = {}
+
+    def allocate_id(self):
+        with self.lock:
+            room_id = self.next_id
+            self.next_id += 1
+        return room_id
+
+    def sync(self, node_id, node, rooms, node_ttl):
+        now = time.time()
+        with self.lock:
+            self.nodes[node_id] = dict(node, id=node_id, seen=now)
+            for room_id, (address, clients) in rooms.items():
+                self.rooms[room_id] = {
+                    "id": room_id,
+                    "node": node_id,
+                    "address": address,
+                    "clients": clients,
+                }
+            return live_view(self.nodes.values(), self.rooms.values(), now, node_ttl)
+
+    def place(self, room_id, node_id, address):
+        with self.lock:
+            self.rooms[room_id] = {
+                "id": room_id,
+                "node": node_id,
+                "address": address,
+                "clients": 0,
+            }
+
+    def remove(self, room_ids):
+        with self.lock:
+            for room_id in room_ids:
+                self.rooms.pop(room_id, None)
+
+    def lookup(self, room_id, node_ttl):
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                return None
+            node = self.nodes.get(room["node"])
+            if node is None or node["seen"] < time.time() - node_ttl:
+                return None
+            return dict(room)
+
+    def leave(self, node_id):
+        with self.lock:
+            self.nodes.pop(node_id, None)
+            for room_id in [
+                room_id
+                for room_id, room in self.rooms.items()
+                if room["node"] == node_id
+            ]:
+                del self.rooms[room_id]
+
+
+def live_view(nodes, rooms, now, node_ttl):
+    live = {node["id"]: dict(node) for node in nodes if node["seen"] >= now - node_ttl}
+    return live, {room["id"]: dict(room) for room in rooms if room["node"] in live}
+
+
+class SqliteDirectory(RoomDirectory):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS room_ids (id INTEGER PRIMARY KEY AUTOINCREMENT);
+        CREATE TABLE IF NOT EXISTS nodes (
+            id TEXT PRIMARY KEY, address TEXT, rooms INTEGER, clients INTEGER,
+            draining INTEGER, seen REAL
+        );
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY, node TEXT, address TEXT, clients INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS rooms_node ON rooms (node);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # One connection, used from executor threads one call at a time.
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def allocate_id(self):
+        with self.lock:
+            return self.db.execute("INSERT INTO room_ids DEFAULT VALUES").lastrowid
+
+    def sync(self, node_id, node, rooms, node_ttl):
+        now = time.time()
+        with self.lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        node_id,
+                        node["address"],
+                        node["rooms"],
+                        node["clients"],
+                        int(node["draining"]),
+                        now,
+                    ),
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO rooms VALUES (?, ?, ?, ?)",
+                    [
+                        (room_id, node_id, address, clients)
+                        for room_id, (address, clients) in rooms.items()
+                    ],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            nodes = [
+                {
+                    "id": row[0],
+                    "address": row[1],
+                    "rooms": row[2],
+                    "clients": row[3],
+                    "draining": bool(row[4]),
+                    "seen": row[5],
+                }
+                for row in db.execute(
+                    "SELECT * FROM nodes WHERE seen >= ?", (now - node_ttl,)
+                )
+            ]
+            room_rows = [
+                {"id": row[0], "node": row[1], "address": row[2], "clients": row[3]}
+                for row in db.execute(
+                    "SELECT rooms.* FROM rooms JOIN nodes ON rooms.node = nodes.id "
+                    "WHERE nodes.seen >= ?",
+                    (now - node_ttl,),
+                )
+            ]
+        return live_view(nodes, room_rows, now, node_ttl)
+
+    def place(self, room_id, node_id, address):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO rooms VALUES (?, ?, ?, 0)",
+                (room_id, node_id, address),
+            )
+
+    def remove(self, room_ids):
+        with self.lock:
+            self.db.executemany(
+                "DELETE FROM rooms WHERE id = ?", [(room_id,) for room_id in room_ids]
+            )
+
+    def lookup(self, room_id, node_ttl):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT rooms.* FROM rooms JOIN nodes ON rooms.node = nodes.id "
+                "WHERE rooms.id = ? AND nodes.seen >= ?",
+                (room_id, time.time() - node_ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "node": row[1], "address": row[2], "clients": row[3]}
+
+    def leave(self, node_id):
+        with self.lock:
+            self.db.execute("DELETE FROM rooms WHERE node = ?", (node_id,))
+            self.db.execute("DELETE FROM nodes WHERE id = ?", (node_id,))
+
+
+class FileDirectory(RoomDirectory):
+    """
+    The whole directory in one JSON file, read and rewritten under an
+    exclusive flock on ``PATH.lock`` for every call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def transaction(self, update):
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path) as f:
+                        state = json.load(f)
+                except FileNotFoundError:
+                    state = {"next_id": 1, "nodes": [], "rooms": []}
+                nodes = {node["id"]: node for node in state["nodes"]}
+                rooms = {room["id"]: room for room in state["rooms"]}
+                result, changed = update(state, nodes, rooms)
+                if changed:
+                    state["nodes"] = list(nodes.values())
+                    state["rooms"] = list(rooms.values())
+                    tmp_path = f"{self.path}.tmp"
+                    with open(tmp_path, "w") as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.path)
+                return result
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def allocate_id(self):
+        def update(state, nodes, rooms):
+            room_id = state["next_id"]
+            state["next_id"] += 1
+            return room_id, True
+
+        return self.transaction(update)
+
+    def sync(self, node_id, node, rooms, node_ttl):
+        now = time.time()
+
+        def update(state, nodes, all_rooms):
+            nodes[node_id] = dict(node, id=node_id, seen=now)
+            for room_id, (address, clients) in rooms.items():
+                all_rooms[room_id] = {
+                    "id": room_id,
+                    "node": node_id,
+                    "address": address,
+                    "clients": clients,
+                }
+            return live_view(nodes.values(), all_rooms.values(), now, node_ttl), True
+
+        return self.transaction(update)
+
+    def place(self, room_id, node_id, address):
+        def update(state, nodes, rooms):
+            rooms[room_id] = {
+                "id": room_id,
+                "node": node_id,
+                "address": address,
+                "clients": 0,
+            }
+            return None, True
+
+        self.transaction(update)
+
+    def remove(self, room_ids):
+        def update(state, nodes, rooms):
+            for room_id in room_ids:
+                rooms.pop(room_id, None)
+            return None, True
+
+        self.transaction(update)
+
+    def lookup(self, room_id, node_ttl):
+        def update(state, nodes, rooms):
+            _, live_rooms = live_view(
+                nodes.values(), rooms.values(), time.time(), node_ttl
+            )
+            return live_rooms.get(room_id), False
+
+        return self.transaction(update)
+
+    def leave(self, node_id):
+        def update(state, nodes, rooms):
+            nodes.pop(node_id, None)
+            for room_id in [
+                room_id for room_id, room in rooms.items() if room["node"] == node_id
+            ]:
+                del rooms[room_id]
+            return None, True
+
+        self.transaction(update)
+
+
+class HashRing:
+    """Consistent hashing of room ids onto node ids."""
+
+    def __init__(self, node_ids, replicas=64):
+        self.node_ids = tuple(sorted(node_ids))
+        points = sorted(
+            (ring_hash(f"{node_id}#{i}"), node_id)
+            for node_id in self.node_ids
+            for i in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.owners = [node_id for _, node_id in points]
+
+    def node_for(self, key):
+        index = bisect.bisect(self.hashes, ring_hash(str(key))) % len(self.hashes)
+        return self.owners[index]
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+@functools.lru_cache(maxsize=8)
+def ring_for(node_ids):
+    return HashRing(node_ids)
+
+
+def choose_node(placement, room_id, nodes):
+    """Pick the node for a new room among ``nodes`` that are not draining."""
+    candidates = {
+        node_id: node for node_id, node in nodes.items() if not node["draining"]
+    }
+    if not candidates:
+        return None
+    if placement == "hash":
+        return ring_for(tuple(sorted(candidates))).node_for(room_id)
+    if placement == "least_load":
+        return min(
+            candidates,
+            key=lambda node_id: (
+                candidates[node_id]["clients"],
+                candidates[node_id]["rooms"],
+                node_id,
+            ),
+        )
+    raise ValueError(f"Unknown placement: {placement}")
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def create(spec):
+    if spec == "memory":
+        return MemoryDirectory()
+    if spec.startswith("sqlite:"):
+        return SqliteDirectory(spec[len("sqlite:") :])
+    if spec.startswith("file:"):
+        return FileDirectory(spec[len("file:") :])
+    target, _, arg = spec.partition("=")
+    module_name, sep, class_name = target.partition(":")
+    if not sep:
+        raise ValueError(f"Unknown room registry: {spec}")
+    directory_class = getattr(importlib.import_module(module_name), class_name)
+    return directory_class(arg) if arg else directory_class()
+
+
+def get(spec):
+    """The process-wide directory for ``spec`` (or ``spec`` if it is one)."""
+    if isinstance(spec, RoomDirectory):
+        return spec
+    with _directories_lock:
+        directory = _directories.get(spec)
+        if directory is None:
+            directory = _directories[spec] = create(spec)
+    return directory
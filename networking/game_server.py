@@ -1,60 +1,370 @@
 import asyncio
-import json
-import ssl
+import collections
+import collections.abc
+import heapq
+import itertools
+import multiprocessing
+import os
+import signal
 import threading
 import websockets
+import websockets.exceptions
 import random
 import logging
 import argparse
+import time
+from types import MappingProxyType
+from urllib.parse import urlsplit
+
+from networking import capture, federation, logs, metrics, pubsub, snapshots, tls
+from networking.liveness import LivenessTracker, dead_peer, heartbeat_options
+from networking.codec import DecodeError, codec_for, select_subprotocol, send_data
+from networking.ratelimit import DEFAULT_LIMITS, RateLimit, limit_options
+from networking.session import Session
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-try:
-    ssl_context.load_cert_chain(certfile="certs/cert.pem", keyfile="certs/key.pem")
-    logging.info("SSL context loaded successfully")
-except Exception as e:
-    logging.error(f"Failed to load SSL context: {str(e)}")
-    exit()
+# Per-message lines, sampled by default (see networking.logs).
+message_log = logging.getLogger("game_server.messages")
+
+ROOM_PATH_PREFIX = "/room/"
+
+
+def load_ssl_context(
+    certfile="certs/cert.pem",
+    keyfile="certs/key.pem",
+    ecdsa_certfile=None,
+    ecdsa_keyfile=None,
+    reload_interval=5.0,
+):
+    """
+    Build the server context. With ``reload_interval`` the certificate files
+    are watched and new connections pick up rotated certificates.
+    """
+    try:
+        if reload_interval:
+            ssl_context = (
+                tls.CertReloader(
+                    certfile, keyfile, ecdsa_certfile, ecdsa_keyfile, reload_interval
+                )
+                .start()
+                .context
+            )
+        else:
+            ssl_context = tls.server_context(
+                certfile, keyfile, ecdsa_certfile, ecdsa_keyfile
+            )
+        logging.info("SSL context loaded successfully")
+    except Exception as e:
+        logging.error(f"Failed to load SSL context: {str(e)}")
+        exit()
+    return ssl_context
+
+
+def parse_room_path(path):
+    """Return the room id encoded in a ``/room/<id>`` request path, or None."""
+    if not path or not path.startswith(ROOM_PATH_PREFIX):
+        return None
+    try:
+        return int(path[len(ROOM_PATH_PREFIX) :].strip("/"))
+    except ValueError:
+        return None
+
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect", "conflate")
+
+
+class ClientSession(Session):
+    """
+    Session of one room (or list subscriber) connection with its outbound
+    side.
+
+    Messages go into a bounded queue that a dedicated writer task drains, so
+    a stalled client only ever delays itself. When the queue is full the
+    slow-consumer policy decides what happens: ``drop_oldest`` discards the
+    oldest queued message, ``conflate`` discards everything queued in favour
+    of the newest message and ``disconnect`` closes the connection. The
+    queue and writer task are created by the first enqueue, so connections
+    that never receive anything carry neither.
+    """
+
+    __slots__ = (
+        "queue",
+        "max_queue",
+        "policy",
+        "wakeup",
+        "drained",
+        "closing",
+        "dropped",
+        "metrics",
+        "writer",
+    )
+
+    def __init__(
+        self,
+        websocket,
+        max_queue=256,
+        policy="drop_oldest",
+        metrics=None,
+        room=None,
+        rate_limit=None,
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        super().__init__(
+            websocket,
+            room,
+            rate_limit,
+            metrics.limited if metrics is not None else None,
+        )
+        self.queue = None
+        self.max_queue = max_queue
+        self.policy = policy
+        # Futures the writer and flush() wait on, only while they wait.
+        self.wakeup = None
+        self.drained = None
+        self.closing = False
+        self.dropped = 0
+        # RoomMetrics of the room this client is in, or None.
+        self.metrics = metrics
+        self.writer = None
+
+    def enqueue(self, message, enqueued_at=None):
+        if self.closing:
+            return
+        queue = self.queue
+        if queue is None:
+            queue = self.queue = collections.deque()
+            self.writer = asyncio.create_task(self.write_loop())
+        elif self.writer.done():
+            # Nothing will send it; the connection is closed.
+            return
+        if len(queue) >= self.max_queue:
+            self.dropped += 1
+            if self.policy == "disconnect":
+                self.closing = True
+                queue.clear()
+                self.wake()
+                return
+            if self.policy == "conflate":
+                queue.clear()
+            else:
+                queue.popleft()
+        queue.append((message, enqueued_at))
+        self.wake()
+
+    def wake(self):
+        wakeup = self.wakeup
+        if wakeup is not None and not wakeup.done():
+            wakeup.set_result(None)
+
+    async def write_loop(self):
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        try:
+            while True:
+                while queue:
+                    message, enqueued_at = queue.popleft()
+                    await self.websocket.send(message, text=self.codec.text)
+                    self.messages_out += 1
+                    if enqueued_at is not None:
+                        self.metrics.fanout.observe(time.perf_counter() - enqueued_at)
+                self.resolve_drained()
+                if self.closing:
+                    logging.info(
+                        f"Disconnecting slow client {self.websocket.remote_address}"
+                    )
+                    await self.websocket.close(1013, "Client too slow")
+                    return
+                self.wakeup = loop.create_future()
+                await self.wakeup
+                self.wakeup = None
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            logging.error(f"Error sending message to client: {e}")
+        finally:
+            self.resolve_drained()
+
+    def resolve_drained(self):
+        drained = self.drained
+        if drained is not None:
+            self.drained = None
+            if not drained.done():
+                drained.set_result(None)
+
+    async def flush(self):
+        """Wait until every queued message has been sent."""
+        if self.writer is None or self.writer.done():
+            return
+        if not self.queue and self.wakeup is not None:
+            # The writer is idle: everything has been sent.
+            return
+        if self.drained is None:
+            self.drained = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self.drained)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.cancel()
 
 
 class EchoServer:
-    def __init__(self, host, port):
+    def __init__(
+        self,
+        host,
+        port,
+        ssl_context=None,
+        send_queue_size=256,
+        slow_consumer_policy="drop_oldest",
+        compression="deflate",
+        name=None,
+        rate_limit=None,
+        tick=None,
+        exclude_sender=False,
+        ping_interval=20.0,
+        ping_timeout=20.0,
+        close_timeout=10.0,
+        open_timeout=10.0,
+        idle_timeout=None,
+        bus="local",
+    ):
         self.host = host
         self.port = port
-        self.clients = set()
-        self.lock = threading.Lock()
+        self.name = name or f"{host}:{port}"
+        self.ssl_context = ssl_context
+        # permessage-deflate compresses every frame separately for each
+        # recipient; None keeps broadcast frames byte-identical on the wire.
+        self.compression = compression
+        self.send_queue_size = send_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        # RateLimit applied to every client's inbound messages, or None.
+        self.rate_limit = rate_limit
+        # Seconds over which echoes are collected into one {"batch": [...]}
+        # frame per recipient, or None to broadcast every message at once.
+        self.tick = tick
+        # Leave a client's own messages out of what is echoed back to it.
+        self.exclude_sender = exclude_sender
+        # (sender websocket, message) pairs waiting for the next tick flush;
+        # the sender is None for messages from other processes.
+        self.pending = []
+        self.flush_handle = None
+        # Room pub/sub bus (a networking.pubsub spec or RoomBus) shared with
+        # the other EchoServers of this room name. The room subscribes while
+        # it has clients.
+        self.bus = pubsub.get(bus)
+        self.subscribed = False
+        # Passed to websockets.serve when the room has its own listener.
+        self.heartbeat = {
+            "ping_interval": ping_interval,
+            "ping_timeout": ping_timeout,
+            "close_timeout": close_timeout,
+            "open_timeout": open_timeout,
+        }
+        # Only ever changed on the room's own event loop; other threads (the
+        # lobby in thread mode) just read its length.
+        self.clients: dict[any, ClientSession] = {}
         self.running = True
+        # False once the lobby drains: players already in the room stay,
+        # new connections are turned away.
+        self.accepting = True
+        self.server = None
+        self.loop = None
+        # Monotonic time since the room has been empty, None while occupied.
+        self.idle_since = time.monotonic()
+        self.metrics = (
+            metrics.registry.room(self.name, lambda: list(self.clients.values()))
+            if metrics.registry is not None
+            else None
+        )
+        self.liveness = LivenessTracker(
+            self.clients,
+            idle_timeout,
+            self.metrics.reaped if self.metrics is not None else None,
+        )
+        if self.metrics is not None:
+            self.metrics.liveness = self.liveness.state
+
+    def add_client(self, websocket):
+        session = ClientSession(
+            websocket,
+            self.send_queue_size,
+            self.slow_consumer_policy,
+            self.metrics,
+            room=self.name,
+            rate_limit=self.rate_limit,
+        )
+        if self.metrics is not None:
+            self.metrics.connections += 1
+        self.clients[websocket] = session
+        self.liveness.add(websocket)
+        self.idle_since = None
+        if not self.subscribed:
+            self.bus.subscribe(self.name, self, self.on_bus_message)
+            self.subscribed = True
+        logging.info(
+            f"Client connected to echo server at {self.host}:{self.port}. Total clients: {len(self.clients)}"
+        )
+        return session
+
+    def remove_client(self, websocket):
+        session = self.clients.pop(websocket, None)
+        if session is None:
+            # Already removed: close() removes its clients before their
+            # handle_client calls get to their finally blocks.
+            return
+        self.liveness.remove(websocket)
+        if not self.clients:
+            self.unsubscribe()
+            if self.idle_since is None:
+                self.idle_since = time.monotonic()
+        logging.info(
+            f"Client disconnected from echo server at {self.host}:{self.port}. Total clients: {len(self.clients)}"
+        )
+        session.close()
 
     async def handle_client(self, websocket):
-        with self.lock:
-            self.clients.add(websocket)
-            logging.info(
-                f"Client connected to echo server at {self.host}:{self.port}. Total clients: {len(self.clients)}"
-            )
+        if not self.accepting or not self.running:
+            await websocket.close(1013, "Room is not accepting players")
+            return
+        session = self.add_client(websocket)
+        limiter = session.limiter
         try:
             async for message in websocket:
                 if not self.running:
                     logging.info(f"Server stopped. Closing connection")
                     break
+                session.last_seen = time.monotonic()
+                session.messages_in += 1
+                if self.metrics is not None:
+                    self.metrics.messages_in += 1
+                    self.metrics.bytes_in += len(message)
+                if limiter is not None and not await limiter.admit(websocket, message):
+                    continue
                 try:
-                    data = json.loads(message)
+                    data = session.codec.decode(message)
                     data["echo"] = data["message"]
                     del data["message"]
-                    response = json.dumps(data)
-                    await self.broadcast(response)
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSONDecodeError: {e}")
-                    await websocket.send(
-                        json.dumps({"error": "Invalid JSON format"}) + "\n"
+                    if self.tick:
+                        self.queue_echo(websocket, data)
+                    else:
+                        await self.broadcast(
+                            data, websocket if self.exclude_sender else None
+                        )
+                except DecodeError as e:
+                    logging.error(f"DecodeError: {e}")
+                    session.enqueue(
+                        session.codec.encode(
+                            {"error": f"Invalid {session.codec.label} format"}
+                        )
                     )
                 except KeyError as e:
                     logging.error(f"KeyError: {e}")
-                    await websocket.send(
-                        json.dumps({"error": f"Missing key: {e}"}) + "\n"
+                    session.enqueue(
+                        session.codec.encode({"error": f"Missing key: {e}"})
                     )
                 except Exception as e:
                     logging.exception(
@@ -68,175 +378,1389 @@ class EchoServer:
         except Exception as e:
             logging.exception(f"Error handling client: {e}")
         finally:
-            with self.lock:
-                self.clients.remove(websocket)
-                logging.info(
-                    f"Client disconnected from echo server at {self.host}:{self.port}. Total clients: {len(self.clients)}"
-                )
+            self.remove_client(websocket)
 
-    async def broadcast(self, message):
-        disconnected_clients = []
-        for client in self.clients:
-            try:
-                await client.send(message + "\n")  # Append newline character here
-            except websockets.exceptions.ConnectionClosedError:
-                logging.info(f"Client disconnected during broadcast")
-                disconnected_clients.append(client)
-            except Exception as e:
-                logging.error(f"Error sending message to client: {e}")
-                disconnected_clients.append(client)
+    def unsubscribe(self):
+        if self.subscribed:
+            self.bus.unsubscribe(self.name, self)
+            self.subscribed = False
+
+    def on_bus_message(self, messages):
+        """Messages another EchoServer of this room published on the bus."""
+        if not self.running:
+            return
+        if self.tick:
+            for message in messages:
+                self.queue_echo(None, message)
+        else:
+            for message in messages:
+                self.fan_out(message)
 
-        # Remove disconnected clients after iteration to avoid modifying set during iteration
-        with self.lock:
-            for client in disconnected_clients:
-                self.clients.remove(client)
+    async def broadcast(self, message, exclude=None):
+        """Send ``message`` to this room's clients here and on the bus."""
+        self.fan_out(message, exclude)
+        self.bus.publish(self.name, [message], self)
+
+    def fan_out(self, message, exclude=None):
+        # Only enqueues; every client's writer task does the actual send, so
+        # this returns without waiting on any socket. The message is encoded
+        # once per codec in use and the same bytes go to every recipient.
+        enqueued_at = None
+        if self.metrics is not None:
+            enqueued_at = self.metrics.broadcast_started()
+        frames = {}
+        for websocket, session in self.clients.items():
+            if websocket is exclude:
+                continue
+            frame = frames.get(session.codec)
+            if frame is None:
+                frame = frames[session.codec] = session.codec.encode(message)
+            session.enqueue(frame, enqueued_at)
+        if self.metrics is not None:
+            self.metrics.broadcast_sent(
+                frames, len(self.clients) - (exclude in self.clients)
+            )
+
+    def queue_echo(self, sender, message):
+        """Hold ``message`` until the current tick window closes."""
+        self.pending.append((sender, message))
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                self.tick, self.flush_pending
+            )
+
+    def flush_pending(self):
+        """
+        Send everything collected during the tick as one batch frame per
+        recipient. Without exclude_sender all recipients share one frame;
+        otherwise clients that sent something in this tick get their own.
+        """
+        self.flush_handle = None
+        pending, self.pending = self.pending, []
+        local = [message for sender, message in pending if sender is not None]
+        if local:
+            self.bus.publish(self.name, local, self)
+        if not pending or not self.clients:
+            return
+        enqueued_at = None
+        if self.metrics is not None:
+            enqueued_at = self.metrics.broadcast_started()
+        senders = {sender for sender, _ in pending} if self.exclude_sender else ()
+        shared = {}
+        for websocket, session in self.clients.items():
+            if websocket in senders:
+                batch = [
+                    message for sender, message in pending if sender is not websocket
+                ]
+                if not batch:
+                    continue
+                frame = session.codec.encode({"batch": batch})
+            else:
+                frame = shared.get(session.codec)
+                if frame is None:
+                    frame = shared[session.codec] = session.codec.encode(
+                        {"batch": [message for _, message in pending]}
+                    )
+            session.enqueue(frame, enqueued_at)
+            if self.metrics is not None:
+                self.metrics.messages_out += 1
+                self.metrics.bytes_out += len(frame)
+
+    async def close(self, code=1001, reason="Room closed", flush_timeout=1.0):
+        """
+        Shut the room down: stop accepting connections, tell every client
+        the room is closing, give their queues up to ``flush_timeout``
+        seconds to drain, then close the connections and the listener.
+        """
+        self.running = False
+        self.accepting = False
+        if self.server is not None:
+            self.server.close(close_connections=False)
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_pending()
+        self.liveness.stop()
+        self.unsubscribe()
+        sessions = list(self.clients.values())
+        if sessions:
+            # Only this server's clients: the room may live on elsewhere.
+            self.fan_out({"room_closing": reason})
+            done, pending = await asyncio.wait(
+                [asyncio.create_task(session.flush()) for session in sessions],
+                timeout=flush_timeout,
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                logging.info(
+                    f"{len(pending)} clients of room {self.name} did not drain in time"
+                )
+        connections = list(self.clients)
+        if connections:
+            done, pending = await asyncio.wait(
+                [
+                    asyncio.create_task(websocket.close(code, reason))
+                    for websocket in connections
+                ],
+                timeout=flush_timeout,
+            )
+            for task in pending:
+                task.cancel()
+        for websocket in connections:
+            if websocket in self.clients and hasattr(websocket, "transport"):
+                # Peer never answered the close handshake.
+                websocket.transport.abort()
+            self.remove_client(websocket)
+        if self.server is not None:
+            await self.server.wait_closed()
+        if self.metrics is not None:
+            metrics.registry.remove_room(self.name)
 
     async def start(self):
+        self.loop = asyncio.get_running_loop()
+        if not self.running:
+            # Closed before its thread got to run.
+            return
+        if self.metrics is not None:
+            # This room owns its event loop (thread mode).
+            lag_task = asyncio.create_task(
+                metrics.registry.watch_loop(f"room:{self.name}")
+            )
         try:
             self.server = await websockets.serve(
-                self.handle_client, self.host, self.port, ssl=ssl_context
+                self.handle_client,
+                self.host,
+                self.port,
+                ssl=self.ssl_context,
+                compression=self.compression,
+                select_subprotocol=select_subprotocol,
+                **self.heartbeat,
+                **limit_options(self.rate_limit),
+                **capture.serve_options(),
             )
             logging.info(f"Echo server started on ws://{self.host}:{self.port}")
             await self.server.wait_closed()
         except Exception as e:
             logging.error(f"Error starting echo server: {e}")
+        finally:
+            if self.metrics is not None:
+                lag_task.cancel()
+
+    def get_client_count(self):
+        return len(self.clients)
+
+
+class RoomRouter:
+    """
+    Hosts many rooms behind a single listener on one event loop.
+
+    A connection is routed to a room either by its request path
+    (``/room/<id>``) or, for clients that cannot choose a path, by sending
+    ``{"command": "enter", "server_id": <id>}`` as its first message. Rooms
+    are plain EchoServer objects that never bind a socket of their own.
+    """
+
+    def __init__(self, host, port, ssl_context=None, room_options=None):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.room_options = room_options or {}
+        self.rooms: dict[int, EchoServer] = {}
+
+    def add_room(self, room_id):
+        room = EchoServer(
+            self.host,
+            self.port,
+            ssl_context=self.ssl_context,
+            name=str(room_id),
+            **self.room_options,
+        )
+        self.rooms[room_id] = room
+        return room
+
+    def remove_room(self, room_id):
+        return self.rooms.pop(room_id, None)
+
+    def room_address(self, room_id):
+        return f"ws://{self.host}:{self.port}{ROOM_PATH_PREFIX}{room_id}"
+
+    async def enter(self, websocket, room_id):
+        room = self.rooms.get(room_id)
+        if room is None:
+            await send_data(websocket, {"error": "Server not found"})
+            return
+        await room.handle_client(websocket)
+
+    async def route(self, websocket):
+        room_id = parse_room_path(websocket.request.path)
+        try:
+            if room_id is None:
+                codec = codec_for(websocket)
+                data = codec.decode(await websocket.recv())
+                if data.get("command") != "enter":
+                    await send_data(websocket, {"error": "Expected enter command"})
+                    return
+                room_id = data.get("server_id")
+            await self.enter(websocket, room_id)
+        except DecodeError as e:
+            logging.error(f"DecodeError: {e}")
+            await send_data(websocket, {"error": f"Invalid {codec.label} format"})
+        except websockets.exceptions.ConnectionClosed:
+            logging.info(f"Client disconnected before entering a room")
+
+    async def start(self):
+        try:
+            self.server = await websockets.serve(
+                self.route,
+                self.host,
+                self.port,
+                ssl=self.ssl_context,
+                compression=self.room_options.get("compression", "deflate"),
+                select_subprotocol=select_subprotocol,
+                **heartbeat_options(self.room_options),
+                **limit_options(self.room_options.get("rate_limit")),
+                **capture.serve_options(),
+            )
+            logging.info(f"Room router started on ws://{self.host}:{self.port}")
+            await self.server.wait_closed()
+        except Exception as e:
+            logging.error(f"Error starting room router: {e}")
+
+
+class RoomWorker:
+    """
+    Runs a RoomRouter inside a worker process and applies the commands the
+    lobby sends it. Room load is reported back periodically so the lobby can
+    place new rooms and answer ``list`` without talking to the worker.
+    """
+
+    def __init__(
+        self,
+        worker_id,
+        host,
+        port,
+        ssl_context,
+        commands,
+        reports,
+        report_interval,
+        room_options=None,
+        metrics_port=None,
+    ):
+        self.worker_id = worker_id
+        self.commands = commands
+        self.metrics_port = metrics_port
+        self.reports = reports
+        self.report_interval = report_interval
+        self.router = RoomRouter(
+            host, port, ssl_context=ssl_context, room_options=room_options
+        )
+        self.loop = None
+        self.closing_rooms = set()
+
+    def read_commands(self):
+        while True:
+            command, payload = self.commands.get()
+            if command == "stop":
+                asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop)
+                return
+            self.loop.call_soon_threadsafe(self.apply_command, command, payload)
+
+    async def shutdown(self):
+        rooms = list(self.router.rooms.values())
+        self.router.rooms.clear()
+        await asyncio.gather(
+            *(room.close(reason="Server shutting down") for room in rooms),
+            return_exceptions=True,
+        )
+        self.router.server.close()
+
+    def apply_command(self, command, payload):
+        if command == "create":
+            self.router.add_room(payload)
+            self.reports.put(("created", self.worker_id, payload))
+        elif command == "remove":
+            room_id, reason = payload
+            task = asyncio.create_task(self.close_room(room_id, reason))
+            self.closing_rooms.add(task)
+            task.add_done_callback(self.closing_rooms.discard)
+        elif command == "drain":
+            for room in self.router.rooms.values():
+                room.accepting = False
+
+    async def close_room(self, room_id, reason):
+        room = self.router.remove_room(room_id)
+        try:
+            if room is not None:
+                await room.close(reason=reason)
+        finally:
+            # The lobby waits for this to count the room as torn down.
+            self.reports.put(("closed", self.worker_id, room_id))
+
+    async def report_load(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            load = {
+                room_id: room.get_client_count()
+                for room_id, room in self.router.rooms.items()
+            }
+            self.reports.put(("load", self.worker_id, load))
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        threading.Thread(target=self.read_commands, daemon=True).start()
+        report_task = asyncio.create_task(self.report_load())
+        if self.metrics_port:
+            await metrics.registry.serve(self.router.host, self.metrics_port)
+            lag_task = asyncio.create_task(
+                metrics.registry.watch_loop(f"worker:{self.worker_id}")
+            )
+        await self.router.start()
+        report_task.cancel()
+        if self.metrics_port:
+            lag_task.cancel()
+
+
+def run_room_worker(
+    worker_id,
+    host,
+    port,
+    certfile,
+    keyfile,
+    commands,
+    reports,
+    report_interval,
+    room_options=None,
+    metrics_port=None,
+    ecdsa_certfile=None,
+    ecdsa_keyfile=None,
+    cert_reload_interval=5.0,
+    log_options=None,
+    capture_path=None,
+):
+    if log_options:
+        logs.configure(**log_options)
+    if capture_path:
+        capture.enable(f"{capture_path}.worker{worker_id}")
+    ssl_context = (
+        load_ssl_context(
+            certfile, keyfile, ecdsa_certfile, ecdsa_keyfile, cert_reload_interval
+        )
+        if certfile or ecdsa_certfile
+        else None
+    )
+    if metrics_port:
+        metrics.enable()
+    worker = RoomWorker(
+        worker_id,
+        host,
+        port,
+        ssl_context,
+        commands,
+        reports,
+        report_interval,
+        room_options,
+        metrics_port,
+    )
+    asyncio.run(worker.run())
+
+
+class RemoteRoom:
+    """Lobby-side handle for a room that lives in a worker process."""
+
+    def __init__(self, host, port, worker_id):
+        self.host = host
+        self.port = port
+        self.worker_id = worker_id
+        self.clients = 0
+        self.idle_since = time.monotonic()
 
     def get_client_count(self):
-        with self.lock:
-            return len(self.clients)
+        return self.clients
+
+
+class RoomWorkerHandle:
+    def __init__(self, worker_id, port, process, commands):
+        self.worker_id = worker_id
+        self.port = port
+        self.process = process
+        self.commands = commands
+        self.rooms = set()
+        self.clients = 0
+
+
+class RoomWorkerPool:
+    """
+    Spreads rooms over worker processes, each listening on its own port
+    (``base_port + worker_id``). New rooms go to the worker with the fewest
+    connected clients, ties broken by room count. With ``metrics_base_port``
+    every worker serves its own metrics on ``metrics_base_port + worker_id``.
+    """
+
+    def __init__(
+        self,
+        host,
+        base_port,
+        workers=None,
+        certfile=None,
+        keyfile=None,
+        report_interval=1.0,
+        room_options=None,
+        metrics_base_port=None,
+        ecdsa_certfile=None,
+        ecdsa_keyfile=None,
+        cert_reload_interval=5.0,
+        log_options=None,
+        capture_path=None,
+    ):
+        self.host = host
+        self.base_port = base_port
+        self.metrics_base_port = metrics_base_port
+        self.worker_count = workers or os.cpu_count() or 1
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.ecdsa_certfile = ecdsa_certfile
+        self.ecdsa_keyfile = ecdsa_keyfile
+        self.cert_reload_interval = cert_reload_interval
+        # logs.configure() arguments for the worker processes.
+        self.log_options = log_options
+        # Worker N captures its traffic to capture_path.workerN.
+        self.capture_path = capture_path
+        self.report_interval = report_interval
+        self.room_options = room_options
+        self.context = multiprocessing.get_context("spawn")
+        self.reports = self.context.Queue()
+        self.workers: list[RoomWorkerHandle] = []
+        self.rooms: dict[int, RemoteRoom] = {}
+        self.pending: dict[int, asyncio.Future] = {}
+        # Rooms being closed, resolved by the worker's "closed" report.
+        self.closing: dict[int, asyncio.Future] = {}
+        self.loop = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        for worker_id in range(self.worker_count):
+            port = self.base_port + worker_id
+            commands = self.context.Queue()
+            process = self.context.Process(
+                target=run_room_worker,
+                args=(
+                    worker_id,
+                    self.host,
+                    port,
+                    self.certfile,
+                    self.keyfile,
+                    commands,
+                    self.reports,
+                    self.report_interval,
+                    self.room_options,
+                    self.metrics_base_port and self.metrics_base_port + worker_id,
+                    self.ecdsa_certfile,
+                    self.ecdsa_keyfile,
+                    self.cert_reload_interval,
+                    self.log_options,
+                    self.capture_path,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.workers.append(RoomWorkerHandle(worker_id, port, process, commands))
+            logging.info(f"Started room worker {worker_id} on port {port}")
+        threading.Thread(target=self.read_reports, daemon=True).start()
+
+    def read_reports(self):
+        while True:
+            report = self.reports.get()
+            if report is None:
+                return
+            self.loop.call_soon_threadsafe(self.apply_report, *report)
+
+    def apply_report(self, kind, worker_id, payload):
+        if kind in ("created", "closed"):
+            futures = self.pending if kind == "created" else self.closing
+            future = futures.pop(payload, None)
+            if future is not None and not future.done():
+                future.set_result(None)
+        elif kind == "load":
+            worker = self.workers[worker_id]
+            worker.clients = sum(payload.values())
+            for room_id, clients in payload.items():
+                room = self.rooms.get(room_id)
+                if room is not None:
+                    room.clients = clients
+                    if clients:
+                        room.idle_since = None
+                    elif room.idle_since is None:
+                        room.idle_since = time.monotonic()
+
+    def least_loaded(self):
+        return min(self.workers, key=lambda w: (w.clients, len(w.rooms)))
+
+    async def create_room(self, room_id, timeout=5.0):
+        worker = self.least_loaded()
+        future = self.loop.create_future()
+        self.pending[room_id] = future
+        worker.rooms.add(room_id)
+        worker.commands.put(("create", room_id))
+        # Only hand out the address once the worker can route to the room.
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            # Stop charging the room to the worker, and drop it there in
+            # case the worker creates it after all.
+            self.pending.pop(room_id, None)
+            worker.rooms.discard(room_id)
+            worker.commands.put(("remove", (room_id, "Room creation failed")))
+            raise
+        room = RemoteRoom(self.host, worker.port, worker.worker_id)
+        self.rooms[room_id] = room
+        return room
+
+    async def remove_room(self, room_id, reason="Room closed", timeout=5.0):
+        """Close a room on its worker and wait until the worker has."""
+        room = self.rooms.pop(room_id, None)
+        if room is None:
+            return None
+        worker = self.workers[room.worker_id]
+        worker.rooms.discard(room_id)
+        future = self.loop.create_future()
+        self.closing[room_id] = future
+        worker.commands.put(("remove", (room_id, reason)))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                f"Worker {room.worker_id} did not close room {room_id} "
+                f"within {timeout}s"
+            )
+        finally:
+            self.closing.pop(room_id, None)
+        return room
+
+    def drain(self):
+        for worker in self.workers:
+            worker.commands.put(("drain", None))
+
+    def stop(self):
+        for worker in self.workers:
+            worker.commands.put(("stop", None))
+        for worker in self.workers:
+            worker.process.join(timeout=5)
+        self.reports.put(None)
+
+
+class PortPool:
+    """Hands out room ports from base_port upwards, reusing freed ports first."""
+
+    def __init__(self, base_port):
+        self.next_port = base_port
+        self.free = []
+
+    def acquire(self):
+        if self.free:
+            return heapq.heappop(self.free)
+        port = self.next_port
+        self.next_port += 1
+        return port
+
+    def release(self, port):
+        heapq.heappush(self.free, port)
+
+    def reserve(self, port):
+        """Take a given port out of the pool, e.g. a restored room's."""
+        if port >= self.next_port:
+            for free_port in range(self.next_port, port):
+                heapq.heappush(self.free, free_port)
+            self.next_port = port + 1
+        elif port in self.free:
+            self.free.remove(port)
+            heapq.heapify(self.free)
+        return port
+
+
+class RoomRegistry(collections.abc.Mapping):
+    """
+    Room id -> (server, thread) map for the lobby.
+
+    Writers never mutate the current mapping: they copy it, change the copy
+    and publish it with a single assignment. Readers therefore always see a
+    consistent snapshot, need no lock and can keep iterating it across
+    awaits while rooms are being created or closed.
+    """
+
+    def __init__(self):
+        self.rooms = MappingProxyType({})
+
+    def snapshot(self):
+        return self.rooms
+
+    def add(self, room_id, entry):
+        rooms = dict(self.rooms)
+        rooms[room_id] = entry
+        self.rooms = MappingProxyType(rooms)
+
+    def update(self, entries):
+        rooms = dict(self.rooms)
+        rooms.update(entries)
+        self.rooms = MappingProxyType(rooms)
+
+    def remove(self, room_id):
+        entry = self.rooms.get(room_id)
+        if entry is not None:
+            rooms = dict(self.rooms)
+            del rooms[room_id]
+            self.rooms = MappingProxyType(rooms)
+        return entry
+
+    def __getitem__(self, room_id):
+        return self.rooms[room_id]
+
+    def __iter__(self):
+        return iter(self.rooms)
+
+    def __len__(self):
+        return len(self.rooms)
+
+
+class RoomListFeed:
+    """
+    Cached, versioned room list for the lobby.
+
+    The list is rebuilt at most once per ``interval``, or on the next request
+    after ``invalidate`` when rooms open or close: the registry snapshot is
+    diffed against the last published rows and, if anything changed, the
+    version is bumped and one delta frame is encoded per codec and queued to
+    every ``subscribe_list`` client. Full lists are encoded once per version
+    and codec, so ``list`` requests and new subscribers only copy bytes.
+    Idle subscribers cost nothing while no room changes.
+    """
+
+    def __init__(self, lobby, interval=0.25, max_queue=64):
+        self.lobby = lobby
+        self.interval = interval
+        self.max_queue = max_queue
+        self.version = 0
+        self.rows = {}
+        self.frames = {}
+        self.refreshed_at = None
+        self.subscribers: dict[any, ClientSession] = {}
+        self.resyncs = 0
+
+    def diff(self):
+        """Update the published rows; return the delta, or None if unchanged."""
+        self.refreshed_at = time.monotonic()
+        current = {}
+        added, updated = [], []
+        for room_id, address, clients in self.lobby.list_rows():
+            row = self.rows.get(room_id)
+            if row is None:
+                row = {"id": room_id, "address": address, "clients": clients}
+                added.append(row)
+            elif row["clients"] != clients:
+                row = dict(row, clients=clients)
+                updated.append({"id": room_id, "clients": clients})
+            current[room_id] = row
+        removed = [room_id for room_id in self.rows if room_id not in current]
+        if not (added or updated or removed):
+            return None
+        self.rows = current
+        self.version += 1
+        self.frames = {}
+        return {
+            "servers_delta": {
+                "version": self.version,
+                "added": added,
+                "removed": removed,
+                "updated": updated,
+            }
+        }
+
+    def full_frame(self, codec):
+        frame = self.frames.get(codec.name)
+        if frame is None:
+            frame = codec.encode(
+                {"servers": list(self.rows.values()), "version": self.version}
+            )
+            self.frames[codec.name] = frame
+        return frame
+
+    def invalidate(self):
+        """Rebuild the list on the next request, e.g. after a room closed."""
+        self.refreshed_at = None
+
+    def list_frame(self, codec):
+        if (
+            self.refreshed_at is None
+            or time.monotonic() - self.refreshed_at >= self.interval
+        ):
+            self.publish()
+        return self.full_frame(codec)
+
+    def publish(self):
+        delta = self.diff()
+        if delta is None or not self.subscribers:
+            return
+        frames = {}
+        for session in self.subscribers.values():
+            if session.queue and len(session.queue) >= session.max_queue:
+                # Too far behind for deltas to help: replace the backlog
+                # with the current full list.
+                session.queue.clear()
+                session.enqueue(self.full_frame(session.codec))
+                self.resyncs += 1
+                continue
+            frame = frames.get(session.codec.name)
+            if frame is None:
+                frame = frames[session.codec.name] = session.codec.encode(delta)
+            session.enqueue(frame)
+
+    def subscribe(self, websocket):
+        session = self.subscribers.pop(websocket, None)
+        if session is None:
+            session = ClientSession(websocket, self.max_queue)
+        # Refresh the list before (re)adding the subscriber, so a delta the
+        # refresh publishes cannot reach it ahead of its full list.
+        frame = self.list_frame(session.codec)
+        self.subscribers[websocket] = session
+        session.enqueue(frame)
+
+    def unsubscribe(self, websocket):
+        session = self.subscribers.pop(websocket, None)
+        if session is not None:
+            session.close()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.subscribers:
+                self.publish()
 
 
 class MainServer:
-    def __init__(self, host="localhost", port=8765):
+    def __init__(
+        self,
+        host="localhost",
+        port=8765,
+        ssl_context=None,
+        rooms="thread",
+        worker_pool=None,
+        room_options=None,
+        room_ttl=300.0,
+        reap_interval=5.0,
+        room_base_port=9000,
+        list_interval=0.25,
+        metrics_port=None,
+        drain_timeout=300.0,
+        lobby_limit=None,
+        registry=None,
+        node_id=None,
+        placement="local",
+        sync_interval=1.0,
+        node_ttl=5.0,
+        snapshot_path=None,
+        snapshot_interval=1.0,
+    ):
         self.host = host
         self.port = port
-        self.echo_servers: dict[any, tuple[EchoServer, threading.Thread]] = {}
-        self.next_server_id = 1
-        self.lock = threading.Lock()
+        self.ssl_context = ssl_context
+        # Rooms that stay empty for room_ttl seconds are closed; None or 0
+        # keeps empty rooms forever.
+        self.room_ttl = room_ttl
+        self.reap_interval = reap_interval
+        self.port_pool = PortPool(room_base_port)
+        self.room_counters = {
+            "created": 0,
+            "closed": 0,
+            "reaped": 0,
+            "placed_remote": 0,
+            "restored": 0,
+        }
+        # Keyword arguments passed to every EchoServer this lobby creates.
+        self.room_options = room_options or {}
+        # "thread" runs every room on its own thread and port, "shared" hosts
+        # all rooms on the lobby's event loop and port through a RoomRouter,
+        # "workers" places rooms on the RoomRouters of a RoomWorkerPool.
+        self.room_mode = rooms
+        self.worker_pool = worker_pool
+        self.router = (
+            RoomRouter(
+                host, port, ssl_context=ssl_context, room_options=self.room_options
+            )
+            if rooms == "shared"
+            else None
+        )
+        self.echo_servers = RoomRegistry()
+        self.server_ids = itertools.count(1)
+        self.room_list = RoomListFeed(self, interval=list_interval)
+        # Serve Prometheus metrics on this port; requires metrics.enable().
+        self.metrics_port = metrics_port
+        # While draining, no rooms are created or joined; rooms close as they
+        # empty and whatever is left after drain_timeout is closed anyway.
+        self.draining = False
+        self.drain_timeout = drain_timeout
+        self.drain_task = None
+        # Milliseconds each of the most recent room teardowns took.
+        self.teardown_times = collections.deque(maxlen=1000)
+        self.server = None
+        # RateLimit for lobby connections, or None.
+        self.lobby_limit = lobby_limit
+        # Room directory (networking.federation spec) shared with other lobby
+        # nodes, or None to run this lobby on its own.
+        self.directory = federation.get(registry) if registry else None
+        self.node_id = node_id or f"{host}:{port}"
+        # Where new rooms go: "local" (this node), "hash" or "least_load"
+        # over the live nodes; other nodes only take rooms in shared mode.
+        self.placement = placement
+        self.sync_interval = sync_interval
+        self.node_ttl = node_ttl
+        # Live nodes and other nodes' rooms as of the last directory sync.
+        self.nodes = {}
+        self.remote_rooms = MappingProxyType({})
+        # Room id -> monotonic close time for rooms closed here recently, so
+        # a sync that read the directory before the close does not bring
+        # them back.
+        self.closed_ids = {}
+        # Rooms are saved to snapshot_path every snapshot_interval seconds
+        # and recreated from it on start, or None.
+        self.snapshots = (
+            snapshots.SnapshotWriter(
+                snapshot_path, self.capture_rooms, snapshot_interval
+            )
+            if snapshot_path
+            else None
+        )
+
+    def room_address(self, server_id, server):
+        if self.room_mode == "thread":
+            return f"ws://{self.host}:{server.port}"
+        return f"ws://{self.host}:{server.port}{ROOM_PATH_PREFIX}{server_id}"
 
     async def handle_client(self, websocket):
+        if self.router is not None:
+            room_id = parse_room_path(websocket.request.path)
+            if room_id is not None:
+                await self.adopt_room(room_id)
+                await self.router.enter(websocket, room_id)
+                return
+        session = Session(
+            websocket,
+            rate_limit=self.lobby_limit,
+            limited=(
+                metrics.registry.lobby_limited if metrics.registry is not None else None
+            ),
+        )
+        codec = session.codec
+        limiter = session.limiter
+        if metrics.registry is not None:
+            metrics.registry.lobby_connections += 1
+            metrics.registry.lobby_connections_total += 1
         try:
             while True:
                 try:
                     message = await websocket.recv()
-                    logging.debug(f"Received message: {message}")
-                    data = json.loads(message)
+                    message_log.debug("Received message: %s", message)
+                    if limiter is not None and not await limiter.admit(
+                        websocket, message
+                    ):
+                        continue
+                    data = codec.decode(message)
                     command = data.get("command")
 
                     if command == "list":
                         await self.list_echo_servers(websocket)
+                    elif command == "subscribe_list":
+                        self.room_list.subscribe(websocket)
+                    elif command == "unsubscribe_list":
+                        self.room_list.unsubscribe(websocket)
+                    elif command in ("create", "join") and self.draining:
+                        await send_data(websocket, {"error": "Server is draining"})
                     elif command == "create":
-                        address = await self.create_echo_server()
-                        await websocket.send(
-                            json.dumps(
-                                {"message": f"Created Echo Server", "address": address}
+                        try:
+                            address = await self.create_echo_server()
+                        except asyncio.TimeoutError:
+                            # A room worker did not confirm the room in time.
+                            await send_data(
+                                websocket, {"error": "Room creation timed out"}
                             )
-                            + "\n"
+                            continue
+                        await send_data(
+                            websocket,
+                            {"message": f"Created Echo Server", "address": address},
                         )
                     elif command == "join":
                         await self.join_echo_server(websocket, data.get("server_id"))
+                    elif command == "enter" and self.router is not None:
+                        # Hand this connection over to the room; the room owns
+                        # it until the client disconnects.
+                        await self.adopt_room(data.get("server_id"))
+                        await self.router.enter(websocket, data.get("server_id"))
+                        return
                     elif command == "message":
-                        logging.info(f"Received message: {data.get('message')}")
-                        await websocket.send(
-                            json.dumps({"message": "Message received"}) + "\n"
-                        )
+                        message_log.info("Received message: %s", data.get("message"))
+                        await send_data(websocket, {"message": "Message received"})
+                    elif command == "stats":
+                        stats = {"rooms": self.room_stats()}
+                        if self.ssl_context is not None:
+                            stats["tls"] = tls.resumption_stats(self.ssl_context)
+                        if metrics.registry is not None:
+                            stats["metrics"] = metrics.registry.snapshot()
+                        await send_data(websocket, {"stats": stats})
                     elif command == "nuke":
                         logging.info(f"Nuking server")
-                        await websocket.send(
-                            json.dumps({"message": "Nuking server"}) + "\n"
+                        await send_data(websocket, {"message": "Nuking server"})
+                        teardown = await self.close_rooms(
+                            list(self.echo_servers), reason="Room nuked"
                         )
-                        for server_id, server_data in self.echo_servers.items():
-                            server, thread = server_data
-                            # server.broadcast()
-                            server.running = False
-                            # thread.join()
-                            logging.info(f"Stopped server {server_id}")
-                        self.echo_servers.clear()
-                        await websocket.send(
-                            json.dumps({"message": "All servers nuked"}) + "\n"
+                        await send_data(
+                            websocket,
+                            {"message": "All servers nuked", "teardown": teardown},
                         )
-                        logging.info(f"All servers nuked")
-                    else:
-                        await websocket.send(
-                            json.dumps({"error": "Invalid command"}) + "\n"
+                        logging.info(f"All servers nuked: {teardown}")
+                    elif command == "drain":
+                        self.start_drain(data.get("timeout", self.drain_timeout))
+                        await send_data(
+                            websocket,
+                            {
+                                "message": "Draining",
+                                "rooms": len(self.echo_servers),
+                            },
                         )
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSONDecodeError: {e}")
-                    await websocket.send(
-                        json.dumps({"error": "Invalid JSON format"}) + "\n"
+                    else:
+                        await send_data(websocket, {"error": "Invalid command"})
+                except DecodeError as e:
+                    logging.error(f"DecodeError: {e}")
+                    await send_data(
+                        websocket, {"error": f"Invalid {codec.label} format"}
                     )
                 except KeyError as e:
                     logging.error(f"KeyError: {e}")
-                    await websocket.send(
-                        json.dumps({"error": f"Missing key: {e}"}) + "\n"
-                    )
+                    await send_data(websocket, {"error": f"Missing key: {e}"})
+                except websockets.exceptions.ConnectionClosed:
+                    # E.g. websockets refused a frame over the size limit.
+                    raise
                 except Exception as e:
                     logging.exception(
                         f"Unexpected error processing command from {websocket.remote_address}|{e}|"
                     )
                     break
 
-        except websockets.exceptions.ConnectionClosedError:
+        except websockets.exceptions.ConnectionClosed:
             logging.info(f"Client disconnected from main server")
         except Exception as e:
             logging.exception(f"Error handling client: {e}")
+        finally:
+            self.room_list.unsubscribe(websocket)
+            if metrics.registry is not None:
+                metrics.registry.lobby_connections -= 1
+                if dead_peer(websocket):
+                    metrics.registry.lobby_reaped += 1
 
     async def list_echo_servers(self, websocket):
-        server_list = []
-        with self.lock:
-            for id, server_data in self.echo_servers.items():
-                server, _ = server_data
-                server_list.append(
-                    {
-                        "id": id,
-                        "address": f"ws://{self.host}:{server.port}",
-                        "clients": server.get_client_count(),
-                    }
-                )  # Include client count
-        await websocket.send(json.dumps({"servers": server_list}) + "\n")
+        codec = codec_for(websocket)
+        await websocket.send(self.room_list.list_frame(codec), text=codec.text)
 
     async def create_echo_server(self):
-        echo_port = self.next_server_id + 9000 - 1
-        # echo_port = random.randint(9000, 9999)
-        echo_server = EchoServer(self.host, echo_port)
+        if self.directory is None:
+            return await self.create_local_room(next(self.server_ids))
+        server_id = await self.directory_call(self.directory.allocate_id)
+        node_id = self.node_id
+        if self.placement != "local" and self.router is not None:
+            node_id = federation.choose_node(self.placement, server_id, self.nodes)
+        node = self.nodes.get(node_id)
+        if node_id == self.node_id or node is None:
+            address = await self.create_local_room(server_id)
+        else:
+            address = f"{node['address']}{ROOM_PATH_PREFIX}{server_id}"
+            self.room_counters["placed_remote"] += 1
+        await self.directory_call(
+            self.directory.place, server_id, node_id if node else self.node_id, address
+        )
+        return address
+
+    async def create_local_room(self, server_id):
+        entry = await self.open_room(server_id)
+        self.echo_servers.add(server_id, entry)
+        self.room_list.invalidate()
+        self.room_counters["created"] += 1
+        return self.room_address(server_id, entry[0])
+
+    async def open_room(self, server_id, port=None):
+        """Start a room (on ``port`` in thread mode); return its registry entry."""
+        if self.router is not None:
+            return self.router.add_room(server_id), None
+
+        if self.worker_pool is not None:
+            return await self.worker_pool.create_room(server_id), None
+
+        if port is None:
+            echo_port = self.port_pool.acquire()
+        else:
+            echo_port = self.port_pool.reserve(port)
+        echo_server = EchoServer(
+            self.host,
+            echo_port,
+            ssl_context=self.ssl_context,
+            name=str(server_id),
+            **self.room_options,
+        )
         thread = threading.Thread(target=asyncio.run, args=(echo_server.start(),))
         thread.daemon = (
             True  # Allow main program to exit even if thread is still running
         )
         thread.start()
-        with self.lock:
-            self.echo_servers[self.next_server_id] = (echo_server, thread)
-            server_id = self.next_server_id
-            self.next_server_id += 1
-        return f"ws://{self.host}:{echo_port}"
+        return echo_server, thread
 
-    async def join_echo_server(self, websocket, server_id):
-        with self.lock:
-            if server_id in self.echo_servers:
-                server, _ = self.echo_servers[server_id]
-                address = f"ws://{self.host}:{server.port}"
-                await websocket.send(
-                    json.dumps(
-                        {
-                            "message": f"Joined Echo Server {server_id}",
-                            "address": address,
-                            "host": self.host,
-                            "port": server.port,
-                            "server_id": server_id,
-                        }
+    async def close_room(self, server_id, reason="Room closed"):
+        """
+        Tear a room down for real: notify and flush its clients, close its
+        connections and listener, stop its thread (thread mode) and return
+        its port to the pool once the thread has ended.
+        """
+        server_data = self.echo_servers.remove(server_id)
+        if server_data is None:
+            return False
+        self.room_list.invalidate()
+        started = time.perf_counter()
+        server, thread = server_data
+        if self.worker_pool is not None:
+            await self.worker_pool.remove_room(server_id, reason)
+        elif thread is not None:
+            server.running = False
+            if server.loop is not None and server.loop.is_running():
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(
+                        server.close(reason=reason), server.loop
                     )
-                    + "\n"
+                )
+            # The thread ends as soon as the room's loop does; poll instead
+            # of parking an executor thread on join() for every room.
+            deadline = time.monotonic() + 5
+            while thread.is_alive() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            if thread.is_alive():
+                # Its listener may still hold the port; never hand it out again.
+                logging.warning(
+                    f"Room {server_id} thread still running after close, "
+                    f"leaving port {server.port} out of the pool"
                 )
             else:
-                await websocket.send(json.dumps({"error": "Server not found"}) + "\n")
+                self.port_pool.release(server.port)
+        else:
+            self.router.remove_room(server_id)
+            await server.close(reason=reason)
+        if self.directory is not None:
+            self.closed_ids[server_id] = time.monotonic()
+            await self.directory_call(self.directory.remove, [server_id])
+        self.teardown_times.append((time.perf_counter() - started) * 1000)
+        self.room_counters["closed"] += 1
+        return True
 
-    async def start(self):
+    async def close_rooms(self, server_ids, reason="Room closed"):
+        """Close rooms concurrently; return how long the teardown took."""
+        started = time.perf_counter()
+
+        async def timed_close(server_id):
+            room_started = time.perf_counter()
+            if await self.close_room(server_id, reason):
+                return (time.perf_counter() - room_started) * 1000
+            return None
+
+        times = [
+            ms
+            for ms in await asyncio.gather(*map(timed_close, server_ids))
+            if ms is not None
+        ]
+        times.sort()
+        return {
+            "rooms": len(times),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "p50_room_ms": round(times[len(times) // 2], 1) if times else 0,
+            "max_room_ms": round(times[-1], 1) if times else 0,
+        }
+
+    def start_drain(self, timeout=None):
+        if self.drain_task is None:
+            self.drain_task = asyncio.create_task(
+                self.drain(self.drain_timeout if timeout is None else timeout)
+            )
+        return self.drain_task
+
+    async def drain(self, timeout):
+        """
+        Stop taking new players, close rooms as their players leave, close
+        what is left once ``timeout`` seconds have passed, then shut down.
+        """
+        logging.info(f"Draining {len(self.echo_servers)} rooms (timeout {timeout}s)")
+        self.draining = True
+        if self.worker_pool is not None:
+            self.worker_pool.drain()
+        for server, _ in self.echo_servers.snapshot().values():
+            server.accepting = False
+        deadline = time.monotonic() + timeout
+        while self.echo_servers and time.monotonic() < deadline:
+            empty = [
+                server_id
+                for server_id, (server, _) in self.echo_servers.snapshot().items()
+                if server.get_client_count() == 0
+            ]
+            await self.close_rooms(empty, reason="Server restarting")
+            await asyncio.sleep(min(self.reap_interval, 1.0))
+        await self.shutdown(reason="Server restarting")
+
+    async def shutdown(self, reason="Server shutting down"):
+        """Close every room, then the lobby listener and the room workers."""
+        writer, self.snapshots = self.snapshots, None
+        if writer is not None:
+            # Saved before the rooms close, so a restart brings them back.
+            await writer.close()
+        teardown = await self.close_rooms(list(self.echo_servers), reason)
+        logging.info(f"Closed rooms: {teardown}")
+        for name in ("reaper_task", "room_list_task", "lag_task", "sync_task"):
+            task = getattr(self, name, None)
+            if task is not None:
+                task.cancel()
+        if self.directory is not None:
+            await self.directory_call(self.directory.leave, self.node_id)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.worker_pool is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.worker_pool.stop
+            )
+        return teardown
+
+    def room_stats(self):
+        rooms = [server for server, _ in self.echo_servers.snapshot().values()]
+        return {
+            "live": len(rooms),
+            "idle": sum(1 for room in rooms if room.idle_since is not None),
+            **self.room_counters,
+            "draining": self.draining,
+            "teardown_max_ms": round(max(self.teardown_times, default=0), 1),
+            "list_version": self.room_list.version,
+            "list_subscribers": len(self.room_list.subscribers),
+            **(
+                {
+                    "nodes": len(self.nodes),
+                    "federated_rooms": len(self.remote_rooms) + len(rooms),
+                }
+                if self.directory is not None
+                else {}
+            ),
+        }
+
+    def capture_rooms(self):
+        """Room ids and ports for the snapshot file."""
+        return {
+            "rooms": [
+                [room_id, server.port]
+                for room_id, (server, _) in self.echo_servers.snapshot().items()
+            ],
+        }
+
+    async def restore_rooms(self):
+        """Recreate the rooms of the last snapshot with their ids and ports."""
+        started = time.perf_counter()
+        snapshot = await asyncio.get_running_loop().run_in_executor(
+            None, snapshots.load, self.snapshots.path
+        )
+        if not snapshot:
+            return
+        rooms = snapshot.get("rooms", [])
+        entries = {}
+        for room_id, port in rooms:
+            if room_id not in self.echo_servers:
+                entries[room_id] = await self.open_room(
+                    room_id, port if self.room_mode == "thread" else None
+                )
+        # One registry update for all of them rather than a copy per room.
+        self.echo_servers.update(entries)
+        self.room_counters["restored"] += len(entries)
+        self.server_ids = itertools.count(
+            max((room_id for room_id, _ in rooms), default=0) + 1
+        )
+        logging.info(
+            f"Restored {len(rooms)} rooms from {self.snapshots.path} in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    async def directory_call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    def list_rows(self):
+        """(room id, address, clients) for every room on every live node."""
+        for room_id, (server, _) in self.echo_servers.snapshot().items():
+            yield room_id, self.room_address(room_id, server), server.get_client_count()
+        for room_id, room in self.remote_rooms.items():
+            if room_id not in self.echo_servers:
+                yield room_id, room["address"], room["clients"]
+
+    async def find_remote_room(self, server_id):
+        if self.directory is None:
+            return None
+        room = self.remote_rooms.get(server_id)
+        if room is None:
+            # Possibly placed since the last sync.
+            room = await self.directory_call(
+                self.directory.lookup, server_id, self.node_ttl
+            )
+        return room
+
+    async def adopt_room(self, server_id):
+        """Create a room another node placed here, if it is not running yet."""
+        if (
+            self.directory is None
+            or self.router is None
+            or self.draining
+            or server_id in self.echo_servers
+            or server_id in self.closed_ids
+            or not isinstance(server_id, int)
+        ):
+            return
+        room = await self.find_remote_room(server_id)
+        if room is not None and room["node"] == self.node_id:
+            if server_id not in self.echo_servers:
+                await self.create_local_room(server_id)
+
+    async def sync_directory(self):
+        rooms = {
+            room_id: (self.room_address(room_id, server), server.get_client_count())
+            for room_id, (server, _) in self.echo_servers.snapshot().items()
+        }
+        node = {
+            "address": f"ws://{self.host}:{self.port}",
+            "rooms": len(rooms),
+            "clients": sum(clients for _, clients in rooms.values()),
+            "draining": self.draining,
+        }
+        self.nodes, all_rooms = await self.directory_call(
+            self.directory.sync, self.node_id, node, rooms, self.node_ttl
+        )
+        self.remote_rooms = MappingProxyType(
+            {
+                room_id: room
+                for room_id, room in all_rooms.items()
+                if room["node"] != self.node_id
+            }
+        )
+        self.room_list.invalidate()
+        cutoff = time.monotonic() - 2 * self.node_ttl
+        self.closed_ids = {
+            room_id: closed_at
+            for room_id, closed_at in self.closed_ids.items()
+            if closed_at > cutoff
+        }
+        stale = []
+        for room_id, room in all_rooms.items():
+            if room["node"] != self.node_id or room_id in self.echo_servers:
+                continue
+            if room_id in self.closed_ids:
+                stale.append(room_id)
+                continue
+            if self.router is not None and not self.draining:
+                # Placed here by another node and nobody has entered yet.
+                await self.create_local_room(room_id)
+            else:
+                # Left over from before a restart.
+                stale.append(room_id)
+        if stale:
+            await self.directory_call(self.directory.remove, stale)
+
+    async def run_directory_sync(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync_directory()
+            except Exception as e:
+                logging.error(f"Room directory sync failed: {e}")
+
+    async def reap_idle_rooms(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            now = time.monotonic()
+            expired = [
+                server_id
+                for server_id, (server, _) in self.echo_servers.snapshot().items()
+                if server.idle_since is not None
+                and now - server.idle_since > self.room_ttl
+            ]
+            for server_id in expired:
+                if await self.close_room(server_id):
+                    self.room_counters["reaped"] += 1
+                    logging.info(f"Reaped idle server {server_id}")
+
+    async def join_echo_server(self, websocket, server_id):
+        server_data = self.echo_servers.get(server_id)
+        if server_data is None:
+            room = await self.find_remote_room(server_id)
+            if room is None:
+                await send_data(websocket, {"error": "Server not found"})
+                return
+            address = urlsplit(room["address"])
+            reply = {
+                "message": f"Joined Echo Server {server_id}",
+                "address": room["address"],
+                "host": address.hostname,
+                "port": address.port,
+                "server_id": server_id,
+            }
+            if address.path:
+                reply["path"] = address.path
+            await send_data(websocket, reply)
+            return
+        server, _ = server_data
+        reply = {
+            "message": f"Joined Echo Server {server_id}",
+            "address": self.room_address(server_id, server),
+            "host": self.host,
+            "port": server.port,
+            "server_id": server_id,
+        }
+        if self.room_mode != "thread":
+            reply["path"] = f"{ROOM_PATH_PREFIX}{server_id}"
+        await send_data(websocket, reply)
+
+    async def start(self, handle_signals=False):
+        if handle_signals:
+            # SIGTERM drains for a rolling restart, SIGINT shuts down now.
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGTERM, self.start_drain)
+            loop.add_signal_handler(
+                signal.SIGINT, lambda: asyncio.create_task(self.shutdown())
+            )
+        if self.worker_pool is not None:
+            await self.worker_pool.start()
+        if self.snapshots is not None:
+            await self.restore_rooms()
+            self.snapshots.start()
+        if self.room_ttl:
+            self.reaper_task = asyncio.create_task(self.reap_idle_rooms())
+        self.room_list_task = asyncio.create_task(self.room_list.run())
+        if self.directory is not None:
+            await self.sync_directory()
+            self.sync_task = asyncio.create_task(self.run_directory_sync())
+        if metrics.registry is not None:
+            self.lag_task = asyncio.create_task(metrics.registry.watch_loop("lobby"))
+            if self.metrics_port:
+                await metrics.registry.serve(self.host, self.metrics_port)
+        # Shared-mode rooms are served on the lobby's listener too.
+        limits = [self.lobby_limit]
+        if self.router is not None:
+            limits.append(self.room_options.get("rate_limit"))
         try:
-            server = await websockets.serve(
-                self.handle_client, self.host, self.port, ssl=ssl_context
+            self.server = await websockets.serve(
+                self.handle_client,
+                self.host,
+                self.port,
+                ssl=self.ssl_context,
+                compression=self.room_options.get("compression", "deflate"),
+                select_subprotocol=select_subprotocol,
+                **heartbeat_options(self.room_options),
+                **limit_options(*limits),
+                **capture.serve_options(),
             )
             logging.info(f"Main server started on ws://{self.host}:{self.port}")
-            await server.wait_closed()
+            await self.server.wait_closed()
         except Exception as e:
             logging.error(f"Error starting main server: {e}")
 
@@ -251,10 +1775,259 @@ def main():
     parser.add_argument(
         "--port", type=int, default=8765, help="Port for the main server"
     )
+    parser.add_argument(
+        "--rooms",
+        choices=("thread", "shared", "workers"),
+        default="thread",
+        help="Host each room on its own thread and port, all rooms on the main port, "
+        "or rooms spread over worker processes",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of room worker processes (with --rooms workers); "
+        "worker N listens on port + 1 + N",
+    )
+    parser.add_argument(
+        "--cert", type=str, default="certs/cert.pem", help="Path to Cert file"
+    )
+    parser.add_argument(
+        "--key", type=str, default="certs/key.pem", help="Path to Key file"
+    )
+    parser.add_argument(
+        "--ecdsa-cert",
+        help="ECDSA P-256 certificate served alongside --cert to clients "
+        "that support it",
+    )
+    parser.add_argument("--ecdsa-key", help="Key for --ecdsa-cert")
+    parser.add_argument(
+        "--cert-reload-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between checks of the certificate files for rotation "
+        "(0 loads them once)",
+    )
+    parser.add_argument(
+        "--send-queue-size",
+        type=int,
+        default=256,
+        help="Maximum queued outbound messages per room client",
+    )
+    parser.add_argument(
+        "--slow-consumer-policy",
+        choices=SLOW_CONSUMER_POLICIES,
+        default="drop_oldest",
+        help="What to do when a room client's send queue is full",
+    )
+    parser.add_argument(
+        "--bus",
+        default="local",
+        help="Room pub/sub bus shared by rooms of the same id: 'local', "
+        "'unix:PATH' for a broker started with 'python -m networking.pubsub "
+        "--socket PATH', or 'module:Class[=ARG]' for a custom backend",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=("deflate", "none"),
+        default="deflate",
+        help="permessage-deflate for room traffic; 'none' lets broadcasts skip "
+        "compressing every frame once per recipient",
+    )
+    parser.add_argument(
+        "--room-ttl",
+        type=float,
+        default=300.0,
+        help="Seconds an empty room is kept before it is closed (0 keeps it forever)",
+    )
+    parser.add_argument(
+        "--list-interval",
+        type=float,
+        default=0.25,
+        help="Seconds between room list updates pushed to subscribe_list clients",
+    )
+    parser.add_argument(
+        "--lobby-limit",
+        type=RateLimit.parse,
+        default=DEFAULT_LIMITS["lobby"],
+        help="Per-connection lobby limit as RATE,BURST,MAX_BYTES,ACTION "
+        "(action: drop, delay or disconnect) or 'off'",
+    )
+    parser.add_argument(
+        "--echo-limit",
+        type=RateLimit.parse,
+        default=DEFAULT_LIMITS["echo"],
+        help="Per-connection room limit, same format as --lobby-limit",
+    )
+    parser.add_argument(
+        "--tick-ms",
+        type=float,
+        default=0,
+        help="Collect room echoes for this many milliseconds and send them as "
+        'one {"batch": [...]} frame per client (0 sends every echo at once)',
+    )
+    parser.add_argument(
+        "--exclude-sender",
+        action="store_true",
+        help="Do not echo a client's messages back to itself",
+    )
+    parser.add_argument(
+        "--ping-interval",
+        type=float,
+        default=20.0,
+        help="Seconds between keepalive pings on every connection (0 disables)",
+    )
+    parser.add_argument(
+        "--ping-timeout",
+        type=float,
+        default=20.0,
+        help="Seconds to wait for a pong before dropping the connection",
+    )
+    parser.add_argument(
+        "--close-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds to wait for the closing handshake before dropping the "
+        "socket, e.g. after a missed pong",
+    )
+    parser.add_argument(
+        "--open-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds a client gets to finish the opening handshake",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=0,
+        help="Close room connections that send nothing for this many seconds "
+        "(0 disables; lobby connections are only kept in check by pings)",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=300.0,
+        help="Seconds a drain (SIGTERM or the drain command) waits for rooms "
+        "to empty before closing them",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Enable metrics and serve them in Prometheus format on this port "
+        "(room workers use the following ports)",
+    )
+    parser.add_argument(
+        "--registry",
+        help="Room directory shared with other lobby nodes: 'sqlite:PATH', "
+        "'file:PATH' or 'module:Class[=ARG]' (default: this lobby only)",
+    )
+    parser.add_argument(
+        "--node-id", help="This lobby's name in the registry (default host:port)"
+    )
+    parser.add_argument(
+        "--placement",
+        choices=federation.PLACEMENTS,
+        default="local",
+        help="Node new rooms are created on; 'hash' and 'least_load' spread "
+        "them over the registry's nodes (needs --rooms shared)",
+    )
+    parser.add_argument(
+        "--sync-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between registry syncs",
+    )
+    parser.add_argument(
+        "--node-ttl",
+        type=float,
+        default=5.0,
+        help="Seconds without a sync after which a node and its rooms are "
+        "dropped from the registry view",
+    )
+    parser.add_argument(
+        "--capture",
+        help="Record every frame of the lobby and its rooms to this file "
+        "(room workers write PATH.workerN); replay it with "
+        "'python -m networking.replay'",
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Save the room registry to this file and restore it on start",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between room registry snapshots",
+    )
+    logs.add_arguments(parser)
     args = parser.parse_args()
+    log_options = logs.options_from_args(args)
+    logs.configure(**log_options)
 
-    main_server = MainServer(host=args.host, port=args.port)
-    asyncio.run(main_server.start())
+    room_options = {
+        "send_queue_size": args.send_queue_size,
+        "slow_consumer_policy": args.slow_consumer_policy,
+        "compression": None if args.compression == "none" else args.compression,
+        "rate_limit": args.echo_limit,
+        "tick": args.tick_ms / 1000 if args.tick_ms else None,
+        "exclude_sender": args.exclude_sender,
+        "ping_interval": args.ping_interval or None,
+        "ping_timeout": args.ping_timeout or None,
+        "close_timeout": args.close_timeout or None,
+        "open_timeout": args.open_timeout or None,
+        "idle_timeout": args.idle_timeout or None,
+        "bus": args.bus,
+    }
+    ssl_context = load_ssl_context(
+        args.cert,
+        args.key,
+        args.ecdsa_cert,
+        args.ecdsa_key,
+        args.cert_reload_interval,
+    )
+    if args.metrics_port:
+        metrics.enable()
+    if args.capture:
+        capture.enable(args.capture)
+    worker_pool = None
+    if args.rooms == "workers":
+        worker_pool = RoomWorkerPool(
+            args.host,
+            args.port + 1,
+            workers=args.workers,
+            certfile=args.cert,
+            keyfile=args.key,
+            ecdsa_certfile=args.ecdsa_cert,
+            ecdsa_keyfile=args.ecdsa_key,
+            cert_reload_interval=args.cert_reload_interval,
+            log_options=log_options,
+            capture_path=args.capture,
+            room_options=room_options,
+            metrics_base_port=args.metrics_port and args.metrics_port + 1,
+        )
+    main_server = MainServer(
+        host=args.host,
+        port=args.port,
+        ssl_context=ssl_context,
+        rooms=args.rooms,
+        worker_pool=worker_pool,
+        room_options=room_options,
+        room_ttl=args.room_ttl,
+        list_interval=args.list_interval,
+        metrics_port=args.metrics_port,
+        drain_timeout=args.drain_timeout,
+        lobby_limit=args.lobby_limit,
+        registry=args.registry,
+        node_id=args.node_id,
+        placement=args.placement,
+        sync_interval=args.sync_interval,
+        node_ttl=args.node_ttl,
+        snapshot_path=args.snapshot,
+        snapshot_interval=args.snapshot_interval,
+    )
+    asyncio.run(main_server.start(handle_signals=True))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+"""
+Heartbeats, idle timeouts and dead-peer detection.
+
+Half-open connections (a tab that vanished behind NAT, a frozen client)
+never send a close frame. websockets' keepalive catches them: a ping goes
+out every ``ping_interval`` seconds and the connection is failed when its
+pong has not arrived after ``ping_timeout``, and the socket is dropped once
+the close handshake has had ``close_timeout`` to finish, so a dead peer is
+gone after at most the sum of the three. ``open_timeout`` bounds the
+opening handshake. A LivenessTracker adds an application-level idle
+timeout on top, driven by when each session last sent a message, which the
+metrics layer also reads together with the connection's ping latency.
+"""
+
+import asyncio
+import logging
+import time
+
+from websockets.protocol import State
+
+HEARTBEAT_DEFAULTS = {
+    "ping_interval": 20.0,
+    "ping_timeout": 20.0,
+    "close_timeout": 10.0,
+    "open_timeout": 10.0,
+}
+REAP_REASONS = ("ping_timeout", "idle")
+
+# Close reason websockets sends when a keepalive ping goes unanswered.
+KEEPALIVE_TIMEOUT = "keepalive ping timeout"
+
+
+def heartbeat_options(options):
+    """Pick the websockets.serve heartbeat arguments out of ``options``."""
+    return {
+        key: options.get(key, default) for key, default in HEARTBEAT_DEFAULTS.items()
+    }
+
+
+def dead_peer(websocket):
+    """True if the connection was failed because pings went unanswered."""
+    protocol = getattr(websocket, "protocol", None)
+    if protocol is None:
+        return False
+    return (
+        protocol.close_rcvd is None
+        and protocol.close_sent is not None
+        and protocol.close_sent.reason == KEEPALIVE_TIMEOUT
+    )
+
+
+class LivenessTracker:
+    """
+    Reads last-message times off one room's sessions (websocket -> Session,
+    kept current by the message loop) and, with ``idle_timeout``, sweeps
+    them to close connections silent for longer than that. One sweep per
+    room runs every ``idle_timeout / 2`` seconds instead of a timer per
+    connection.
+    """
+
+    def __init__(self, sessions, idle_timeout=None, counters=None):
+        self.sessions = sessions
+        self.idle_timeout = idle_timeout
+        # Reason -> count, usually a RoomMetrics' ``reaped`` dict.
+        self.counters = counters
+        self.task = None
+        # Close handshakes of reaped connections: the loop only keeps weak
+        # references to tasks.
+        self.closing = set()
+
+    def add(self, websocket):
+        if self.idle_timeout and self.task is None:
+            self.task = asyncio.create_task(self.reap_idle())
+
+    def remove(self, websocket):
+        if self.counters is not None and dead_peer(websocket):
+            self.counters["ping_timeout"] += 1
+
+    def state(self):
+        """(seconds since last message, ping latency) per connection."""
+        now = time.monotonic()
+        return [
+            (now - session.last_seen, websocket.latency)
+            for websocket, session in list(self.sessions.items())
+        ]
+
+    async def reap_idle(self):
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            cutoff = time.monotonic() - self.idle_timeout
+            for websocket, session in list(self.sessions.items()):
+                if session.last_seen < cutoff and websocket.state is State.OPEN:
+                    logging.info(f"Closing idle client {websocket.remote_address}")
+                    if self.counters is not None:
+                        self.counters["idle"] += 1
+                    task = asyncio.create_task(websocket.close(1001, "Idle timeout"))
+                    self.closing.add(task)
+                    task.add_done_callback(self.closed)
+
+    def closed(self, task):
+        self.closing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Failed to close idle client: {task.exception()}")
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
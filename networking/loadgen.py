@@ -0,0 +1,389 @@
+"""
+Headless load generator for the lobby, echo rooms and Pong rooms.
+
+Runs thousands of async websocket clients, spread over one or more
+processes, against a running server and prints a JSON report that can be
+diffed between releases.
+
+Scenarios:
+
+    list    every client sends ``list`` at --rate per second
+            (latency: request to reply)
+    churn   every client repeatedly creates a room, connects to it, sends
+            one message and leaves
+            (latency: create, join = room handshake, echo)
+    chat    clients share --room-size rooms and each sends a chat message
+            at --rate per second
+            (latency: send to own echo)
+    pong    clients pair up in Pong rooms, ask for a player name, ack
+            every game state and send paddle input at --rate per second
+            (default 60)
+            (latency: ask_name round trip, state = gap between state frames)
+
+Examples (from the repository root, with a server running):
+    python -m networking.loadgen list --clients 2000 --processes 4
+    python -m networking.loadgen chat --clients 500 --rate 10 --room-size 10
+    python -m networking.loadgen pong --url ws://localhost:8765 --clients 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue
+import random
+import time
+
+import websockets
+
+from networking.codec import CODECS, JSON
+
+SCENARIOS = ("list", "churn", "chat", "pong")
+
+
+class Recorder:
+    """Latency samples (ms) per operation plus message counters."""
+
+    def __init__(self, window_start):
+        self.window_start = window_start
+        self.samples = {}
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.connected = 0
+
+    def record(self, op, started):
+        now = time.perf_counter()
+        if started >= self.window_start:
+            self.samples.setdefault(op, []).append((now - started) * 1000)
+
+    def count_sent(self):
+        if time.perf_counter() >= self.window_start:
+            self.sent += 1
+
+    def count_received(self):
+        if time.perf_counter() >= self.window_start:
+            self.received += 1
+
+
+class Client:
+    def __init__(self, url, codec, recorder):
+        self.url = url
+        self.codec = codec
+        self.recorder = recorder
+
+    def connect(self, url=None):
+        subprotocols = [self.codec.subprotocol] if self.codec is not JSON else None
+        return websockets.connect(
+            url or self.url, subprotocols=subprotocols, open_timeout=60
+        )
+
+    async def send(self, websocket, data):
+        await websocket.send(self.codec.encode(data), text=self.codec.text)
+        self.recorder.count_sent()
+
+    async def recv(self, websocket):
+        data = self.codec.decode(await websocket.recv())
+        self.recorder.count_received()
+        return data
+
+    async def request(self, websocket, op, data, reply_key):
+        started = time.perf_counter()
+        await self.send(websocket, data)
+        while True:
+            reply = await self.recv(websocket)
+            if reply_key in reply or "error" in reply:
+                break
+        self.recorder.record(op, started)
+        return reply
+
+
+async def paced(rate, deadline, action):
+    """Call ``action`` ``rate`` times per second until ``deadline``."""
+    interval = 1 / rate
+    next_at = time.perf_counter() + random.uniform(0, interval)
+    while next_at < deadline:
+        await asyncio.sleep(max(0, next_at - time.perf_counter()))
+        await action()
+        next_at += interval
+
+
+async def list_client(client, index, options, deadline):
+    async with client.connect() as websocket:
+        client.recorder.connected += 1
+
+        async def request():
+            await client.request(websocket, "list", {"command": "list"}, "servers")
+
+        await paced(options.rate, deadline, request)
+
+
+async def churn_client(client, index, options, deadline):
+    async with client.connect() as lobby:
+        client.recorder.connected += 1
+        while time.perf_counter() < deadline:
+            reply = await client.request(
+                lobby, "create", {"command": "create"}, "address"
+            )
+            if "address" not in reply:
+                client.recorder.errors += 1
+                continue
+            started = time.perf_counter()
+            async with client.connect(reply["address"]) as room:
+                client.recorder.record("join", started)
+                await client.request(room, "echo", {"message": "hi"}, "echo")
+
+
+async def chat_client(client, index, options, deadline, room_addresses):
+    address = room_addresses[index // options.room_size % len(room_addresses)]
+    async with client.connect(address) as websocket:
+        client.recorder.connected += 1
+        pending = {}
+        sequence = 0
+
+        async def send():
+            nonlocal sequence
+            sequence += 1
+            pending[sequence] = time.perf_counter()
+            payload = {"message": {"from": index, "seq": sequence, "text": "x" * 32}}
+            await client.send(websocket, payload)
+
+        async def receive():
+            while True:
+                data = await client.recv(websocket)
+                for item in data.get("batch", (data,)):
+                    echo = item.get("echo")
+                    if isinstance(echo, dict) and echo.get("from") == index:
+                        started = pending.pop(echo["seq"], None)
+                        if started is not None:
+                            client.recorder.record("echo", started)
+
+        receiver = asyncio.create_task(receive())
+        try:
+            await paced(options.rate, deadline, send)
+            await asyncio.sleep(0.5)
+        finally:
+            receiver.cancel()
+
+
+async def pong_client(client, index, options, deadline, room_addresses):
+    address = room_addresses[index // 2 % len(room_addresses)]
+    async with client.connect(address) as websocket:
+        client.recorder.connected += 1
+        await client.request(websocket, "ask_name", {"ask_name": True}, "player_name")
+
+        async def receive():
+            last = None
+            while True:
+                data = await client.recv(websocket)
+                if "seq" in data:
+                    await client.send(websocket, {"ack": data["seq"]})
+                if "ball" in data:
+                    now = time.perf_counter()
+                    if last is not None:
+                        client.recorder.record("state", last)
+                    last = now
+
+        async def send_input():
+            await client.send(websocket, {"paddle": random.uniform(0, 500)})
+
+        receiver = asyncio.create_task(receive())
+        try:
+            await paced(options.rate, deadline, send_input)
+        finally:
+            receiver.cancel()
+
+
+async def create_rooms(url, codec, count):
+    """Create ``count`` rooms through the lobby and return their addresses."""
+    recorder = Recorder(float("inf"))
+    client = Client(url, codec, recorder)
+    addresses = []
+    async with client.connect() as lobby:
+        for _ in range(count):
+            reply = await client.request(
+                lobby, "create", {"command": "create"}, "address"
+            )
+            addresses.append(reply["address"])
+    return addresses
+
+
+async def swarm(options, first_index, count, room_addresses, start_at):
+    codec = CODECS.get(f"pygbag.{options.codec}", JSON)
+    window_start = start_at + options.ramp
+    deadline = window_start + options.duration
+    recorder = Recorder(window_start)
+
+    async def run_client(index):
+        # Spread connection attempts over the ramp-up period.
+        await asyncio.sleep(
+            max(0, start_at - time.perf_counter())
+            + options.ramp * (index - first_index) / max(count, 1)
+        )
+        client = Client(options.url, codec, recorder)
+        try:
+            if options.scenario == "list":
+                await list_client(client, index, options, deadline)
+            elif options.scenario == "churn":
+                await churn_client(client, index, options, deadline)
+            elif options.scenario == "chat":
+                await chat_client(client, index, options, deadline, room_addresses)
+            else:
+                await pong_client(client, index, options, deadline, room_addresses)
+        except (
+            OSError,
+            asyncio.TimeoutError,
+            websockets.exceptions.WebSocketException,
+        ):
+            recorder.errors += 1
+
+    outcomes = await asyncio.gather(
+        *(run_client(index) for index in range(first_index, first_index + count)),
+        return_exceptions=True,
+    )
+    # Anything run_client did not expect still counts against the run.
+    recorder.errors += sum(isinstance(outcome, Exception) for outcome in outcomes)
+    return {
+        "samples": recorder.samples,
+        "sent": recorder.sent,
+        "received": recorder.received,
+        "errors": recorder.errors,
+        "connected": recorder.connected,
+    }
+
+
+def swarm_process(options, first_index, count, room_addresses, start_at, results):
+    logging.getLogger().setLevel(logging.CRITICAL)
+    # perf_counter is CLOCK_MONOTONIC on Linux, shared by every process.
+    results.put(
+        asyncio.run(swarm(options, first_index, count, room_addresses, start_at))
+    )
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def collect(processes, results, deadline):
+    """Gather each swarm's result, stopping early if the swarms died."""
+    collected = []
+    while len(collected) < len(processes):
+        try:
+            collected.append(results.get(timeout=1.0))
+        except queue.Empty:
+            alive = [process for process in processes if process.is_alive()]
+            if not alive:
+                break
+            if time.perf_counter() > deadline:
+                for process in alive:
+                    process.terminate()
+                break
+    for process in processes:
+        process.join()
+    return collected
+
+
+def summarize(options, results, crashed):
+    samples = {}
+    for result in results:
+        for op, values in result["samples"].items():
+            samples.setdefault(op, []).extend(values)
+    latency = {}
+    for op, values in sorted(samples.items()):
+        values.sort()
+        latency[op] = {
+            "count": len(values),
+            "mean": round(sum(values) / len(values), 3),
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+            "max": round(values[-1], 3),
+        }
+    sent = sum(result["sent"] for result in results)
+    received = sum(result["received"] for result in results)
+    return {
+        "scenario": options.scenario,
+        "url": options.url,
+        "codec": options.codec,
+        "clients": options.clients,
+        "processes": options.processes,
+        "rate": options.rate,
+        "duration": options.duration,
+        "connected": sum(result["connected"] for result in results),
+        "errors": sum(result["errors"] for result in results),
+        "crashed_processes": crashed,
+        "sent": sent,
+        "received": received,
+        "sent_per_s": round(sent / options.duration, 1),
+        "received_per_s": round(received / options.duration, 1),
+        "latency_ms": latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless client load generator")
+    parser.add_argument("scenario", choices=SCENARIOS)
+    parser.add_argument("--url", default="ws://localhost:8765", help="Lobby URL")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument(
+        "--processes", type=int, default=1, help="Client processes to spread over"
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--ramp", type=float, default=2.0, help="Seconds to open all connections"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Messages per second per client (default 1, pong 60)",
+    )
+    parser.add_argument(
+        "--room-size", type=int, default=10, help="Clients per room (chat)"
+    )
+    parser.add_argument("--codec", choices=("json", "msgpack"), default="json")
+    parser.add_argument("--output", help="Write the JSON report here too")
+    options = parser.parse_args()
+    if options.rate is None:
+        options.rate = 60.0 if options.scenario == "pong" else 1.0
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    room_addresses = []
+    if options.scenario in ("chat", "pong"):
+        per_room = options.room_size if options.scenario == "chat" else 2
+        room_count = -(-options.clients // per_room)
+        codec = CODECS.get(f"pygbag.{options.codec}", JSON)
+        room_addresses = asyncio.run(create_rooms(options.url, codec, room_count))
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = []
+    # Give every process time to start before the first connection.
+    start_at = time.perf_counter() + 1.0 + 0.2 * options.processes
+    share, extra = divmod(options.clients, options.processes)
+    first_index = 0
+    for i in range(options.processes):
+        count = share + (1 if i < extra else 0)
+        process = context.Process(
+            target=swarm_process,
+            args=(options, first_index, count, room_addresses, start_at, results),
+        )
+        process.start()
+        processes.append(process)
+        first_index += count
+    # Swarms stop at their deadline; allow a little longer to close cleanly.
+    deadline = start_at + options.ramp + options.duration + 30.0
+    collected = collect(processes, results, deadline)
+    crashed = len(processes) - len(collected)
+
+    report = summarize(options, collected, crashed)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Logging off the event loop.
+
+A plain StreamHandler formats and writes every record on the thread that
+logs it, so each per-message log line blocks the event loop on a write.
+``configure(queue=True)`` puts a QueueHandler on the root logger instead:
+the caller only renders the message and enqueues the record, and a
+QueueListener thread adds timestamps and does the writing.
+
+``configure(sample={...})`` rate-samples chosen loggers, e.g. the
+per-message ``game_server.messages`` logger: each keeps at most N records
+per second below WARNING, and the first record after a dropped stretch
+says how many were left out. Warnings and errors always pass. Sampling
+runs before the record is queued, so dropped records cost almost nothing.
+
+Hot-path log calls use %-style arguments (``log.debug("x %s", x)``) so a
+disabled level skips the formatting entirely.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import time
+from queue import SimpleQueue
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Per-message loggers and the records per second they keep by default.
+DEFAULT_SAMPLES = {
+    "game_server.messages": 10.0,
+    "wss_server.messages": 10.0,
+}
+
+# QueueListener started by the last configure(queue=True), if any.
+listener = None
+
+
+def parse_sample(value):
+    """Parse a ``logger=records_per_second`` command line value."""
+    name, _, rate = value.partition("=")
+    try:
+        return name, float(rate)
+    except ValueError:
+        raise ValueError(f"Expected logger=records_per_second, got {value!r}")
+
+
+class RateSampler(logging.Filter):
+    """
+    Keeps at most ``rates[record.name]`` records per second from each listed
+    logger (and its children) below ``min_level``; other loggers pass.
+    """
+
+    def __init__(self, rates, min_level=logging.WARNING):
+        super().__init__()
+        self.rates = dict(rates)
+        self.min_level = min_level
+        # Logger name -> [window start, kept in window, dropped].
+        self.windows = {}
+
+    def rate_for(self, name):
+        while True:
+            rate = self.rates.get(name)
+            if rate is not None or not name:
+                return rate
+            name = name.rpartition(".")[0]
+
+    def filter(self, record):
+        if record.levelno >= self.min_level:
+            return True
+        rate = self.rate_for(record.name)
+        if rate is None:
+            return True
+        now = time.monotonic()
+        window = self.windows.get(record.name)
+        if window is None:
+            window = self.windows[record.name] = [now, 0, 0]
+        elif now - window[0] >= 1.0:
+            window[0] = now
+            window[1] = 0
+        if window[1] >= rate:
+            window[2] += 1
+            return False
+        window[1] += 1
+        if window[2]:
+            record.msg = f"{record.getMessage()} ({window[2]} similar suppressed)"
+            record.args = None
+            window[2] = 0
+        return True
+
+
+def configure(
+    level=logging.INFO,
+    queue=False,
+    sample=None,
+    handlers=None,
+    fmt=LOG_FORMAT,
+):
+    """
+    Replace the root logger's handlers. ``handlers`` default to one stderr
+    StreamHandler; with ``queue`` they run on a QueueListener thread, which
+    is returned (and stopped at exit). ``sample`` maps logger names to
+    records per second.
+    """
+    global listener
+    stop()
+    if handlers is None:
+        handlers = [logging.StreamHandler()]
+    formatter = logging.Formatter(fmt)
+    for handler in handlers:
+        if handler.formatter is None:
+            handler.setFormatter(formatter)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(level)
+
+    if queue:
+        records = SimpleQueue()
+        listener = logging.handlers.QueueListener(
+            records, *handlers, respect_handler_level=True
+        )
+        listener.start()
+        handlers = [logging.handlers.QueueHandler(records)]
+    if sample:
+        sampler = RateSampler(sample)
+        for handler in handlers:
+            handler.addFilter(sampler)
+    for handler in handlers:
+        root.addHandler(handler)
+    return listener
+
+
+@atexit.register
+def stop():
+    """Write out what is still queued and stop the listener thread."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
+
+
+def add_arguments(parser):
+    """Add the logging options to a server's argument parser."""
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="Write log records from a background thread instead of the event loop",
+    )
+    parser.add_argument(
+        "--log-sample",
+        action="append",
+        type=parse_sample,
+        metavar="LOGGER=RATE",
+        help="Keep at most RATE records per second below WARNING from LOGGER; "
+        "repeatable, RATE 0 drops them all (per-message loggers default to "
+        "10 per second)",
+    )
+
+
+def options_from_args(args):
+    """configure() keyword arguments for parsed add_arguments() options."""
+    sample = dict(DEFAULT_SAMPLES)
+    sample.update(args.log_sample or ())
+    return {
+        "level": getattr(logging, args.log_level),
+        "queue": args.log_queue,
+        "sample": sample,
+    }
@@ -0,0 +1,334 @@
+"""
+Opt-in metrics for the lobby, rooms and game servers.
+
+Nothing is recorded until ``enable()`` is called; instrumented code keeps a
+reference to its RoomMetrics (or None) and skips all bookkeeping when
+metrics are off. Counters are plain attributes owned by one room, which
+only its own event loop updates, so the hot path never takes a lock.
+
+``serve()`` exposes everything in the Prometheus text format on a small HTTP
+endpoint; ``snapshot()`` returns the same figures as a dict for the lobby's
+``stats`` command.
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+
+from networking.liveness import REAP_REASONS
+from networking.ratelimit import LIMIT_DECISIONS
+
+# Seconds; covers sub-millisecond local sends up to a badly stalled client.
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+# Fan-out latency is timed for one broadcast in this many; timing every
+# send would cost more than the rest of the bookkeeping together.
+FANOUT_SAMPLE = 16
+
+registry = None
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self, name, labels):
+        lines = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {seen}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RoomMetrics:
+    """Counters for one room (an EchoServer or a PongServer)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.clients = None
+        self.connections = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.broadcasts = 0
+        self.fanout = Histogram()
+        self.ticks = Histogram()
+        self.tick_overruns = 0
+        # Physics steps a fixed-timestep room dropped rather than caught up.
+        self.skipped_steps = 0
+        # Rate limiter decisions for this room's connections.
+        self.limited = dict.fromkeys(LIMIT_DECISIONS, 0)
+        # Connections closed for missing pongs or silence.
+        self.reaped = dict.fromkeys(REAP_REASONS, 0)
+        # Callable returning (seconds since last message, ping latency) per
+        # connection, set by rooms that track liveness.
+        self.liveness = None
+
+    def broadcast_started(self):
+        """Count a broadcast; return its start time if it is sampled."""
+        self.broadcasts += 1
+        if self.broadcasts % FANOUT_SAMPLE == 0:
+            return time.perf_counter()
+        return None
+
+    def broadcast_sent(self, frames, recipients):
+        """Count a broadcast's messages and bytes from its encoded frames."""
+        self.messages_out += recipients
+        if len(frames) == 1:
+            for frame in frames.values():
+                self.bytes_out += len(frame) * recipients
+        elif frames and self.clients is not None:
+            self.bytes_out += sum(
+                len(frames[session.codec])
+                for session in self.clients()
+                if session.codec in frames
+            )
+
+    def queue_depths(self):
+        sessions = self.clients() if self.clients is not None else ()
+        return [len(getattr(session, "queue", None) or ()) for session in sessions]
+
+    def liveness_maxima(self):
+        """Longest silence and highest ping latency among connected clients."""
+        state = self.liveness() if self.liveness is not None else ()
+        return (
+            max((silence for silence, _ in state), default=0.0),
+            max((latency for _, latency in state), default=0.0),
+        )
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rooms: dict[str, RoomMetrics] = {}
+        self.loops: dict[str, Histogram] = {}
+        self.lobby_connections = 0
+        self.lobby_connections_total = 0
+        self.lobby_limited = dict.fromkeys(LIMIT_DECISIONS, 0)
+        self.lobby_reaped = 0
+
+    def room(self, name, clients=None):
+        """
+        Register a room. ``clients`` is a callable returning the room's
+        current client sessions; it is only called while rendering.
+        """
+        room = RoomMetrics(name)
+        room.clients = clients
+        with self.lock:
+            self.rooms[name] = room
+        return room
+
+    def remove_room(self, name):
+        with self.lock:
+            self.rooms.pop(name, None)
+
+    async def watch_loop(self, name, interval=0.5):
+        """Record how late this event loop wakes up from a sleep of ``interval``."""
+        lag = Histogram()
+        with self.lock:
+            self.loops[name] = lag
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                expected = loop.time() + interval
+                await asyncio.sleep(interval)
+                lag.observe(max(0.0, loop.time() - expected))
+        finally:
+            with self.lock:
+                self.loops.pop(name, None)
+
+    def render(self):
+        with self.lock:
+            rooms = list(self.rooms.values())
+            loops = list(self.loops.items())
+        lines = [
+            "# TYPE pygbag_lobby_connections gauge",
+            f"pygbag_lobby_connections {self.lobby_connections}",
+            "# TYPE pygbag_lobby_connections_total counter",
+            f"pygbag_lobby_connections_total {self.lobby_connections_total}",
+            "# TYPE pygbag_rooms gauge",
+            f"pygbag_rooms {len(rooms)}",
+        ]
+        simple = (
+            ("room_clients", "gauge", None),
+            ("room_connections_total", "counter", "connections"),
+            ("room_messages_in_total", "counter", "messages_in"),
+            ("room_messages_out_total", "counter", "messages_out"),
+            ("room_bytes_in_total", "counter", "bytes_in"),
+            ("room_bytes_out_total", "counter", "bytes_out"),
+            ("room_queue_depth_max", "gauge", None),
+            ("room_queued_messages", "gauge", None),
+            ("room_tick_overruns_total", "counter", "tick_overruns"),
+            ("room_skipped_steps_total", "counter", "skipped_steps"),
+        )
+        depths = {room.name: room.queue_depths() for room in rooms}
+        for metric, kind, attribute in simple:
+            lines.append(f"# TYPE pygbag_{metric} {kind}")
+            for room in rooms:
+                if metric == "room_clients":
+                    value = len(depths[room.name])
+                elif metric == "room_queue_depth_max":
+                    value = max(depths[room.name], default=0)
+                elif metric == "room_queued_messages":
+                    value = sum(depths[room.name])
+                else:
+                    value = getattr(room, attribute)
+                lines.append(f'pygbag_{metric}{{room="{room.name}"}} {value}')
+        for metric, attribute in (
+            ("room_fanout_seconds", "fanout"),
+            ("room_tick_seconds", "ticks"),
+        ):
+            lines.append(f"# TYPE pygbag_{metric} histogram")
+            for room in rooms:
+                histogram = getattr(room, attribute)
+                if histogram.count:
+                    lines.extend(
+                        histogram.render(f"pygbag_{metric}", f'room="{room.name}"')
+                    )
+        lines.append("# TYPE pygbag_lobby_rate_limited_total counter")
+        for decision, count in self.lobby_limited.items():
+            lines.append(
+                f'pygbag_lobby_rate_limited_total{{decision="{decision}"}} {count}'
+            )
+        lines.append("# TYPE pygbag_room_rate_limited_total counter")
+        for room in rooms:
+            for decision, count in room.limited.items():
+                lines.append(
+                    f"pygbag_room_rate_limited_total"
+                    f'{{room="{room.name}",decision="{decision}"}} {count}'
+                )
+        lines.append("# TYPE pygbag_lobby_reaped_total counter")
+        lines.append(f"pygbag_lobby_reaped_total {self.lobby_reaped}")
+        lines.append("# TYPE pygbag_room_reaped_total counter")
+        for room in rooms:
+            for reason, count in room.reaped.items():
+                lines.append(
+                    f"pygbag_room_reaped_total"
+                    f'{{room="{room.name}",reason="{reason}"}} {count}'
+                )
+        liveness = {room.name: room.liveness_maxima() for room in rooms}
+        for index, metric in enumerate(
+            ("room_silence_max_seconds", "room_ping_latency_max_seconds")
+        ):
+            lines.append(f"# TYPE pygbag_{metric} gauge")
+            for room in rooms:
+                lines.append(
+                    f'pygbag_{metric}{{room="{room.name}"}} '
+                    f"{liveness[room.name][index]:.3f}"
+                )
+        lines.append("# TYPE pygbag_event_loop_lag_seconds histogram")
+        for name, lag in loops:
+            lines.extend(lag.render("pygbag_event_loop_lag_seconds", f'loop="{name}"'))
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self.lock:
+            rooms = list(self.rooms.values())
+            loops = list(self.loops.items())
+        return {
+            "lobby_connections": self.lobby_connections,
+            "lobby_rate_limited": dict(self.lobby_limited),
+            "lobby_reaped": self.lobby_reaped,
+            "rooms": {
+                room.name: {
+                    "clients": len(depths),
+                    "messages_in": room.messages_in,
+                    "messages_out": room.messages_out,
+                    "bytes_in": room.bytes_in,
+                    "bytes_out": room.bytes_out,
+                    "queue_depth_max": max(depths, default=0),
+                    "fanout_p50": room.fanout.quantile(0.5),
+                    "fanout_p99": room.fanout.quantile(0.99),
+                    "tick_p99": room.ticks.quantile(0.99),
+                    "tick_overruns": room.tick_overruns,
+                    "skipped_steps": room.skipped_steps,
+                    "rate_limited": dict(room.limited),
+                    "reaped": dict(room.reaped),
+                    "silence_max": round(silence, 3),
+                    "ping_latency_max": round(latency, 3),
+                }
+                for room, depths, (silence, latency) in (
+                    (room, room.queue_depths(), room.liveness_maxima())
+                    for room in rooms
+                )
+            },
+            "loop_lag_p99": {name: lag.quantile(0.99) for name, lag in loops},
+        }
+
+    async def handle_http(self, reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            if request.split(b" ")[1:2] == [b"/metrics"]:
+                body = self.render().encode()
+                status = b"200 OK"
+            else:
+                body = b"Not found\n"
+                status = b"404 Not Found"
+            writer.write(
+                b"HTTP/1.1 " + status + b"\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logging.error(f"Error serving metrics: {e}")
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        """Serve ``/metrics`` on host:port from the running event loop."""
+        server = await asyncio.start_server(self.handle_http, host, port)
+        logging.info(f"Metrics available on http://{host}:{port}/metrics")
+        return server
+
+
+def enable():
+    """Turn metrics on for every server created from now on."""
+    global registry
+    if registry is None:
+        registry = Metrics()
+    return registry
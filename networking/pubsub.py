@@ -0,0 +1,406 @@
+"""
+Room pub/sub bus.
+
+EchoServer.broadcast hands a message to the room's own clients and publishes
+it on a RoomBus under the room's name. Every other EchoServer subscribed to
+that name, in this process or another, hands it to its clients in turn, so
+the clients of one room can be spread over room worker processes or several
+servers.
+
+Backends, picked with ``--bus``:
+
+    local               LocalBus: rooms in this process only (the default)
+    unix:PATH           UnixBus: through a BusBroker listening on a Unix
+                        socket; start one with
+                        ``python -m networking.pubsub --socket PATH``
+    module:Class[=ARG]  any RoomBus implementation, e.g. an adapter for an
+                        external broker, constructed as ``Class(ARG)``
+
+UnixBus and BusBroker exchange frames of
+
+    kind         1 byte: S subscribe, U unsubscribe, P publish
+    topic size   2 bytes, big-endian
+    payload size 4 bytes, big-endian
+    topic        UTF-8 room name
+    payload      MessagePack list of room messages (publish only)
+
+Publishes made while the bus thread is busy go out together in one write.
+The broker forwards publish frames as memoryview slices of the data it read,
+without copying or re-encoding them, and receivers decode each payload once
+per process however many rooms subscribe to it.
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import struct
+import threading
+
+from networking.codec import DecodeError, packb, unpackb
+
+FRAME = struct.Struct(">cHI")
+SUBSCRIBE, UNSUBSCRIBE, PUBLISH = b"S", b"U", b"P"
+
+# Seconds between attempts to reach the broker.
+RECONNECT_DELAY = 1.0
+# Bytes the broker buffers for a subscriber process before it starts
+# dropping publishes to it.
+MAX_BUFFERED = 4 * 2**20
+
+
+def encode_frame(kind, topic, payload=b""):
+    """A frame as a list of buffers for ``transport.writelines``."""
+    topic = topic.encode("utf-8")
+    return [FRAME.pack(kind, len(topic), len(payload)), topic, payload]
+
+
+class FrameReader:
+    """
+    Splits a byte stream into frames. Frames that arrive within one read
+    are returned as memoryview slices of it; only a frame cut by a read
+    boundary is copied.
+    """
+
+    def __init__(self):
+        self.partial = b""
+
+    def feed(self, data):
+        """Return (kind, topic, frame, payload) for every complete frame."""
+        if self.partial:
+            data = self.partial + data
+        view = memoryview(data)
+        frames = []
+        offset = 0
+        while len(data) - offset >= FRAME.size:
+            kind, topic_size, payload_size = FRAME.unpack_from(data, offset)
+            start = offset + FRAME.size
+            end = start + topic_size + payload_size
+            if end > len(data):
+                break
+            topic = str(view[start : start + topic_size], "utf-8")
+            frames.append(
+                (kind, topic, view[offset:end], view[start + topic_size : end])
+            )
+            offset = end
+        self.partial = data[offset:]
+        return frames
+
+
+class BusProtocol(asyncio.Protocol):
+    """One UnixBus <-> BusBroker connection, on either end."""
+
+    def __init__(self, on_frames, on_lost):
+        self.reader = FrameReader()
+        self.on_frames = on_frames
+        self.on_lost = on_lost
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.on_frames(self, self.reader.feed(data))
+
+    def connection_lost(self, exc):
+        self.on_lost(self)
+
+
+class RoomBus:
+    """
+    Interface of a room bus backend.
+
+    ``subscribe`` and ``unsubscribe`` are called on the subscriber's event
+    loop, and ``callback(messages)`` must run on that loop for every list of
+    messages another subscriber publishes on the topic. ``publish`` may be
+    called from any thread and must not block. Delivery is best effort.
+    """
+
+    def subscribe(self, topic, subscriber, callback):
+        raise NotImplementedError
+
+    def unsubscribe(self, topic, subscriber):
+        raise NotImplementedError
+
+    def publish(self, topic, messages, sender=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalBus(RoomBus):
+    """Delivers between subscribers in this process, on their own loops."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Topic -> {subscriber: (event loop, callback)}.
+        self.topics = {}
+
+    def subscribe(self, topic, subscriber, callback):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            subscribers = self.topics.setdefault(topic, {})
+            first = not subscribers
+            subscribers[subscriber] = (loop, callback)
+        return first
+
+    def unsubscribe(self, topic, subscriber):
+        with self.lock:
+            subscribers = self.topics.get(topic)
+            if subscribers is None or subscribers.pop(subscriber, None) is None:
+                return False
+            if subscribers:
+                return False
+            del self.topics[topic]
+        return True
+
+    def targets(self, topic, sender=None):
+        with self.lock:
+            subscribers = self.topics.get(topic)
+            if not subscribers:
+                return []
+            return [
+                target
+                for subscriber, target in subscribers.items()
+                if subscriber is not sender
+            ]
+
+    def publish(self, topic, messages, sender=None):
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, callback in self.targets(topic, sender):
+            if loop is current:
+                callback(messages)
+            else:
+                call_soon(loop, callback, messages)
+
+
+def call_soon(loop, callback, *args):
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        # The subscriber's loop has closed (its room thread ended).
+        pass
+
+
+def run_all(calls):
+    for callback, messages in calls:
+        callback(messages)
+
+
+class UnixBus(LocalBus):
+    """
+    Connects this process to a BusBroker. Local subscribers get publishes
+    directly, as with LocalBus; a thread of its own talks to the broker so
+    rooms on any event loop can share the one connection.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.outbox = []
+        self.flush_scheduled = False
+        self.protocol = None
+        self.dropped = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, daemon=True, name="room-bus")
+        self.thread.start()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self.connect())
+        self.loop.run_forever()
+
+    async def connect(self):
+        warned = False
+        while True:
+            try:
+                _, protocol = await self.loop.create_unix_connection(
+                    lambda: BusProtocol(self.on_frames, self.on_lost), self.path
+                )
+                break
+            except OSError as e:
+                if not warned:
+                    logging.warning(f"Room bus broker at {self.path} unreachable: {e}")
+                    warned = True
+                await asyncio.sleep(RECONNECT_DELAY)
+        logging.info(f"Connected to room bus broker at {self.path}")
+        # (Re)subscribe everything this process listens to.
+        with self.lock:
+            topics = list(self.topics)
+        protocol.transport.writelines(
+            [part for topic in topics for part in encode_frame(SUBSCRIBE, topic)]
+        )
+        self.protocol = protocol
+
+    def on_frames(self, protocol, frames):
+        calls = {}
+        for kind, topic, _, payload in frames:
+            if kind != PUBLISH:
+                continue
+            targets = self.targets(topic)
+            if not targets:
+                continue
+            try:
+                messages = unpackb(payload)
+            except DecodeError as e:
+                logging.error(f"Dropping malformed room bus payload: {e}")
+                continue
+            for loop, callback in targets:
+                calls.setdefault(loop, []).append((callback, messages))
+        for loop, loop_calls in calls.items():
+            call_soon(loop, run_all, loop_calls)
+
+    def on_lost(self, protocol):
+        if self.protocol is protocol:
+            self.protocol = None
+            if self.loop.is_running():
+                logging.warning(f"Lost room bus broker at {self.path}; reconnecting")
+                self.loop.create_task(self.connect())
+
+    def send(self, parts):
+        with self.lock:
+            self.outbox.extend(parts)
+            if self.flush_scheduled:
+                return
+            self.flush_scheduled = True
+        call_soon(self.loop, self.flush)
+
+    def flush(self):
+        with self.lock:
+            parts, self.outbox = self.outbox, []
+            self.flush_scheduled = False
+        if self.protocol is not None:
+            self.protocol.transport.writelines(parts)
+        else:
+            # Broker unreachable: publishes are lost, subscriptions are
+            # replayed once it is back.
+            self.dropped += sum(1 for part in parts[::3] if part[0:1] == PUBLISH)
+
+    def subscribe(self, topic, subscriber, callback):
+        first = super().subscribe(topic, subscriber, callback)
+        if first:
+            self.send(encode_frame(SUBSCRIBE, topic))
+        return first
+
+    def unsubscribe(self, topic, subscriber):
+        last = super().unsubscribe(topic, subscriber)
+        if last:
+            self.send(encode_frame(UNSUBSCRIBE, topic))
+        return last
+
+    def publish(self, topic, messages, sender=None):
+        super().publish(topic, messages, sender)
+        self.send(encode_frame(PUBLISH, topic, packb(messages)))
+
+    def close(self):
+        call_soon(self.loop, self.loop.stop)
+
+
+class BusBroker:
+    """Forwards publishes between the UnixBus connections subscribed to them."""
+
+    def __init__(self, path):
+        self.path = path
+        # Topic -> connections subscribed to it.
+        self.topics = {}
+        self.server = None
+        self.forwarded = 0
+        self.dropped = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            # Left behind by a broker that did not shut down cleanly.
+            os.unlink(self.path)
+        self.server = await asyncio.get_running_loop().create_unix_server(
+            lambda: BusProtocol(self.on_frames, self.on_lost), self.path
+        )
+        logging.info(f"Room bus broker listening on {self.path}")
+
+    def on_frames(self, connection, frames):
+        outgoing = {}
+        for kind, topic, frame, _ in frames:
+            if kind == PUBLISH:
+                for peer in self.topics.get(topic, ()):
+                    if peer is not connection:
+                        outgoing.setdefault(peer, []).append(frame)
+            elif kind == SUBSCRIBE:
+                self.topics.setdefault(topic, set()).add(connection)
+            elif kind == UNSUBSCRIBE:
+                self.discard(topic, connection)
+        for peer, parts in outgoing.items():
+            if peer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                self.dropped += len(parts)
+                continue
+            peer.transport.writelines(parts)
+            self.forwarded += len(parts)
+
+    def discard(self, topic, connection):
+        connections = self.topics.get(topic)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.topics[topic]
+
+    def on_lost(self, connection):
+        for topic in list(self.topics):
+            self.discard(topic, connection)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+_buses = {}
+_buses_lock = threading.Lock()
+
+
+def create(spec):
+    if spec == "local":
+        return LocalBus()
+    if spec.startswith("unix:"):
+        return UnixBus(spec[len("unix:") :])
+    target, _, arg = spec.partition("=")
+    module_name, sep, class_name = target.partition(":")
+    if not sep:
+        raise ValueError(f"Unknown room bus: {spec}")
+    bus_class = getattr(importlib.import_module(module_name), class_name)
+    return bus_class(arg) if arg else bus_class()
+
+
+def get(spec="local"):
+    """The process-wide bus for ``spec`` (or ``spec`` itself if it is one)."""
+    if isinstance(spec, RoomBus):
+        return spec
+    with _buses_lock:
+        bus = _buses.get(spec)
+        if bus is None:
+            bus = _buses[spec] = create(spec)
+    return bus
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    parser = argparse.ArgumentParser(description="Room bus broker")
+    parser.add_argument(
+        "--socket", default="/tmp/pygbag-room-bus.sock", help="Unix socket path"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(BusBroker(args.socket).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
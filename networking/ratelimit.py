@@ -0,0 +1,119 @@
+"""
+Per-connection inbound rate limits and message-size budgets.
+
+Every connection gets a token bucket refilled at ``rate`` messages per second
+and holding at most ``burst`` tokens. A message that finds the bucket empty
+is handled according to the limit's action:
+
+    drop        discard the message
+    delay       stop reading from the connection until a token is due, which
+                pushes back on the sender through TCP flow control
+    disconnect  close the connection with 1008 (policy violation)
+
+Messages larger than ``max_size`` bytes are never processed. Servers pass
+the limit to websockets (see ``limit_options``), which closes the
+connection with 1009 before reading such a frame into memory; admit()
+checks again for listeners that serve several limits, dropping the
+message, or closing with 1009 when the action is ``disconnect``.
+"""
+
+import asyncio
+import logging
+import time
+
+LIMIT_ACTIONS = ("drop", "delay", "disconnect")
+LIMIT_DECISIONS = ("oversize", "dropped", "delayed", "disconnected")
+
+
+class RateLimit:
+    """Configuration shared by every connection of one room type."""
+
+    def __init__(self, rate, burst, max_size, action="drop"):
+        if action not in LIMIT_ACTIONS:
+            raise ValueError(f"Unknown rate limit action: {action}")
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self.action = action
+
+    @classmethod
+    def parse(cls, text):
+        """Parse ``RATE,BURST,MAX_BYTES,ACTION`` (or ``off``) from the CLI."""
+        if text == "off":
+            return None
+        rate, burst, max_size, action = text.split(",")
+        return cls(float(rate), float(burst), int(max_size), action)
+
+    def __repr__(self):
+        return f"{self.rate:g},{self.burst:g},{self.max_size},{self.action}"
+
+
+DEFAULT_LIMITS = {
+    "lobby": RateLimit(rate=20, burst=40, max_size=4096, action="delay"),
+    "echo": RateLimit(rate=30, burst=60, max_size=16384, action="drop"),
+    # Pong input arrives at the client's frame rate.
+    "pong": RateLimit(rate=120, burst=240, max_size=1024, action="drop"),
+}
+
+
+def limit_options(*limits):
+    """
+    websockets.serve keyword arguments that refuse frames larger than the
+    biggest of ``limits``. A listener with an unlimited (None) side keeps
+    the websockets default.
+    """
+    if not limits or None in limits:
+        return {}
+    return {"max_size": max(limit.max_size for limit in limits)}
+
+
+class RateLimiter:
+    """Token bucket for one connection."""
+
+    __slots__ = ("limit", "tokens", "updated", "counters")
+
+    def __init__(self, limit, counters=None):
+        self.limit = limit
+        self.tokens = limit.burst
+        self.updated = time.monotonic()
+        # Decision -> count, usually a RoomMetrics' ``limited`` dict.
+        self.counters = counters
+
+    def count(self, decision):
+        if self.counters is not None:
+            self.counters[decision] += 1
+
+    async def admit(self, websocket, message):
+        """Return True if ``message`` should be processed."""
+        limit = self.limit
+        size = len(message)
+        if isinstance(message, str) and size * 4 > limit.max_size:
+            # Text frames count in UTF-8 bytes, up to 4 per character.
+            size = len(message.encode())
+        if size > limit.max_size:
+            self.count("oversize")
+            if limit.action == "disconnect":
+                self.count("disconnected")
+                await websocket.close(1009, "Message too big")
+            return False
+
+        now = time.monotonic()
+        self.tokens = min(limit.burst, self.tokens + (now - self.updated) * limit.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        if limit.action == "delay":
+            self.count("delayed")
+            await asyncio.sleep((1 - self.tokens) / limit.rate)
+            self.tokens = 0
+            self.updated = time.monotonic()
+            return True
+        if limit.action == "disconnect":
+            self.count("disconnected")
+            logging.info(f"Disconnecting {websocket.remote_address}: rate limit")
+            await websocket.close(1008, "Rate limit exceeded")
+            return False
+        self.count("dropped")
+        return False
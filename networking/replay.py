@@ -0,0 +1,258 @@
+"""
+Replay a traffic capture (see networking.capture) against a server.
+
+Every captured connection is opened again on the host of ``--url``, on its
+captured port plus ``--port-offset``, with its request path and
+subprotocol. The frames it sent are sent again in capture order. With
+``--speed 1`` they go out at the captured times, ``--speed 10`` plays ten
+times faster, and ``--speed 0`` sends them as fast as possible. With
+``--wait-replies``, a connection only sends its next frame once it has
+received as many frames as it had by then in the capture (or after
+``--reply-timeout``), so request/reply traffic like ``create`` then
+``join`` keeps its order at any speed.
+
+The report compares the frames and bytes the server sent with the
+captured ones, as JSON that can be diffed between releases.
+
+Usage (from the repository root, with a server running):
+    python -m networking.replay traffic.cap --summary
+    python -m networking.replay traffic.cap --url wss://localhost:8765 --insecure
+    python -m networking.replay traffic.cap --speed 0 --wait-replies
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import ssl
+import time
+from urllib.parse import urlsplit
+
+import websockets
+
+from networking import capture
+
+TEXT_KINDS = (capture.IN_TEXT, capture.OUT_TEXT)
+OUT_KINDS = (capture.OUT_TEXT, capture.OUT_BINARY)
+
+
+def summarize(records):
+    """Connections, frame counts and bytes per kind, and duration."""
+    kinds = {}
+    for _, kind, _, payload in records:
+        counts = kinds.setdefault(capture.KIND_NAMES[kind], [0, 0])
+        counts[0] += 1
+        counts[1] += len(payload)
+    return {
+        "connections": kinds.get("open", [0])[0],
+        "duration_s": round(records[-1][0], 3) if records else 0,
+        "frames": {name: counts[0] for name, counts in kinds.items()},
+        "bytes": {name: counts[1] for name, counts in kinds.items()},
+    }
+
+
+class ReplayConnection:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.received = 0
+        self.received_bytes = 0
+        self.changed = asyncio.Event()
+        self.reader = asyncio.create_task(self.read())
+
+    async def read(self):
+        try:
+            async for message in self.websocket:
+                self.received += 1
+                self.received_bytes += len(message)
+                self.changed.set()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.changed.set()
+
+    async def wait_for(self, count, timeout):
+        deadline = time.monotonic() + timeout
+        while self.received < count and not self.reader.done():
+            self.changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+async def open_connection(url, ssl_context, subprotocol, options):
+    # A room created in thread mode binds its port on its own thread, a
+    # moment after the lobby has answered; try again for a while.
+    deadline = time.monotonic() + options.open_retry
+    while True:
+        try:
+            return await websockets.connect(
+                url,
+                ssl=ssl_context,
+                subprotocols=[subprotocol] if subprotocol else None,
+                max_size=None,
+                open_timeout=60,
+            )
+        except ConnectionRefusedError as e:
+            if time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                continue
+            error = e
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            error = e
+        logging.warning(f"Could not open {url}: {error}")
+        return None
+
+
+async def replay(records, options):
+    target = urlsplit(options.url)
+    ssl_context = None
+    if target.scheme == "wss":
+        ssl_context = ssl.create_default_context()
+        if options.insecure:
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+    connections = {}
+    # Frames the server had sent each connection so far in the capture.
+    expected = {}
+    report = {
+        "opened": 0,
+        "failed": 0,
+        "sent": 0,
+        "sent_bytes": 0,
+        "reply_timeouts": 0,
+        "max_lag_ms": 0.0,
+    }
+    started = time.monotonic()
+    for at, kind, connection_id, payload in records:
+        if kind in OUT_KINDS:
+            expected[connection_id] = expected.get(connection_id, 0) + 1
+            continue
+        if options.speed:
+            delay = at / options.speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                report["max_lag_ms"] = max(report["max_lag_ms"], -delay * 1000)
+        if kind == capture.OPEN:
+            port, path, subprotocol = str(payload, "utf-8").split(" ", 2)
+            url = (
+                f"{target.scheme}://{target.hostname}:"
+                f"{int(port) + options.port_offset}{path}"
+            )
+            websocket = await open_connection(url, ssl_context, subprotocol, options)
+            if websocket is None:
+                report["failed"] += 1
+                continue
+            connections[connection_id] = ReplayConnection(websocket)
+            report["opened"] += 1
+            continue
+        replayed = connections.get(connection_id)
+        if replayed is None:
+            continue
+        if kind == capture.CLOSE:
+            asyncio.create_task(replayed.websocket.close())
+            continue
+        if options.wait_replies and not await replayed.wait_for(
+            expected.get(connection_id, 0), options.reply_timeout
+        ):
+            report["reply_timeouts"] += 1
+        try:
+            await replayed.websocket.send(
+                str(payload, "utf-8") if kind in TEXT_KINDS else bytes(payload)
+            )
+        except websockets.exceptions.ConnectionClosed:
+            continue
+        report["sent"] += 1
+        report["sent_bytes"] += len(payload)
+    elapsed = time.monotonic() - started
+    # Let the last replies arrive before counting them.
+    await asyncio.sleep(options.settle)
+    for replayed in connections.values():
+        await replayed.websocket.close()
+        replayed.reader.cancel()
+    received = sum(replayed.received for replayed in connections.values())
+    report.update(
+        {
+            "elapsed_s": round(elapsed, 3),
+            "sent_per_s": round(report["sent"] / elapsed, 1) if elapsed else 0,
+            "expected": sum(expected.values()),
+            "received": received,
+            "received_bytes": sum(
+                replayed.received_bytes for replayed in connections.values()
+            ),
+            "max_lag_ms": round(report["max_lag_ms"], 1),
+        }
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic capture")
+    parser.add_argument("capture", help="File written by a server's --capture")
+    parser.add_argument(
+        "--url",
+        default="ws://localhost:8765",
+        help="Scheme and host to replay against; ports come from the capture",
+    )
+    parser.add_argument(
+        "--port-offset",
+        type=int,
+        default=0,
+        help="Added to every captured port",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Playback speed relative to the capture (0: as fast as possible)",
+    )
+    parser.add_argument(
+        "--wait-replies",
+        action="store_true",
+        help="Hold each frame until its connection has had the replies it "
+        "had in the capture",
+    )
+    parser.add_argument("--reply-timeout", type=float, default=1.0)
+    parser.add_argument(
+        "--open-retry",
+        type=float,
+        default=1.0,
+        help="Seconds to keep retrying a refused connection",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=1.0,
+        help="Seconds to keep reading replies after the last frame is sent",
+    )
+    parser.add_argument(
+        "--insecure", action="store_true", help="Skip certificate checks for wss"
+    )
+    parser.add_argument(
+        "--summary", action="store_true", help="Describe the capture and exit"
+    )
+    parser.add_argument("--output", help="Write the JSON report here too")
+    options = parser.parse_args()
+    logging.basicConfig(
+        level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    records = capture.read(options.capture)
+    report = {"capture": options.capture, **summarize(records)}
+    if not options.summary:
+        report["speed"] = options.speed
+        report["replay"] = asyncio.run(replay(records, options))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
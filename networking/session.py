@@ -0,0 +1,42 @@
+"""
+Per-connection session records.
+
+Everything a server tracks about one connection lives in a single Session
+(or subclass) with ``__slots__``: no per-instance dict and no side tables
+keyed by websocket or remote address. Parts that only matter once a
+connection becomes active, such as a send queue, are created on first use,
+so an idle connection costs one small fixed-size record.
+"""
+
+import time
+
+from networking.codec import codec_for
+from networking.ratelimit import RateLimiter
+
+
+class Session:
+    __slots__ = (
+        "websocket",
+        "codec",
+        "room",
+        "player_id",
+        "limiter",
+        "last_seen",
+        "messages_in",
+        "messages_out",
+    )
+
+    def __init__(self, websocket, room=None, rate_limit=None, limited=None):
+        self.websocket = websocket
+        self.codec = codec_for(websocket)
+        # Name of the room the connection is in, None in the lobby.
+        self.room = room
+        # Player name handed out by game rooms, e.g. "player_0".
+        self.player_id = None
+        # Token bucket for inbound messages; ``limited`` is the dict of
+        # decision counters it reports to.
+        self.limiter = RateLimiter(rate_limit, limited) if rate_limit else None
+        # Monotonic time of the last message received.
+        self.last_seen = time.monotonic()
+        self.messages_in = 0
+        self.messages_out = 0
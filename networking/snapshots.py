@@ -0,0 +1,186 @@
+"""
+Crash-safe state snapshots.
+
+A SnapshotWriter calls ``capture()`` on the event loop every ``interval``
+seconds. capture() should only copy plain values out of the server. The
+encoding, the file write and the fsync run on a writer thread of its own,
+so the event loop never waits on the disk. A snapshot identical to the
+previous one is not written again.
+
+Snapshots are appended to one file as records of
+
+    magic    4 bytes b"SNAP"
+    size     4 bytes, big-endian payload size
+    crc32    4 bytes, big-endian, of the payload
+    payload  MessagePack of what capture() returned
+
+A crash in the middle of an append leaves a torn record at the end, which
+``load()`` skips in favour of the one before it. The first snapshot after
+a start, and any snapshot that would grow the file past ``compact_ratio``
+records of its size, is written alone to ``PATH.tmp`` and renamed over
+PATH, so the file never holds more than a few snapshots.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import struct
+import time
+import zlib
+
+from networking.codec import DecodeError, packb, unpackb
+
+RECORD = struct.Struct(">4sII")
+MAGIC = b"SNAP"
+
+
+def read_latest(data):
+    """The newest intact snapshot in ``data`` (bytes of a snapshot file), or None."""
+    records = []
+    offset = 0
+    while len(data) - offset >= RECORD.size:
+        magic, size, crc = RECORD.unpack_from(data, offset)
+        end = offset + RECORD.size + size
+        if magic != MAGIC or end > len(data):
+            break
+        records.append((offset + RECORD.size, end, crc))
+        offset = end
+    view = memoryview(data)
+    for start, end, crc in reversed(records):
+        payload = view[start:end]
+        if zlib.crc32(payload) != crc:
+            continue
+        try:
+            return unpackb(payload)
+        except DecodeError:
+            continue
+    return None
+
+
+def load(path):
+    """The newest intact snapshot saved at ``path``, or None."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    snapshot = read_latest(data)
+    if snapshot is None and data:
+        logging.warning(f"No intact snapshot in {path}; starting empty")
+    return snapshot
+
+
+class SnapshotWriter:
+    """Saves ``capture()`` to ``path`` every ``interval`` seconds."""
+
+    def __init__(self, path, capture, interval=1.0, compact_ratio=8, fsync=True):
+        self.path = path
+        self.capture = capture
+        self.interval = interval
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="snapshots"
+        )
+        self.pending = None
+        self.file = None
+        self.size = 0
+        self.last_payload = None
+        self.task = None
+        # Counters for bench_snapshots and the logs.
+        self.written = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.capture_seconds = 0.0
+        self.write_seconds = 0.0
+        self.last_bytes = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        return self
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.pending is not None and not self.pending.done():
+                # The disk is slower than the interval: keep the writer
+                # thread to one snapshot and take the next one later.
+                self.skipped += 1
+                continue
+            self.submit()
+
+    def submit(self):
+        started = time.perf_counter()
+        state = self.capture()
+        self.capture_seconds += time.perf_counter() - started
+        self.pending = asyncio.get_running_loop().run_in_executor(
+            self.executor, self.write, state
+        )
+        return self.pending
+
+    async def save(self):
+        """Take a snapshot now and wait until it is on disk."""
+        await self.submit()
+
+    async def close(self, final=True):
+        """Stop snapshotting, after saving one last snapshot if ``final``."""
+        if self.task is not None:
+            self.task.cancel()
+        if final:
+            await self.save()
+        elif self.pending is not None:
+            await self.pending
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.close_file)
+        self.executor.shutdown(wait=False)
+
+    def write(self, state):
+        started = time.perf_counter()
+        payload = packb(state)
+        if payload == self.last_payload:
+            self.unchanged += 1
+            return
+        record = RECORD.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload
+        compact_at = self.compact_ratio * len(record)
+        try:
+            if self.file is None or self.size + len(record) > compact_at:
+                self.rewrite(record)
+            else:
+                self.file.write(record)
+                self.file.flush()
+                if self.fsync:
+                    os.fsync(self.file.fileno())
+                self.size += len(record)
+        except OSError as e:
+            logging.error(f"Failed to write snapshot to {self.path}: {e}")
+            self.close_file()
+            return
+        self.last_payload = payload
+        self.last_bytes = len(record)
+        self.written += 1
+        self.write_seconds += time.perf_counter() - started
+
+    def rewrite(self, record):
+        self.close_file()
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(record)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        if self.fsync:
+            directory = os.open(
+                os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY
+            )
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        self.file = open(self.path, "ab")
+        self.size = len(record)
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,150 @@
+"""
+TLS server contexts tuned for many short-lived connections.
+
+Browsers reconnect often and every lobby-to-room hop opens a new connection,
+so the expensive part of TLS is the full handshake. The contexts built here:
+
+- resume sessions (TLS 1.3 tickets, TLS 1.2 tickets and session IDs), so a
+  returning client skips the certificate exchange and the server signature;
+- take an ECDSA P-256 certificate next to, or instead of, the RSA one.
+  OpenSSL serves ECDSA to every client that supports it, and a P-256
+  signature costs a fraction of an RSA-2048 one;
+- only speak TLS 1.2 and 1.3, with ECDHE key exchange and AEAD ciphers.
+
+Ticket keys are random per context, so sessions resume across every server
+sharing one context (the lobby and its thread or shared-loop rooms) but not
+across room worker processes.
+
+CertReloader keeps a listening context serving the newest certificate files
+so certificates can be rotated without a restart.
+"""
+
+import logging
+import os
+import ssl
+import threading
+import time
+
+# TLS 1.2 suites; TLS 1.3 always uses its own AEAD-only list.
+TLS12_CIPHERS = "ECDHE+AESGCM:ECDHE+CHACHA20"
+
+
+def server_context(
+    certfile, keyfile, ecdsa_certfile=None, ecdsa_keyfile=None, tickets=2
+):
+    """
+    Build a server context from an RSA (or any) certificate and an optional
+    ECDSA one. ``tickets`` is the number of TLS 1.3 session tickets sent
+    after each handshake; 0 turns tickets off.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.set_ciphers(TLS12_CIPHERS)
+    context.options |= ssl.OP_NO_RENEGOTIATION
+    if tickets:
+        context.num_tickets = tickets
+    else:
+        context.options |= ssl.OP_NO_TICKET
+        context.num_tickets = 0
+    if certfile:
+        context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+    if ecdsa_certfile:
+        context.load_cert_chain(certfile=ecdsa_certfile, keyfile=ecdsa_keyfile)
+    return context
+
+
+def resumption_stats(context):
+    """Full handshakes and resumptions accepted by a server context so far."""
+    reloader = getattr(context.sni_callback, "__self__", None)
+    if isinstance(reloader, CertReloader):
+        return reloader.stats()
+    stats = context.session_stats()
+    return {
+        "handshakes": stats["accept_good"],
+        "resumed": stats["hits"],
+    }
+
+
+class CertReloader:
+    """
+    Hands new connections a context built from the newest certificate files.
+
+    Servers listen with ``context``. A daemon thread polls the files every
+    ``interval`` seconds and builds a fresh context when they change; the
+    listening context's SNI callback, which OpenSSL runs for every
+    ClientHello, moves each new connection onto it. Established connections
+    keep the context they started with. Tickets stay valid across reloads
+    because OpenSSL keeps issuing and checking them with the listening
+    context.
+    """
+
+    def __init__(
+        self,
+        certfile,
+        keyfile,
+        ecdsa_certfile=None,
+        ecdsa_keyfile=None,
+        interval=5.0,
+    ):
+        self.files = (certfile, keyfile, ecdsa_certfile, ecdsa_keyfile)
+        self.interval = interval
+        self.stamps = self.stat()
+        self.context = server_context(*self.files)
+        self.context.sni_callback = self.select_context
+        self.current = self.context
+        self.reloads = 0
+        # Handshakes completed on contexts that have since been replaced.
+        self.retired_handshakes = 0
+
+    def stat(self):
+        return tuple(os.stat(path).st_mtime_ns if path else None for path in self.files)
+
+    def select_context(self, ssl_object, server_name, context):
+        current = self.current
+        if current is not context:
+            ssl_object.context = current
+
+    def check(self):
+        """Reload if any file changed; return True if a new context is live."""
+        try:
+            stamps = self.stat()
+        except OSError:
+            # A file is being replaced; look again next time.
+            return False
+        if stamps == self.stamps:
+            return False
+        self.stamps = stamps
+        try:
+            current = server_context(*self.files)
+        except (OSError, ssl.SSLError) as e:
+            # E.g. the new certificate is in place but its key is not yet.
+            logging.error(f"Failed to reload TLS certificates: {e}")
+            return False
+        if self.current is not self.context:
+            self.retired_handshakes += self.current.session_stats()["accept_good"]
+        self.current = current
+        self.reloads += 1
+        logging.info(f"Reloaded TLS certificates from {self.files[0]}")
+        return True
+
+    def stats(self):
+        # Handshakes are counted on the context a connection ends up with,
+        # resumptions on the listening context that owns the session cache.
+        listening = self.context.session_stats()
+        handshakes = listening["accept_good"] + self.retired_handshakes
+        if self.current is not self.context:
+            handshakes += self.current.session_stats()["accept_good"]
+        return {
+            "handshakes": handshakes,
+            "resumed": listening["hits"],
+            "reloads": self.reloads,
+        }
+
+    def watch(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def start(self):
+        threading.Thread(target=self.watch, daemon=True).start()
+        return self
@@ -1,15 +1,14 @@
+import argparse
 import asyncio
 import ssl
 import websockets
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+from networking import logs
+
 logger = logging.getLogger("wss_server")
+# Two lines per echoed message; sampled by default (see networking.logs).
+message_log = logging.getLogger("wss_server.messages")
 
 
 async def echo(websocket, path=None):
@@ -17,10 +16,10 @@ async def echo(websocket, path=None):
     logger.info(f"New connection from {client}")
     try:
         async for message in websocket:
-            logger.info(f"Received message from {client}: {message}")
+            message_log.info("Received message from %s: %s", client, message)
             response = f"Echo: {message}"
             await websocket.send(response)
-            logger.info(f"Sent response to {client}: {response}")
+            message_log.info("Sent response to %s: %s", client, response)
     except websockets.exceptions.ConnectionClosedError:
         logger.info(f"Connection closed with {client}")
     except Exception as e:
@@ -47,4 +46,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TLS echo server")
+    logs.add_arguments(parser)
+    logs.configure(**logs.options_from_args(parser.parse_args()))
     asyncio.run(main())
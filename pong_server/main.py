@@ -1,12 +1,23 @@
 import argparse
 import asyncio
-import json
+import base64
 import logging
 import random
-import ssl
+import secrets
+import struct
+import threading
+import time
 from pygbag_network_utils.server import BaseServer, EchoServer, MainServer
+import websockets
+import websockets.exceptions
 from websockets import ServerConnection
 
+from networking import capture, logs, metrics, snapshots, tls
+from networking.codec import select_subprotocol
+from networking.liveness import HEARTBEAT_DEFAULTS, LivenessTracker
+from networking.ratelimit import DEFAULT_LIMITS, RateLimit, limit_options
+from networking.session import Session
+
 WIDTH, HEIGHT = 800, 600
 
 BALL_SIZE = 10
@@ -16,11 +27,92 @@ BALL_SPEED_Y = 4
 PADDLE_WIDTH, PADDLE_HEIGHT = 10, 100
 PADDLE_SPEED = 5
 
+# Ball speeds above are in pixels per step at this rate; other
+# --sim-rate values scale them so the game plays at the same speed.
+BASE_RATE = 120
+
+# Game states kept as delta baselines. A client whose last ack is older
+# gets the full state again.
+STATE_HISTORY = 32
+
 ball_vel_x = BALL_SPEED_X * random.choice((-1, 1))
 ball_vel_y = BALL_SPEED_Y * random.choice((-1, 1))
 
 
+# Packed states, for players that send "packed" with ask_name: fixed-size,
+# with coordinates in 1/32 pixel fixed point. Layout and the client side are
+# in multiplayer_pong/packed_state.py. Binary frames carry the packet as
+# is, text frames a base64 line.
+STATE_PACKET = struct.Struct(">BHhhhhHH")
+STATE_MAGIC = 0xFF
+FIXED_POINT = 32
+
+
+def fixed(value):
+    return max(-0x8000, min(0x7FFF, round(value * FIXED_POINT)))
+
+
+def pack_state(seq, state):
+    return STATE_PACKET.pack(
+        STATE_MAGIC,
+        seq & 0xFFFF,
+        fixed(state["player_0"]["pos"]),
+        fixed(state["player_1"]["pos"]),
+        fixed(state["ball"]["pos"][0]),
+        fixed(state["ball"]["pos"][1]),
+        min(state["player_0"]["score"], 0xFFFF),
+        min(state["player_1"]["score"], 0xFFFF),
+    )
+
+
+def copy_state(state):
+    return {
+        name: {
+            field: list(value) if isinstance(value, list) else value
+            for field, value in fields.items()
+        }
+        for name, fields in state.items()
+    }
+
+
+def state_delta(base, state):
+    """The fields of ``state`` that differ from ``base``, by entity."""
+    delta = {}
+    for name, fields in state.items():
+        old = base.get(name, {})
+        changed = {
+            field: value for field, value in fields.items() if old.get(field) != value
+        }
+        if changed:
+            delta[name] = changed
+    return delta
+
+
+class PongSession(Session):
+    """Session of a Pong player, with the state it gets sent."""
+
+    __slots__ = ("acked_state", "packed_states")
+
+    def __init__(self, websocket, room=None, rate_limit=None, limited=None):
+        super().__init__(websocket, room, rate_limit, limited)
+        # Number of the last game state the client acknowledged, the
+        # baseline for the deltas it is sent.
+        self.acked_state = None
+        # Whether the client asked for game states in the packed format.
+        self.packed_states = False
+
+
 class PongServer(BaseServer):
+    # Set from the command line; MainServer only passes host and port.
+    rate_limit = DEFAULT_LIMITS["pong"]
+    heartbeat = HEARTBEAT_DEFAULTS
+    idle_timeout = None
+    # Physics steps and state broadcasts per second, and the most simulation
+    # time (seconds) a stalled loop catches up on before skipping the rest.
+    sim_rate = 120
+    send_rate = 30
+    max_catch_up = 0.25
+
     def __init__(self, host, port, ssl_context=None):
         super().__init__(host, port, ssl_context)
         self.game_state = {
@@ -29,73 +121,412 @@ class PongServer(BaseServer):
             "ball": {"pos": [WIDTH / 2, HEIGHT / 2]},
         }
         self.new_player_id = 0
+        # Player name -> token a reconnecting player shows to get it back.
+        self.seat_tokens = {}
         self.game_running = False
-        self.player_ips = {}
+        # websocket -> PongSession: player name, codec, rate limiter and
+        # counters of every connected client.
+        self.sessions = {}
+        # Serves are drawn from a random.Random of the match's own, so a
+        # seeded match replays the same way.
+        self.random = random.Random()
         self.ball_pos = [WIDTH / 2, HEIGHT / 2]
-        self.ball_vel = [
-            BALL_SPEED_X * random.choice((-1, 1)),
-            BALL_SPEED_Y * random.choice((-1, 1)),
+        self.ball_vel = self.serve_velocity()
+        self.steps = 0
+        self.skipped_steps = 0
+        # Sequence number of the last game state sent, and recent states by
+        # number for delta compression.
+        self.state_seq = 0
+        self.state_history = {}
+        self.metrics = (
+            metrics.registry.room(f"pong:{port}", lambda: list(self.sessions.values()))
+            if metrics.registry is not None
+            else None
+        )
+        self.liveness = LivenessTracker(
+            self.sessions,
+            self.idle_timeout,
+            self.metrics.reaped if self.metrics is not None else None,
+        )
+        if self.metrics is not None:
+            self.metrics.liveness = self.liveness.state
+
+    def serve_velocity(self):
+        return [
+            BALL_SPEED_X * self.random.choice((-1, 1)),
+            BALL_SPEED_Y * self.random.choice((-1, 1)),
         ]
-        self.last_update_time = None
+
+    def step(self):
+        """Advance the match by one fixed 1 / sim_rate second step."""
+        dt = BASE_RATE / self.sim_rate
+        self.ball_pos[0] += self.ball_vel[0] * dt
+        self.ball_pos[1] += self.ball_vel[1] * dt
+
+        # Ball collision with top and bottom walls
+        if self.ball_pos[1] <= 0 or self.ball_pos[1] >= HEIGHT - BALL_SIZE:
+            self.ball_vel[1] = -self.ball_vel[1]
+
+        # Ball collision with left and right walls (reset game)
+        if self.ball_pos[0] <= 0 or self.ball_pos[0] >= WIDTH - BALL_SIZE:
+            scoring_player = "player_1" if self.ball_pos[0] <= 0 else "player_0"
+            self.game_state[scoring_player]["score"] += 1
+            self.ball_pos = [WIDTH / 2, HEIGHT / 2]
+            self.ball_vel = self.serve_velocity()
+
+        self.game_state["ball"]["pos"] = self.ball_pos
+        self.steps += 1
 
     async def game_loop(self):
-        self.last_update_time = asyncio.get_event_loop().time()
-        dt = 1
+        # Physics runs in fixed steps paid for out of an accumulator of
+        # elapsed monotonic time, so the match moves at the same speed
+        # however late the loop wakes up. State goes out at send_rate,
+        # independently of the step rate.
+        step = 1 / self.sim_rate
+        send_interval = 1 / self.send_rate
+        accumulator = 0.0
+        last = time.monotonic()
+        next_send = last
         while self.running:
-            # current_time = asyncio.get_event_loop().time()
-            # dt = current_time - self.last_update_time
-            # self.last_update_time = current_time
+            now = time.monotonic()
+            accumulator += now - last
+            last = now
+            tick_started = time.perf_counter()
 
-            if self.new_player_id == 2 and not self.game_running:
+            if not self.game_running and self.seated() == 2:
                 self.game_running = True
-                await self.broadcast('{"game_start": true}')
+                accumulator = 0.0
+                next_send = now
+                await self.broadcast({"game_start": True})
 
             if self.game_running:
-                # Update ball position
-                self.ball_pos[0] += self.ball_vel[0] * dt
-                self.ball_pos[1] += self.ball_vel[1] * dt
+                if accumulator > self.max_catch_up:
+                    # Too far behind to catch up without a burst of steps
+                    # the clients would see as a jump: drop the excess.
+                    skipped = int((accumulator - self.max_catch_up) / step)
+                    self.skipped_steps += skipped
+                    if self.metrics is not None:
+                        self.metrics.skipped_steps += skipped
+                    accumulator -= skipped * step
+                while accumulator >= step:
+                    self.step()
+                    accumulator -= step
+                if now >= next_send:
+                    await self.send_state()
+                    next_send += send_interval
+                    if next_send <= now:
+                        # Sends missed while stalled are not made up.
+                        next_send = now + send_interval
+            else:
+                accumulator = 0.0
 
-                # Ball collision with top and bottom walls
-                if self.ball_pos[1] <= 0 or self.ball_pos[1] >= HEIGHT - BALL_SIZE:
-                    self.ball_vel[1] = -self.ball_vel[1]
+            if self.metrics is not None:
+                elapsed = time.perf_counter() - tick_started
+                self.metrics.ticks.observe(elapsed)
+                if elapsed > step:
+                    self.metrics.tick_overruns += 1
+            wake = last + step - accumulator
+            if self.game_running:
+                wake = min(wake, next_send)
+            await asyncio.sleep(max(wake - time.monotonic(), 0))
 
-                # Ball collision with left and right walls (reset game)
-                if self.ball_pos[0] <= 0 or self.ball_pos[0] >= WIDTH - BALL_SIZE:
-                    scoring_player = "player_1" if self.ball_pos[0] <= 0 else "player_0"
-                    self.game_state[scoring_player]["score"] += 1
-                    self.ball_pos = [WIDTH / 2, HEIGHT / 2]
-                    self.ball_vel = [
-                        BALL_SPEED_X * random.choice((-1, 1)),
-                        BALL_SPEED_Y * random.choice((-1, 1)),
-                    ]
+    def seated(self):
+        return sum(1 for session in self.sessions.values() if session.player_id)
+
+    def snapshot(self):
+        """A copy of the match for the snapshot file."""
+        return {
+            "game_state": {
+                "player_0": dict(self.game_state["player_0"]),
+                "player_1": dict(self.game_state["player_1"]),
+                "ball": {"pos": list(self.ball_pos)},
+            },
+            "ball_vel": list(self.ball_vel),
+            "players": self.new_player_id,
+            "seats": dict(self.seat_tokens),
+        }
 
-                # Update game state
-                self.game_state["ball"]["pos"] = self.ball_pos
+    def restore(self, snapshot):
+        """
+        Continue a snapshotted match. It stays paused until both players
+        have reconnected and reclaimed their names.
+        """
+        self.game_state = snapshot["game_state"]
+        self.ball_pos = self.game_state["ball"]["pos"]
+        self.ball_vel = snapshot["ball_vel"]
+        self.new_player_id = snapshot["players"]
+        self.seat_tokens = snapshot["seats"]
 
-                # Broadcast game state
-                await self.broadcast(json.dumps(self.game_state))
+    def claim_name(self, session, requested, token):
+        """
+        Give a player a name: the one it had, if it shows that name's token
+        and nobody holds it, otherwise the next free one.
+        """
+        if session.player_id is not None:
+            return session.player_id
+        held = {other.player_id for other in self.sessions.values()}
+        if (
+            token is not None
+            and self.seat_tokens.get(requested) == token
+            and requested not in held
+        ):
+            session.player_id = requested
+        elif self.new_player_id < 2:
+            session.player_id = f"player_{self.new_player_id}"
+            self.seat_tokens[session.player_id] = secrets.token_hex(8)
+            self.new_player_id += 1
+        return session.player_id
 
-            await asyncio.sleep(1 / 120)  # Run at 60 FPS
+    async def broadcast(self, message):
+        # Encode the state once per tick for each codec in use and send the
+        # same bytes to every player, instead of building message + "\n"
+        # and encoding it again for each of them.
+        started = time.perf_counter() if self.metrics is not None else None
+        frames = {}
+        for session in list(self.sessions.values()):
+            codec = session.codec
+            frame = frames.get(codec)
+            if frame is None:
+                frame = frames[codec] = codec.encode(message)
+            await self.send_frame(session, frame, started)
+
+    async def send_state(self):
+        """
+        Send the next numbered game state. A client that has acked a state
+        still in the history only gets the fields changed since then, as
+        {"seq": N, "base": ACKED, ...}; new clients and clients too far
+        behind get the whole state as {"seq": N, ...}. Players that asked
+        for packed states get pack_state() instead.
+        """
+        started = time.perf_counter() if self.metrics is not None else None
+        self.state_seq += 1
+        state = copy_state(self.game_state)
+        history = self.state_history
+        history[self.state_seq] = state
+        history.pop(self.state_seq - STATE_HISTORY, None)
+        # Clients acked up to the same state share the message, and the
+        # frame per codec as in broadcast().
+        messages = {}
+        frames = {}
+        packed = None
+        for session in list(self.sessions.values()):
+            codec = session.codec
+            if session.packed_states:
+                frame = frames.get(("packed", codec.text))
+                if frame is None:
+                    if packed is None:
+                        packed = pack_state(self.state_seq, state)
+                    frame = frames["packed", codec.text] = (
+                        base64.b64encode(packed) + b"\n" if codec.text else packed
+                    )
+                await self.send_frame(session, frame, started)
+                continue
+            base = session.acked_state if session.acked_state in history else None
+            frame = frames.get((codec, base))
+            if frame is None:
+                message = messages.get(base)
+                if message is None:
+                    if base is None:
+                        message = {"seq": self.state_seq, **state}
+                    else:
+                        message = {
+                            "seq": self.state_seq,
+                            "base": base,
+                            **state_delta(history[base], state),
+                        }
+                    messages[base] = message
+                frame = frames[codec, base] = codec.encode(message)
+            await self.send_frame(session, frame, started)
+
+    async def send_frame(self, session, frame, started):
+        # Closed clients are left for handle_client to remove.
+        try:
+            await session.websocket.send(frame, text=session.codec.text)
+        except websockets.exceptions.ConnectionClosed:
+            self.logger.info("Client disconnected during broadcast.")
+            return
+        except Exception as e:
+            self.logger.error(f"Error sending message to client: {e}")
+            return
+        session.messages_out += 1
+        if self.metrics is not None:
+            self.metrics.messages_out += 1
+            self.metrics.bytes_out += len(frame)
+            self.metrics.fanout.observe(time.perf_counter() - started)
+
+    async def handle_client(self, websocket):
+        self.sessions[websocket] = PongSession(
+            websocket,
+            self.metrics.name if self.metrics is not None else None,
+            self.rate_limit,
+            self.metrics.limited if self.metrics is not None else None,
+        )
+        self.liveness.add(websocket)
+        try:
+            await super().handle_client(websocket)
+        finally:
+            self.sessions.pop(websocket, None)
+            self.liveness.remove(websocket)
 
     async def handle_client_message(self, websocket: ServerConnection, message):
-        data = json.loads(message)
-        addr = websocket.remote_address
-        if "ask_name" in data and self.new_player_id < 2:
-            if addr in self.player_ips:
-                player_name = self.player_ips[addr]
-            else:
-                player_name = f"player_{self.new_player_id}"
-                self.new_player_id += 1
-                self.player_ips[addr] = player_name
+        session = self.sessions[websocket]
+        session.last_seen = time.monotonic()
+        session.messages_in += 1
+        if self.metrics is not None:
+            self.metrics.messages_in += 1
+            self.metrics.bytes_in += len(message)
+        if session.limiter is not None and not await session.limiter.admit(
+            websocket, message
+        ):
+            return
+        codec = session.codec
+        data = codec.decode(message)
+        if "ack" in data:
+            seq = data["ack"]
+            if (
+                isinstance(seq, int)
+                and seq in self.state_history
+                and (session.acked_state is None or seq > session.acked_state)
+            ):
+                session.acked_state = seq
+        if "ask_name" in data:
+            session.packed_states = bool(data.get("packed"))
+            # A player that lost its connection (or its server, see
+            # PongLobby) sends the name and token it had to get its paddle
+            # back.
+            player_name = self.claim_name(
+                session, data.get("player_name"), data.get("token")
+            )
+            if player_name is None:
+                return
+            await websocket.send(
+                codec.encode(
+                    {"player_name": player_name, "token": self.seat_tokens[player_name]}
+                ),
+                text=codec.text,
+            )
+            if self.game_running:
+                await websocket.send(
+                    codec.encode({"game_start": True}), text=codec.text
+                )
 
-            await websocket.send(f'{{"player_name": "{player_name}"}}' + "\n")
+    async def start(self):
+        # Same as BaseServer.start, but lets clients negotiate a codec.
+        try:
+            self.server = await websockets.serve(
+                self.handle_client,
+                self.host,
+                self.port,
+                ssl=self.ssl_context,
+                select_subprotocol=select_subprotocol,
+                **self.heartbeat,
+                **limit_options(self.rate_limit),
+                **capture.serve_options(),
+            )
+            self.logger.info(f"Server started on ws://{self.host}:{self.port}")
+            self.game_loop_task = asyncio.create_task(self.game_loop())
+            if self.metrics is not None:
+                lag_task = asyncio.create_task(
+                    metrics.registry.watch_loop(self.metrics.name)
+                )
+            await self.server.wait_closed()
+            await self.game_loop_task
+        except Exception as e:
+            self.logger.error(f"Error starting server: {e}")
+        finally:
+            self.liveness.stop()
+            if self.metrics is not None:
+                lag_task.cancel()
+                metrics.registry.remove_room(self.metrics.name)
 
 
-def main():
-    logging.basicConfig(
-        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-    )
+class PongLobby(MainServer):
+    """
+    pygbag's MainServer, saving every PongServer's match to a snapshot file
+    and bringing the matches back, on the same ports, when it restarts. Its
+    traffic is captured along with the rooms' when capture is on.
+    """
+
+    def __init__(self, *args, snapshot_path=None, snapshot_interval=1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshots = (
+            snapshots.SnapshotWriter(
+                snapshot_path, self.capture_matches, snapshot_interval
+            )
+            if snapshot_path
+            else None
+        )
+
+    def capture_matches(self):
+        # Matches keep running on their own threads while this copies them;
+        # a value may be a tick older than the one next to it.
+        with self.lock:
+            rooms = list(self.echo_servers.items())
+            next_server_id = self.next_server_id
+        return {
+            "next_server_id": next_server_id,
+            "rooms": [
+                [server_id, server.snapshot()] for server_id, (server, _) in rooms
+            ],
+        }
+
+    def restore(self, snapshot):
+        for server_id, state in snapshot["rooms"]:
+            server = self.game_server_class(self.host, server_id + 9000)
+            server.restore(state)
+            thread = threading.Thread(
+                target=asyncio.run, args=(server.start(),), daemon=True
+            )
+            thread.start()
+            with self.lock:
+                self.echo_servers[server_id] = (server, thread)
+        with self.lock:
+            self.next_server_id = max(self.next_server_id, snapshot["next_server_id"])
+
+    async def start(self):
+        if self.snapshots is None:
+            return await self.serve()
+        started = time.perf_counter()
+        snapshot = await asyncio.get_running_loop().run_in_executor(
+            None, snapshots.load, self.snapshots.path
+        )
+        if snapshot:
+            self.restore(snapshot)
+            logging.info(
+                f"Restored {len(snapshot['rooms'])} matches from "
+                f"{self.snapshots.path} in {(time.perf_counter() - started) * 1000:.1f} ms"
+            )
+        self.snapshots.start()
+        try:
+            await self.serve()
+        finally:
+            await self.snapshots.close()
+
+    async def serve(self):
+        # MainServer.start, plus traffic capture.
+        try:
+            server = await websockets.serve(
+                self.handle_client,
+                self.host,
+                self.port,
+                ssl=self.ssl_context,
+                **capture.serve_options(),
+            )
+            self.logger.info(f"Main server started on ws://{self.host}:{self.port}")
+            await server.wait_closed()
+        except Exception as e:
+            self.logger.error(f"Error starting main server: {e}")
+
 
+async def run(main_server, host, metrics_port):
+    # Game rooms run on threads of their own; the lobby and the metrics
+    # endpoint share this loop.
+    if metrics_port:
+        await metrics.registry.serve(host, metrics_port)
+    await main_server.start()
+
+
+def main():
     parser = argparse.ArgumentParser(
         description="Main Server for managing Echo Servers"
     )
@@ -111,25 +542,150 @@ def main():
     parser.add_argument(
         "--cert", type=str, default="certs/cert.pem", help="Port for the main server"
     )
+    parser.add_argument(
+        "--ecdsa-cert",
+        help="ECDSA P-256 certificate served alongside --cert to clients "
+        "that support it",
+    )
+    parser.add_argument("--ecdsa-key", help="Key for --ecdsa-cert")
+    parser.add_argument(
+        "--cert-reload-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between checks of the certificate files for rotation "
+        "(0 loads them once)",
+    )
+    parser.add_argument(
+        "--pong-limit",
+        type=RateLimit.parse,
+        default=DEFAULT_LIMITS["pong"],
+        help="Per-connection input limit as RATE,BURST,MAX_BYTES,ACTION "
+        "(action: drop, delay or disconnect) or 'off'",
+    )
+    parser.add_argument(
+        "--ping-interval",
+        type=float,
+        default=20.0,
+        help="Seconds between keepalive pings to players (0 disables)",
+    )
+    parser.add_argument(
+        "--ping-timeout",
+        type=float,
+        default=20.0,
+        help="Seconds to wait for a pong before dropping a player",
+    )
+    parser.add_argument(
+        "--close-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds to wait for the closing handshake before dropping the "
+        "socket, e.g. after a missed pong",
+    )
+    parser.add_argument(
+        "--open-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds a player gets to finish the opening handshake",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=0,
+        help="Drop players that send nothing for this many seconds (0 disables)",
+    )
+    parser.add_argument(
+        "--sim-rate",
+        type=float,
+        default=PongServer.sim_rate,
+        help="Physics steps per second",
+    )
+    parser.add_argument(
+        "--send-rate",
+        type=float,
+        default=PongServer.send_rate,
+        help="Game state broadcasts per second",
+    )
+    parser.add_argument(
+        "--max-catch-up",
+        type=float,
+        default=PongServer.max_catch_up,
+        help="Seconds of physics a stalled match catches up on; steps "
+        "beyond that are skipped",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Enable metrics and serve them in Prometheus format on this port",
+    )
+
+    parser.add_argument(
+        "--capture",
+        help="Record every frame players send and receive to this file; "
+        "replay it with 'python -m networking.replay'",
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Save every match to this file and restore them on start",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between match snapshots",
+    )
 
+    logs.add_arguments(parser)
     args = parser.parse_args()
+    logs.configure(**logs.options_from_args(args))
 
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
     try:
-        ssl_context.load_cert_chain(certfile=args.cert, keyfile=args.key)
+        if args.cert_reload_interval:
+            ssl_context = (
+                tls.CertReloader(
+                    args.cert,
+                    args.key,
+                    args.ecdsa_cert,
+                    args.ecdsa_key,
+                    args.cert_reload_interval,
+                )
+                .start()
+                .context
+            )
+        else:
+            ssl_context = tls.server_context(
+                args.cert, args.key, args.ecdsa_cert, args.ecdsa_key
+            )
         logging.info("SSL context loaded successfully")
     except Exception as e:
         logging.error(f"Failed to load SSL context: {str(e)}")
         logging.info("example will run withou ssl context")
         ssl_context = None
 
-    main_server = MainServer(
+    if args.metrics_port:
+        metrics.enable()
+    if args.capture:
+        capture.enable(args.capture)
+    PongServer.rate_limit = args.pong_limit
+    PongServer.heartbeat = {
+        "ping_interval": args.ping_interval or None,
+        "ping_timeout": args.ping_timeout or None,
+        "close_timeout": args.close_timeout or None,
+        "open_timeout": args.open_timeout or None,
+    }
+    PongServer.idle_timeout = args.idle_timeout or None
+    PongServer.sim_rate = args.sim_rate
+    PongServer.send_rate = args.send_rate
+    PongServer.max_catch_up = args.max_catch_up
+    main_server = PongLobby(
         host=args.host,
         port=args.port,
         ssl_context=ssl_context,
         game_server_class=PongServer,
+        snapshot_path=args.snapshot,
+        snapshot_interval=args.snapshot_interval,
     )
-    asyncio.run(main_server.start())
+    asyncio.run(run(main_server, args.host, args.metrics_port))
 
 
 if __name__ == "__main__":